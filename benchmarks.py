@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import platform
+import datetime
+import tempfile
+import subprocess
+
+import numpy as np
+
+import logwriter
+import scheduler
+import detection
+import occupancy
+import reprocess
+import storage
+import checkpoint
+import waterfall
+from spectrum import SpectrumIntegrator
+from capture_file import CaptureWriter
+from flowgraph import AnalysisSink, FileSink, Pipeline, ProcessPipeline, SpectrumSink, SyntheticSource
+
+FLOWGRAPH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flowgraph.py")
+
+
+def sweep_period(folder_path, band_counts=(1, 4, 16), dwell=0.25, sampling_rate=1e6, passes=2):
+    """Sweeps synthetic bands through the real engine process and times each pass.
+
+    Reports the engine cold start (what the old subprocess-per-step model paid
+    on every step), the sweep period for each band count, and the per-step
+    overhead: wall time beyond the planned dwell.
+    """
+    async def run():
+        log_path = os.path.join(folder_path, "log.txt")
+        engine = scheduler.CaptureEngine(sampling_rate, sampling_rate, log_path,
+                                         ["--source", "synthetic", "--product", "spectra"], flowgraph_path=FLOWGRAPH)
+        started = time.perf_counter()
+        await engine.start()
+        await engine.retune(100e6, os.path.join(folder_path, "warmup.dat"))
+        cold_start = time.perf_counter() - started
+        await engine.stop_capture()
+
+        results = {"engine_cold_start_seconds": cold_start, "dwell_seconds": dwell, "sweeps": []}
+        try:
+            for bands in band_counts:
+                periods, latencies, jitter = [], [], []
+                for sweep in range(passes):
+                    sweep_start = time.perf_counter()
+                    for band in range(bands):
+                        output_file = os.path.join(folder_path, f"{bands}_{sweep}_{band}.dat")
+                        latency, stats = await scheduler.run_step(engine, 100e6 + band * sampling_rate, output_file,
+                                                                  dwell, float("inf"))
+                        latencies.append(latency)
+                        jitter.append(abs(stats["actual_dwell"] - stats["planned_dwell"]))
+                    periods.append(time.perf_counter() - sweep_start)
+                period = min(periods)
+                results["sweeps"].append({
+                    "bands": bands,
+                    "period_seconds": period,
+                    "step_overhead_seconds": period / bands - dwell,
+                    "mean_retune_latency_seconds": sum(latencies) / len(latencies),
+                    "max_jitter_seconds": max(jitter),
+                })
+        finally:
+            await engine.close()
+        return results
+
+    return asyncio.run(run())
+
+
+def processing_rate(seconds=2.0, block_size=65536, fft_size=1024, sampling_rate=2e6):
+    """Spectrum integration throughput on synthetic IQ, in MS/s of one core."""
+    source = SyntheticSource(sampling_rate, sampling_rate, tones=[(0.2e6, 20)], block_size=block_size, throttle=False)
+    source.tune(0.0)
+    integrator = SpectrumIntegrator(sampling_rate, fft_size=fft_size, integration_time=1.0, kurtosis=True)
+    block = np.empty(block_size, dtype=np.complex64)
+    samples = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        samples += source.read_into(block)
+        integrator.process(block)
+    elapsed = time.perf_counter() - started
+    return {"integrate_msps": samples / elapsed / 1e6}
+
+
+def detect_sink_factory(sampling_rate):
+    """Sink factory for raw IQ with detection, in the roles flowgraph.sink_roles splits it into."""
+    def make_sink(path, center_freq, role="all"):
+        if role == "store":
+            return FileSink(path, center_freq, sampling_rate, sampling_rate)
+        integrator = SpectrumIntegrator(sampling_rate, kurtosis=True)
+        detector = detection.RFIDetector(integrator.frequencies(center_freq), integrator.integration_interval)
+        sink_class = AnalysisSink if role == "analyse" else FileSink
+        return sink_class(path, center_freq, sampling_rate, sampling_rate, integrator, detector)
+    return make_sink
+
+
+def pipeline_rate(folder_path, seconds=2.0, block_size=65536, sampling_rate=2e6):
+    """Unthrottled capture pipeline throughput for the spectra and raw IQ products.
+
+    Raw IQ with detection is measured both in the threaded Pipeline and in a
+    ProcessPipeline, whose reader, FFT and file writes run in three processes;
+    the gain depends on how many cores there are.
+    """
+    results = {"cpus": os.cpu_count()}
+    make_detect_sink = detect_sink_factory(sampling_rate)
+    processes = ProcessPipeline(make_detect_sink, ("store", "analyse"), block_size=block_size)
+    try:
+        for product in ("spectra", "iq", "iq_detect", "iq_detect_processes"):
+            source = SyntheticSource(sampling_rate, sampling_rate, block_size=block_size, throttle=False)
+            source.tune(100e6)
+            path = os.path.join(folder_path, f"pipeline_{product}.dat")
+            if product == "iq_detect_processes":
+                processes.open(source, path, 100e6)
+                pipeline = processes
+            else:
+                if product == "spectra":
+                    sink = SpectrumSink(path, 100e6, sampling_rate, sampling_rate, SpectrumIntegrator(sampling_rate))
+                elif product == "iq":
+                    sink = FileSink(path, 100e6, sampling_rate, sampling_rate)
+                else:
+                    sink = make_detect_sink(path, 100e6)
+                pipeline = Pipeline(source, sink, block_size=block_size)
+            pipeline.start()
+            time.sleep(seconds)
+            stats = pipeline.stop()
+            results[product] = {
+                "msps": stats["samples_per_second"] / 1e6,
+                "dropped_blocks": stats["dropped_blocks"],
+                "write_mb_per_second": stats["bytes_written"] / stats["capture_time"] / 1e6,
+            }
+            os.remove(path)
+    finally:
+        processes.close()
+    return results
+
+
+def write_rate(folder_path, total_bytes=256 * 1024 * 1024, block_size=65536):
+    """Raw capture file write rate, fsynced so the page cache does not flatter it."""
+    block = np.zeros(block_size, dtype=np.complex64)
+    path = os.path.join(folder_path, "write.dat")
+    writer = CaptureWriter(path, "iq", np.complex64, (), 100e6, 1e6, 1e6, time.time(), 1e-6)
+    started = time.perf_counter()
+    for _ in range(max(1, total_bytes // block.nbytes)):
+        writer.write(block)
+    writer.file.flush()
+    os.fsync(writer.file.fileno())
+    elapsed = time.perf_counter() - started
+    writer.close()
+    os.remove(path)
+    return {"write_mb_per_second": writer.payload_bytes / elapsed / 1e6}
+
+
+def log_rate(folder_path, messages=20000):
+    """Log throughput of the queued writer against the old open-append-close per message."""
+    path = os.path.join(folder_path, "log_open.txt")
+    started = time.perf_counter()
+    for i in range(messages):
+        with open(path, "a") as log_file:
+            log_file.write(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Benchmark message {i}\n")
+    open_per_message = messages / (time.perf_counter() - started)
+
+    writer = logwriter.LogWriter(os.path.join(folder_path, "log_queued.txt"), echo=False)
+    started = time.perf_counter()
+    for i in range(messages):
+        writer.write(f"Benchmark message {i}")
+    enqueue = messages / (time.perf_counter() - started)
+    writer.close()
+    queued = messages / (time.perf_counter() - started)
+    return {"open_per_message_per_second": open_per_message, "queued_enqueue_per_second": enqueue,
+            "queued_flushed_per_second": queued}
+
+
+def waterfall_rate(folder_path, bands=20, passes=10):
+    """Waterfall ingest rate over a synthetic day of spectra captures."""
+    day_path = os.path.join(folder_path, "day")
+    waterfall.make_synthetic_day(day_path, 1e9, bands, passes)
+    stats = waterfall.build_waterfall(day_path, os.path.join(day_path, "waterfall.f32"))
+    seconds = max(stats["seconds"], 1e-9)
+    return {"files_per_second": stats["files"] / seconds, "mb_per_second": stats["bytes"] / seconds / 1e6}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = ("sweep", "processing", "pipeline", "write", "log", "detection", "waterfall", "reprocess", "occupancy",
+              "storage", "checkpoint")
+
+
+def run_benchmarks(names=BENCHMARKS, quick=False):
+    """Runs the named benchmarks on synthetic data and returns the results with the environment they ran in."""
+    logwriter.configure(echo=False)
+    results = {}
+    with tempfile.TemporaryDirectory() as folder_path:
+        for name in names:
+            started = time.perf_counter()
+            if name == "sweep":
+                result = sweep_period(folder_path, (1, 4) if quick else (1, 4, 16), passes=1 if quick else 2)
+            elif name == "processing":
+                result = processing_rate(0.5 if quick else 2.0)
+            elif name == "pipeline":
+                result = pipeline_rate(folder_path, 0.5 if quick else 2.0)
+            elif name == "write":
+                result = write_rate(folder_path, (32 if quick else 256) * 1024 * 1024)
+            elif name == "log":
+                result = log_rate(folder_path, 2000 if quick else 20000)
+            elif name == "detection":
+                result = detection.benchmark(rows=200 if quick else 2000)
+            elif name == "waterfall":
+                result = waterfall_rate(folder_path, passes=2 if quick else 10)
+            elif name == "reprocess":
+                result = reprocess.benchmark(4 if quick else 16, workers=tuple(sorted({1, os.cpu_count() or 1})))
+            elif name == "occupancy":
+                result = occupancy.benchmark(days=2 if quick else 14)
+            elif name == "storage":
+                result = storage.benchmark(records=256 if quick else 2048, iq_samples=1 << (20 if quick else 22))
+            elif name == "checkpoint":
+                result = checkpoint.benchmark(50 if quick else 500)
+            else:
+                raise ValueError(f"Unknown benchmark: {name}")
+            result["benchmark_seconds"] = time.perf_counter() - started
+            results[name] = result
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def flatten(results, prefix=""):
+    """Flattens nested results into {"a.b.c": number} for comparison."""
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for index, value in enumerate(results):
+            flat.update(flatten(value, f"{prefix}{index}."))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        flat[prefix[:-1]] = results
+    return flat
+
+
+def compare(baseline, current):
+    """Yields (metric, baseline, current, ratio) for every metric both runs measured."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    for metric in sorted(old.keys() & new.keys()):
+        if metric.endswith("benchmark_seconds") or not old[metric]:
+            continue
+        yield metric, old[metric], new[metric], new[metric] / old[metric]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sweep pipeline on synthetic sources.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file the results are written to")
+    parser.add_argument("--only", default="", help=f"Comma separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast smoke run")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = [name for name in args.only.split(",") if name] or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks(names, args.quick)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    results = report["results"]
+    if "sweep" in results:
+        sweep = results["sweep"]
+        print(f"Engine cold start: {sweep['engine_cold_start_seconds'] * 1000:.0f} ms")
+        for row in sweep["sweeps"]:
+            print(f"Sweep of {row['bands']} bands at {sweep['dwell_seconds']} s dwell: period {row['period_seconds']:.3f} s, "
+                  f"step overhead {row['step_overhead_seconds'] * 1000:.1f} ms, retune {row['mean_retune_latency_seconds'] * 1000:.1f} ms")
+    if "processing" in results:
+        print(f"Spectrum integration: {results['processing']['integrate_msps']:.1f} MS/s")
+    if "pipeline" in results:
+        for product in ("spectra", "iq", "iq_detect", "iq_detect_processes"):
+            row = results["pipeline"][product]
+            print(f"Pipeline ({product}): {row['msps']:.1f} MS/s, {row['write_mb_per_second']:.1f} MB/s written, "
+                  f"{row['dropped_blocks']} dropped blocks")
+    if "write" in results:
+        print(f"Capture file writes: {results['write']['write_mb_per_second']:.1f} MB/s")
+    if "log" in results:
+        log = results["log"]
+        print(f"Logging: {log['open_per_message_per_second']:.0f} msg/s opening the file per message, "
+              f"{log['queued_flushed_per_second']:.0f} msg/s queued and flushed")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('commit') or args.compare}:")
+        for metric, old, new, ratio in compare(baseline, report):
+            print(f"  {metric}: {old:.4g} -> {new:.4g} ({ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
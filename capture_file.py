@@ -0,0 +1,260 @@
+import os
+import json
+import struct
+
+import numpy as np
+
+
+MAGIC = b"RFICAP01"
+HEADER_SIZE = 4096  # Page aligned so the data section can be memory-mapped directly
+INDEX_NAME = "index.jsonl"
+
+
+class CaptureWriter:
+    """Writes a self-describing capture file: a fixed-size JSON header followed by raw records.
+
+    The header holds everything needed to interpret the data (kind, dtype,
+    record shape, center frequency, sample rate, bandwidth, start time and
+    record interval). The record count and dwell are patched in on close.
+    """
+
+    def __init__(self, path, kind, dtype, record_shape, center_freq, sample_rate, bandwidth, start_time,
+                 record_interval, **extra):
+        self.path = path
+        self.header = {
+            "kind": kind,
+            "dtype": np.dtype(dtype).name,
+            "record_shape": list(record_shape),
+            "center_freq": center_freq,
+            "sample_rate": sample_rate,
+            "bandwidth": bandwidth,
+            "start_time": start_time,
+            "record_interval": record_interval,
+            "records": 0,
+            "dwell": 0.0,
+        }
+        self.header.update(extra)
+        self.record_bytes = np.dtype(dtype).itemsize * int(np.prod(record_shape, dtype=np.int64))
+        self.file = open(path, "wb")
+        self.write_header()
+        self.bytes_written = HEADER_SIZE
+        self.payload_bytes = 0
+
+    def write_header(self):
+        self.file.seek(0)
+        self.file.write(encode_header(self.header))
+
+    def write(self, array):
+        self.file.write(memoryview(np.ascontiguousarray(array)))
+        self.bytes_written += array.nbytes
+        self.payload_bytes += array.nbytes
+
+    def close(self, dwell=None):
+        """Patches the final record count and dwell into the header and closes the file."""
+        self.header["records"] = self.payload_bytes // self.record_bytes
+        self.header["dwell"] = dwell if dwell is not None else self.header["records"] * self.header["record_interval"]
+        end = self.file.tell()
+        self.write_header()
+        self.file.seek(end)
+        self.file.close()
+        return self.header
+
+
+def encode_header(header):
+    """Packs a header dict into exactly HEADER_SIZE bytes."""
+    body = json.dumps(header).encode()
+    if len(body) > HEADER_SIZE - len(MAGIC) - 4:
+        raise ValueError("Capture header too large")
+    return (MAGIC + struct.pack("<I", len(body)) + body).ljust(HEADER_SIZE, b" ")
+
+
+def read_header(path):
+    """Reads the header dict of a capture file."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a capture file: {path}")
+    (length,) = struct.unpack("<I", raw[len(MAGIC):len(MAGIC) + 4])
+    return json.loads(raw[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+
+
+class CaptureFile:
+    """Read-only view of a capture file with its data memory-mapped, never loaded whole.
+
+    data is the stored records as they are on disk. Captures compressed by the
+    storage manager hold int8/int16 IQ pairs or float16 spectra with a scale
+    in the header; read() and slice() return them decoded to the original
+    complex64/float32 values.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        self.encoding = self.header.get("encoding")
+        self.dtype = np.dtype(self.header["dtype"])
+        self.record_shape = tuple(self.header["record_shape"])
+        record_bytes = self.dtype.itemsize * int(np.prod(self.record_shape, dtype=np.int64))
+        # Trust the file size over the header so captures still being written can be read
+        records = (os.path.getsize(path) - HEADER_SIZE) // record_bytes if record_bytes else 0
+        if records > 0:
+            self.data = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                                  shape=(records,) + self.record_shape)
+        else:
+            self.data = np.empty((0,) + self.record_shape, dtype=self.dtype)
+
+    @property
+    def records(self):
+        return len(self.data)
+
+    def decode(self, stored):
+        """Converts stored records (or a slice of them) back to complex64 IQ or float32 spectra."""
+        if self.encoding == "iq_int":
+            pairs = stored.astype(np.float32) * np.float32(self.header["scale"])
+            return (pairs[..., 0] + 1j * pairs[..., 1]).astype(np.complex64)
+        if self.encoding == "float16":
+            # One scale per product, broadcast over the channel axis
+            return stored.astype(np.float32) * np.asarray(self.header["scale"], dtype=np.float32)[:, None]
+        return stored
+
+    def read(self, start=0, stop=None):
+        """Decoded records [start, stop); a memmap view when the capture is not compressed."""
+        return self.decode(self.data[start:stop])
+
+    def times(self):
+        """Start time of each record (Unix seconds)."""
+        return self.header["start_time"] + np.arange(self.records) * self.header["record_interval"]
+
+    def frequencies(self):
+        """Absolute frequency of each channel for spectra captures."""
+        fft_size = self.record_shape[-1]
+        return self.header["center_freq"] + np.fft.fftshift(np.fft.fftfreq(fft_size, 1.0 / self.header["sample_rate"]))
+
+    def record_range(self, t0=None, t1=None):
+        """Record indices [start, stop) covering the time range [t0, t1)."""
+        interval = self.header["record_interval"]
+        start_time = self.header["start_time"]
+        start = 0 if t0 is None else int(np.clip(np.floor((t0 - start_time) / interval), 0, self.records))
+        stop = self.records if t1 is None else int(np.clip(np.ceil((t1 - start_time) / interval), 0, self.records))
+        return start, max(start, stop)
+
+    def channel_range(self, f_lo=None, f_hi=None):
+        """Channel indices [start, stop) covering the frequency range [f_lo, f_hi)."""
+        freqs = self.frequencies()
+        start = 0 if f_lo is None else int(np.searchsorted(freqs, f_lo, side="left"))
+        stop = len(freqs) if f_hi is None else int(np.searchsorted(freqs, f_hi, side="left"))
+        return start, max(start, stop)
+
+    def slice(self, f_lo=None, f_hi=None, t0=None, t1=None):
+        """Returns the records and channels inside the given ranges.
+
+        This is a memmap view (no copy) unless the capture is compressed, in
+        which case only the slice is decoded.
+        """
+        start, stop = self.record_range(t0, t1)
+        if self.header["kind"] != "spectra":
+            return self.read(start, stop)
+        c0, c1 = self.channel_range(f_lo, f_hi)
+        return self.decode(self.data[start:stop, ..., c0:c1])
+
+
+def index_entry(path, header):
+    """Builds the index record describing one finished capture."""
+    half_band = header["sample_rate"] / 2
+    return {
+        "file": os.path.basename(path),
+        "kind": header["kind"],
+        "center_freq": header["center_freq"],
+        "freq_lo": header["center_freq"] - half_band,
+        "freq_hi": header["center_freq"] + half_band,
+        "t_start": header["start_time"],
+        "t_end": header["start_time"] + header["records"] * header["record_interval"],
+        "data_offset": HEADER_SIZE,
+        "record_bytes": np.dtype(header["dtype"]).itemsize * int(np.prod(header["record_shape"], dtype=np.int64)),
+        "records": header["records"],
+        "encoding": header.get("encoding"),
+    }
+
+
+def append_index(folder_path, entry):
+    """Appends one entry to the folder's index; a single small append keeps concurrent writers safe."""
+    with open(os.path.join(folder_path, INDEX_NAME), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def load_index(folder_path):
+    """Loads the folder's index, oldest capture first.
+
+    The index is append-only: a later record for a file (after compression,
+    or a {"file", "deleted"} tombstone after retention removed it) updates the
+    earlier one, so entry positions never change. Deleted entries are kept
+    with deleted set.
+    """
+    entries = {}
+    index_path = os.path.join(folder_path, INDEX_NAME)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                entries[entry["file"]] = dict(entries.get(entry["file"], {}), **entry)
+    entries = [entry for entry in entries.values() if "t_start" in entry]
+    entries.sort(key=lambda entry: (entry["t_start"], entry["freq_lo"]))
+    return entries
+
+
+def rebuild_index(folder_path):
+    """Rewrites the folder's index from the headers of the capture files in it."""
+    entries = []
+    for name in sorted(os.listdir(folder_path)):
+        if not name.endswith(".dat"):
+            continue
+        path = os.path.join(folder_path, name)
+        try:
+            header = read_header(path)
+        except ValueError:
+            continue
+        header["records"] = CaptureFile(path).records
+        entries.append(index_entry(path, header))
+    entries.sort(key=lambda entry: (entry["t_start"], entry["freq_lo"]))
+    with open(os.path.join(folder_path, INDEX_NAME), "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return entries
+
+
+def query_index(entries, f_lo=None, f_hi=None, t0=None, t1=None):
+    """Returns the index entries overlapping the given frequency and time ranges."""
+    return [
+        entry for entry in entries
+        if not entry.get("deleted")
+        and (f_hi is None or entry["freq_lo"] < f_hi) and (f_lo is None or entry["freq_hi"] > f_lo)
+        and (t1 is None or entry["t_start"] < t1) and (t0 is None or entry["t_end"] > t0)
+    ]
+
+
+def read_slice(folder_path, f_lo=None, f_hi=None, t0=None, t1=None):
+    """Yields (entry, memmap view) for every capture in the folder overlapping the ranges."""
+    for entry in query_index(load_index(folder_path), f_lo, f_hi, t0, t1):
+        capture = CaptureFile(os.path.join(folder_path, entry["file"]))
+        yield entry, capture.slice(f_lo, f_hi, t0, t1)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or rebuild a data folder's capture index.")
+    parser.add_argument("folder", help="Data folder, e.g. ~/Desktop/Data/<dd_mm_yyyy>")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild index.jsonl from the capture headers")
+    args = parser.parse_args()
+
+    folder_path = os.path.expanduser(args.folder)
+    entries = rebuild_index(folder_path) if args.rebuild else load_index(folder_path)
+    for entry in entries:
+        print(f"{entry['file']}: {entry['kind']} {entry['freq_lo']:.0f}-{entry['freq_hi']:.0f} Hz, "
+              f"{entry['t_start']:.3f}-{entry['t_end']:.3f}, {entry['records']} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+
+PLAN_NAME = "checkpoint.json"
+
+
+def plan_path(data_root):
+    """The run's checkpoint: its arguments, band groups and devices."""
+    return os.path.join(data_root, PLAN_NAME)
+
+
+def worker_path(data_root, worker):
+    """One worker's progress checkpoint, rewritten after every step."""
+    return os.path.join(data_root, f"checkpoint_{worker}.json")
+
+
+def write_checkpoint(path, state, sync=True):
+    """Atomically replaces the checkpoint at path with state.
+
+    The state goes to a temporary file in the same folder, is flushed (and
+    fsynced unless sync is False) and then renamed over the old checkpoint,
+    so a crash or power cut leaves either the old or the new one, never a
+    torn file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """Returns the checkpoint at path, or None if there is none or it cannot be read."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_checkpoints(data_root):
+    """Deletes the run and worker checkpoints once an observation has finished."""
+    for name in os.listdir(data_root):
+        if name == PLAN_NAME or (name.startswith("checkpoint_") and name.endswith(".json")):
+            os.remove(os.path.join(data_root, name))
+
+
+def benchmark(steps=500):
+    """Times per-step checkpoint writes, with and without fsync, for a state the size of a real one."""
+    state = {"worker": 0, "bands": [100e6 + i * 1e6 for i in range(200)], "sweep_pass": 12, "step_in_pass": 57,
+             "steps": 2457, "elapsed": 86400.0, "policy": {"position": 57}}
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        path = worker_path(folder, 0)
+        for sync in (False, True):
+            started = time.perf_counter()
+            for step in range(steps):
+                state["steps"] = step
+                write_checkpoint(path, state, sync=sync)
+            results["fsync" if sync else "no_fsync"] = (time.perf_counter() - started) / steps
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler checkpoint write benchmark.")
+    parser.add_argument("--steps", type=int, default=500, help="Checkpoint writes to time")
+    args = parser.parse_args()
+
+    results = benchmark(args.steps)
+    print(f"Checkpoint write: {results['no_fsync'] * 1000:.3f} ms without fsync, {results['fsync'] * 1000:.3f} ms with fsync")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,868 @@
+import os
 import sys
+import json
+import queue
+import signal
+import multiprocessing
+import threading
+import time
+import argparse
+
+import numpy as np
+
+from spectrum import SpectrumIntegrator
+from capture_file import CaptureWriter, append_index, index_entry
+from detection import RFIDetector, write_events
+from preview import PREVIEW_BINS, encode_frame
+from instrument import StackSampler
+from occupancy import ChannelStats
+from ring_buffer import SharedRing
+
+try:
+    import SoapySDR
+    from SoapySDR import SOAPY_SDR_RX, SOAPY_SDR_CF32, SOAPY_SDR_OVERFLOW
+except ImportError:
+    SoapySDR = None
+
+EVENTS_NAME = "events.jsonl"
+
+
+class SampleSource:
+    """Base class for IQ sample sources feeding the capture pipeline."""
+
+    def __init__(self, sampling_rate, bandwidth):
+        self.sampling_rate = sampling_rate
+        self.bandwidth = bandwidth
+        self.center_freq = None
+        self.overflows = 0
+
+    def tune(self, center_freq):
+        self.center_freq = center_freq
+
+    def read_into(self, buffer):
+        """Fills buffer with complex64 samples and returns how many were written."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SyntheticSource(SampleSource):
+    """Deterministic IQ generator: complex Gaussian noise plus injected tones.
+
+    Tones are given as (frequency in Hz, power in dB relative to the noise) and
+    only appear when they fall inside the tuned band. Noise is drawn fresh for
+    every block, straight into the buffer: a repeating bank would correlate
+    the frames of one integration and make spectral kurtosis flag pure noise.
+    Generation keeps up with about 30 MS/s per core.
+    """
+
+    def __init__(self, sampling_rate, bandwidth, tones=(), seed=0, block_size=65536, throttle=True):
+        super().__init__(sampling_rate, bandwidth)
+        self.tones = list(tones)
+        self.block_size = block_size
+        self.throttle = throttle
+        self.rng = np.random.default_rng(seed)
+        self.tone_vectors = []
+        self.next_time = None
+
+    def tune(self, center_freq):
+        super().tune(center_freq)
+        n = np.arange(self.block_size)
+        self.tone_vectors = []
+        for freq, power_db in self.tones:
+            offset = freq - center_freq
+            if abs(offset) >= self.sampling_rate / 2:
+                continue
+            step = 2 * np.pi * offset / self.sampling_rate
+            amplitude = 10 ** (power_db / 20)
+            vector = (amplitude * np.exp(1j * step * n)).astype(np.complex64)
+            rotation = np.exp(1j * step * self.block_size)
+            self.tone_vectors.append([vector, rotation, 1.0 + 0j])
+        self.next_time = None
+
+    def read_into(self, buffer):
+        count = min(len(buffer), self.block_size)
+        out = buffer[:count]
+        components = out.view(np.float32)
+        self.rng.standard_normal(out=components, dtype=np.float32)
+        components *= np.float32(np.sqrt(0.5))
+        for tone in self.tone_vectors:
+            vector, rotation, phase = tone
+            out += vector[:count] * np.complex64(phase)
+            tone[2] = phase * rotation
+        if self.throttle:
+            # Pace output to the configured sampling rate like a real device would
+            now = time.monotonic()
+            if self.next_time is None:
+                self.next_time = now
+            self.next_time += count / self.sampling_rate
+            if self.next_time > now:
+                time.sleep(self.next_time - now)
+        return count
+
+
+class SoapySource(SampleSource):
+    """Hardware source using SoapySDR."""
+
+    def __init__(self, sampling_rate, bandwidth, device="", gain=None):
+        if SoapySDR is None:
+            raise RuntimeError("SoapySDR is not installed; use --source synthetic")
+        super().__init__(sampling_rate, bandwidth)
+        self.device = SoapySDR.Device(device)
+        self.device.setSampleRate(SOAPY_SDR_RX, 0, sampling_rate)
+        self.device.setBandwidth(SOAPY_SDR_RX, 0, bandwidth)
+        if gain is not None:
+            self.device.setGain(SOAPY_SDR_RX, 0, gain)
+        self.stream = self.device.setupStream(SOAPY_SDR_RX, SOAPY_SDR_CF32)
+        self.device.activateStream(self.stream)
+
+    def tune(self, center_freq):
+        super().tune(center_freq)
+        self.device.setFrequency(SOAPY_SDR_RX, 0, center_freq)
+
+    def read_into(self, buffer):
+        result = self.device.readStream(self.stream, [buffer], len(buffer), timeoutUs=1000000)
+        if result.ret == SOAPY_SDR_OVERFLOW:
+            self.overflows += 1
+            return 0
+        if result.ret < 0:
+            raise RuntimeError(f"readStream failed: {SoapySDR.errToStr(result.ret)}")
+        return result.ret
+
+    def close(self):
+        self.device.deactivateStream(self.stream)
+        self.device.closeStream(self.stream)
+
+
+def detect_integrations(detector, start_time, integration_interval, frames_per_integration, first_row, mean, kurtosis,
+                        frames):
+    """Thresholds a batch of finished integrations; the rules live capture and reprocess.py share.
+
+    Integrations of fewer than half the nominal frames (the partial one a
+    capture ends with) are too noisy to threshold reliably and are skipped.
+    The rest are timestamped start_time + n * integration_interval, counting
+    n from first_row. Returns the events that ended and how many
+    integrations were thresholded.
+    """
+    frames = np.atleast_1d(frames)
+    keep = frames >= frames_per_integration // 2
+    count = int(np.count_nonzero(keep))
+    if not count:
+        return [], 0
+    times = start_time + (first_row + np.arange(count)) * integration_interval
+    kurtosis = None if kurtosis is None else np.atleast_2d(kurtosis)[keep]
+    return detector.process(times, np.atleast_2d(mean)[keep], kurtosis, frames[keep]), count
+
+
+class FileSink:
+    """Writes raw complex64 IQ blocks to a capture file.
+
+    With a detector, the IQ is also integrated into spectra (never written) so
+    RFI events can be extracted; they are appended to events.jsonl on close.
+    Every integration also refreshes preview, a decimated frame of the latest
+    spectrum for the live view, and channel_stats (a ChannelStats) when given.
+    Time spent in file writes is kept in write_time.
+    """
+
+    def __init__(self, path, center_freq, sampling_rate, bandwidth, integrator=None, detector=None,
+                 preview_bins=PREVIEW_BINS, channel_stats=None):
+        self.path = path
+        self.integrator = integrator
+        self.detector = detector
+        self.header = self.open_file(center_freq, sampling_rate, bandwidth)
+        self.open_time = time.monotonic()
+        self.integrations = 0
+        self.events = []
+        self.preview_bins = preview_bins
+        self.preview = None
+        self.channel_stats = channel_stats
+        self.write_time = 0.0
+
+    def open_file(self, center_freq, sampling_rate, bandwidth):
+        """Creates the capture file and returns its header."""
+        self.writer = CaptureWriter(self.path, "iq", np.complex64, (), center_freq, sampling_rate, bandwidth,
+                                    time.time(), 1.0 / sampling_rate)
+        return self.writer.header
+
+    @property
+    def bytes_written(self):
+        return self.writer.bytes_written
+
+    def store(self, data):
+        write_start = time.perf_counter()
+        self.writer.write(data)
+        self.write_time += time.perf_counter() - write_start
+
+    def write(self, block):
+        self.store(block)
+        if self.detector is not None:
+            for result in self.integrator.process(block):
+                self.handle(result)
+
+    def handle(self, result):
+        """Consumes one finished integration."""
+        self.update_preview(result)
+        self.detect(result)
+        if self.channel_stats is not None:
+            self.channel_stats.update(result["mean"])
+
+    def update_preview(self, result):
+        header = self.header
+        self.preview = encode_frame(result["mean"], header["center_freq"], header["sample_rate"], header["bandwidth"],
+                                    time.time(), self.preview_bins)
+
+    def detect(self, result):
+        if self.detector is None:
+            return
+        events, rows = detect_integrations(self.detector, self.header["start_time"], self.integrator.integration_interval,
+                                           self.integrator.frames_per_integration, self.integrations, result["mean"],
+                                           result.get("kurtosis"), result["frames"])
+        self.events.extend(events)
+        self.integrations += rows
+
+    def close(self):
+        if self.integrator is not None:
+            for result in self.integrator.flush():
+                self.handle(result)
+        if self.detector is not None:
+            self.events.extend(self.detector.flush())
+        folder_path = os.path.dirname(os.path.abspath(self.path))
+        header = self.writer.close(dwell=time.monotonic() - self.open_time)
+        append_index(folder_path, index_entry(self.path, header))
+        write_events(os.path.join(folder_path, EVENTS_NAME), self.events, file=os.path.basename(self.path))
+
+    def summary(self):
+        """Detection results and channel statistics for the capture, reported back to the scheduler."""
+        summary = {}
+        if self.detector is not None:
+            summary.update(events=len(self.events), occupancy=self.detector.occupancy)
+        if self.channel_stats is not None:
+            summary["channel_stats"] = self.channel_stats.summary()
+        return summary
+
+
+class SpectrumSink(FileSink):
+    """Integrates IQ blocks into power spectra and writes those instead of raw IQ.
+
+    Each record holds the mean spectrum, then max-hold and spectral kurtosis
+    when enabled, as float32 rows of fft_size bins.
+    """
+
+    def open_file(self, center_freq, sampling_rate, bandwidth):
+        integrator = self.integrator
+        products = integrator.products()
+        self.writer = CaptureWriter(self.path, "spectra", np.float32, (len(products), integrator.fft_size), center_freq,
+                                    sampling_rate, bandwidth, time.time(), integrator.integration_interval,
+                                    products=products, fft_size=integrator.fft_size, window=integrator.window_name,
+                                    overlap=1 - integrator.hop / integrator.fft_size)
+        return self.writer.header
+
+    def write(self, block):
+        for result in self.integrator.process(block):
+            self.handle(result)
+
+    def handle(self, result):
+        self.store(np.stack([result[name] for name in self.integrator.products()]))
+        self.update_preview(result)
+        self.detect(result)
+        if self.channel_stats is not None:
+            self.channel_stats.update(result["mean"])
+
+
+class AnalysisSink(FileSink):
+    """Integrates IQ blocks for detection, the preview and channel statistics without storing them.
+
+    Runs beside an IQ-only FileSink in another process when processing and
+    file writing are split; events are recorded against the capture file that
+    sink writes.
+    """
+
+    def open_file(self, center_freq, sampling_rate, bandwidth):
+        """Opens no file: the header only describes the band for detection and the preview."""
+        self.writer = None
+        return {"center_freq": center_freq, "sample_rate": sampling_rate, "bandwidth": bandwidth, "start_time": time.time()}
+
+    @property
+    def bytes_written(self):
+        return 0
+
+    def write(self, block):
+        for result in self.integrator.process(block):
+            self.handle(result)
+
+    def close(self):
+        for result in self.integrator.flush():
+            self.handle(result)
+        if self.detector is not None:
+            self.events.extend(self.detector.flush())
+        folder_path = os.path.dirname(os.path.abspath(self.path))
+        write_events(os.path.join(folder_path, EVENTS_NAME), self.events, file=os.path.basename(self.path))
+
+
+class Pipeline:
+    """Streams blocks from a source through processing stages into a sink.
+
+    The reader thread fills preallocated buffers from a free list and hands them
+    to the worker thread, which runs the stages and the sink before returning the
+    buffer. When the worker falls behind and no free buffer is left, the block
+    just read is dropped and counted. Time spent reading, processing and
+    closing the sink is accumulated for the step's timing breakdown.
+    """
+
+    def __init__(self, source, sink, stages=(), block_size=65536, buffers=32):
+        self.source = source
+        self.sink = sink
+        self.stages = list(stages)
+        self.block_size = block_size
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(np.empty(block_size, dtype=np.complex64))
+        self.spare = np.empty(block_size, dtype=np.complex64)
+        self.running = threading.Event()
+        self.threads = []
+        self.error = None
+        self.samples = 0
+        self.blocks = 0
+        self.dropped = 0
+        self.dropped_samples = 0
+        self.overflows = 0
+        self.start_time = None
+        self.stop_time = None
+        self.read_time = 0.0
+        self.work_time = 0.0
+        self.close_time = 0.0
+
+    @property
+    def preview(self):
+        return self.sink.preview
+
+    def start(self):
+        self.running.set()
+        self.start_time = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self.read_loop, daemon=True),
+            threading.Thread(target=self.work_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def read_loop(self):
+        overflows_before = self.source.overflows
+        try:
+            while self.running.is_set():
+                try:
+                    buffer = self.free.get_nowait()
+                except queue.Empty:
+                    # Keep the device drained even though the block will be dropped
+                    self.dropped_samples += self.source.read_into(self.spare)
+                    self.dropped += 1
+                    continue
+                read_start = time.perf_counter()
+                count = self.source.read_into(buffer)
+                self.read_time += time.perf_counter() - read_start
+                if count:
+                    self.filled.put((buffer, count))
+                else:
+                    self.free.put(buffer)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.overflows = self.source.overflows - overflows_before
+            self.filled.put(None)
+
+    def work_loop(self):
+        try:
+            while True:
+                item = self.filled.get()
+                if item is None:
+                    break
+                buffer, count = item
+                work_start = time.perf_counter()
+                block = buffer[:count]
+                for stage in self.stages:
+                    block = stage(block)
+                self.sink.write(block)
+                self.work_time += time.perf_counter() - work_start
+                self.samples += count
+                self.blocks += 1
+                self.free.put(buffer)
+        except Exception as e:
+            self.error = e
+            self.running.clear()
+
+    def stop(self):
+        """Stops the pipeline, closes the sink and returns its statistics."""
+        self.running.clear()
+        for thread in self.threads:
+            thread.join()
+        self.stop_time = time.monotonic()
+        close_start = time.perf_counter()
+        self.sink.close()
+        self.close_time = time.perf_counter() - close_start
+        return self.stats()
+
+    def stats(self):
+        elapsed = (self.stop_time or time.monotonic()) - self.start_time
+        return {
+            "capture_time": elapsed,
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "dropped_blocks": self.dropped,
+            "dropped_samples": self.dropped_samples,
+            "overflows": self.overflows,
+            "samples_per_second": self.samples / elapsed if elapsed > 0 else 0.0,
+            "bytes_written": self.sink.bytes_written,
+            "read_time": self.read_time,
+            "process_time": self.work_time - self.sink.write_time,
+            "write_time": self.sink.write_time,
+            "close_time": self.close_time,
+            "error": str(self.error) if self.error else None,
+            **self.sink.summary(),
+        }
+
+
+def consume(ring, make_sink, role, inbox, outbox, parent_pid):
+    """Consumer process of a ProcessPipeline: feeds ring slots to one sink per capture.
+
+    Every slot is released back to the engine whether or not the sink took it,
+    so a failed sink never starves the reader; its error is reported on close.
+    Exits when told to or when the engine process has gone away.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The engine decides when to stop
+    sink = error = preview = None
+    samples = blocks = 0
+    work_time = 0.0
+    while True:
+        try:
+            message = inbox.get(timeout=1.0)
+        except queue.Empty:
+            if os.getppid() != parent_pid:
+                return
+            continue
+        if message is None:
+            return
+        if message[0] == "block":
+            _, slot, count = message
+            if sink is not None and error is None:
+                work_start = time.perf_counter()
+                try:
+                    sink.write(ring.blocks[slot, :count])
+                except Exception as e:
+                    error = e
+                work_time += time.perf_counter() - work_start
+                samples += count
+                blocks += 1
+                if sink.preview is not preview:
+                    preview = sink.preview
+                    outbox.put(("preview", preview))
+            outbox.put(slot)
+        elif message[0] == "open":
+            _, path, center_freq = message
+            sink = error = preview = None
+            samples = blocks = 0
+            work_time = 0.0
+            try:
+                sink = make_sink(path, center_freq, role)
+            except Exception as e:
+                error = e
+        elif message[0] == "close":
+            close_start = time.perf_counter()
+            if sink is not None:
+                try:
+                    sink.close()
+                except Exception as e:
+                    error = error or e
+            outbox.put(("closed", {
+                "samples": samples,
+                "blocks": blocks,
+                "work_time": work_time,
+                "write_time": sink.write_time if sink is not None else 0.0,
+                "close_time": time.perf_counter() - close_start,
+                "bytes_written": sink.bytes_written if sink is not None else 0,
+                "error": f"{role} process: {error}" if error else None,
+                "summary": sink.summary() if sink is not None else {},
+            }))
+            sink = None
+
+
+class ProcessPipeline:
+    """Streams blocks from a source to sinks in separate processes through a SharedRing.
+
+    Only the reader stays in the engine process. It fills ring slots in place
+    and sends each slot number to every consumer process, whose sink reads the
+    block through a NumPy view of the shared memory, so capture, processing and
+    file writing each get a core and an interpreter of their own and samples
+    are never copied or pickled. There is one consumer per sink role (see
+    sink_roles). The consumers are forked once, before the source opens the
+    device, and persist across captures: open() starts each capture's sinks
+    and stop() closes them. As in Pipeline, a block read while every slot is
+    still held is dropped and counted, here with the samples lost and the
+    ring's high-water mark.
+    """
+
+    def __init__(self, make_sink, roles=("all",), block_size=65536, slots=32):
+        self.block_size = block_size
+        self.ring = SharedRing(slots, block_size, consumers=len(roles))
+        self.spare = np.empty(block_size, dtype=np.complex64)
+        context = multiprocessing.get_context("fork")
+        self.outbox = context.Queue()
+        self.inboxes = [context.Queue() for _ in roles]
+        self.processes = [context.Process(target=consume, args=(self.ring, make_sink, role, inbox, self.outbox, os.getpid()),
+                                          name=f"flowgraph-{role}", daemon=True)
+                          for role, inbox in zip(roles, self.inboxes)]
+        for process in self.processes:
+            process.start()
+        self.closed = queue.Queue()
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+        self.source = None
+        self.running = threading.Event()
+        self.thread = None
+        self.error = None
+        self.latest_preview = None
+        self.results = []
+
+    @property
+    def preview(self):
+        return self.latest_preview
+
+    def collect(self):
+        """Returns released slots to the ring and routes the consumers' other messages."""
+        while True:
+            message = self.outbox.get()
+            if message is None:
+                return
+            if isinstance(message, int):
+                self.ring.release(message)
+            elif message[0] == "preview":
+                self.latest_preview = message[1]
+            else:
+                self.closed.put(message[1])
+
+    def open(self, source, path, center_freq):
+        """Prepares a capture from source into path; start() begins reading."""
+        self.source = source
+        self.error = None
+        self.latest_preview = None
+        self.results = []
+        self.dropped_samples = 0
+        self.overflows = 0
+        self.read_time = 0.0
+        self.close_time = 0.0
+        self.start_time = None
+        self.stop_time = None
+        self.ring.reset_stats()
+        for inbox in self.inboxes:
+            inbox.put(("open", path, center_freq))
+
+    def start(self):
+        self.running.set()
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self.read_loop, daemon=True)
+        self.thread.start()
+
+    def read_loop(self):
+        overflows_before = self.source.overflows
+        try:
+            while self.running.is_set():
+                slot = self.ring.acquire()
+                if slot is None:
+                    # Keep the device drained even though the block will be dropped
+                    self.dropped_samples += self.source.read_into(self.spare)
+                    continue
+                read_start = time.perf_counter()
+                count = self.source.read_into(self.ring.blocks[slot])
+                self.read_time += time.perf_counter() - read_start
+                if not count:
+                    self.ring.abandon(slot)
+                    continue
+                self.ring.publish(slot)
+                for inbox in self.inboxes:
+                    inbox.put(("block", slot, count))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.overflows = self.source.overflows - overflows_before
+
+    def stop(self):
+        """Stops reading, waits for every consumer to close its sink and returns the statistics."""
+        self.running.clear()
+        self.thread.join()
+        self.stop_time = time.monotonic()
+        close_start = time.perf_counter()
+        for inbox in self.inboxes:
+            inbox.put(("close",))
+        while len(self.results) < len(self.processes):
+            try:
+                self.results.append(self.closed.get(timeout=1.0))
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    self.error = self.error or RuntimeError("A capture consumer process exited")
+                    break
+        self.close_time = time.perf_counter() - close_start
+        return self.stats()
+
+    def stats(self):
+        elapsed = (self.stop_time or time.monotonic()) - self.start_time
+        results = self.results or [{}]
+        samples = min(result.get("samples", 0) for result in results)
+        errors = [str(self.error)] if self.error else []
+        errors += [result["error"] for result in results if result.get("error")]
+        summary = {}
+        for result in results:
+            summary.update(result.get("summary", {}))
+        return {
+            "capture_time": elapsed,
+            "samples": samples,
+            "blocks": min(result.get("blocks", 0) for result in results),
+            "dropped_blocks": self.ring.overflows,
+            "dropped_samples": self.dropped_samples,
+            "overflows": self.overflows,
+            "ring_slots": self.ring.slots,
+            "ring_high_water": self.ring.high_water,
+            "samples_per_second": samples / elapsed if elapsed > 0 else 0.0,
+            "bytes_written": sum(result.get("bytes_written", 0) for result in results),
+            "read_time": self.read_time,
+            "process_time": sum(result.get("work_time", 0.0) - result.get("write_time", 0.0) for result in results),
+            "write_time": sum(result.get("write_time", 0.0) for result in results),
+            "close_time": self.close_time,
+            "error": "; ".join(errors) or None,
+            **summary,
+        }
+
+    def close(self):
+        """Shuts the consumer processes down and frees the shared memory."""
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.outbox.put(None)
+        self.collector.join()
+        self.ring.close()
+
+
+class CaptureEngine:
+    """Long-lived capture engine that is retuned between sweep steps.
+
+    Captures run in a Pipeline of threads, or in processes when given a
+    ProcessPipeline, which is reused for every capture. A capture started with
+    a profile path is sampled by a StackSampler until it stops, and the
+    collapsed stacks are written there.
+    """
+
+    def __init__(self, source, make_sink, block_size=65536, processes=None):
+        self.source = source
+        self.make_sink = make_sink
+        self.block_size = block_size
+        self.processes = processes
+        self.pipeline = None
+        self.sampler = None
+        self.profile = None
+
+    def tune(self, center_freq, output_file, profile=None):
+        """Stops any running capture, retunes and starts capturing into output_file."""
+        self.stop()
+        if profile:
+            self.sampler = StackSampler().start()
+            self.profile = profile
+        self.source.tune(center_freq)
+        if self.processes is not None:
+            self.processes.open(self.source, output_file, center_freq)
+            self.pipeline = self.processes
+        else:
+            self.pipeline = Pipeline(self.source, self.make_sink(output_file, center_freq), block_size=self.block_size)
+        self.pipeline.start()
+        return {"center_freq": center_freq}
+
+    def preview(self, since=0.0):
+        """Returns the current capture's latest preview frame if it is newer than since."""
+        frame = self.pipeline.preview if self.pipeline is not None else None
+        if frame is None or frame["time"] <= since:
+            return {"frame": None}
+        return {"frame": frame}
+
+    def stop(self):
+        """Stops the running capture and returns its statistics."""
+        if self.pipeline is None:
+            return {"capture_time": 0.0}
+        stats = self.pipeline.stop()
+        self.pipeline = None
+        if self.sampler is not None:
+            stats["profile"] = self.sampler.write(self.profile)
+            self.sampler = None
+        return stats
+
+    def close(self):
+        self.stop()
+        if self.processes is not None:
+            self.processes.close()
+        self.source.close()
+
+
+def parse_tones(text):
+    """Parses 'freq:power_db,freq:power_db' into a list of tone tuples."""
+    tones = []
+    for item in filter(None, text.split(",")):
+        freq, _, power = item.partition(":")
+        tones.append((float(freq), float(power or 20)))
+    return tones
+
+
+def create_source(args):
+    """Creates the sample source selected on the command line."""
+    if args.source == "soapy":
+        return SoapySource(args.sampling_rate, args.bandwidth, device=args.device, gain=args.gain)
+    return SyntheticSource(args.sampling_rate, args.bandwidth, tones=parse_tones(args.tones), seed=args.seed,
+                           block_size=args.block_size, throttle=not args.no_throttle)
+
+
+def sink_roles(args):
+    """Sinks a ProcessPipeline runs in processes of their own.
+
+    Raw IQ with detection is stored by one process and integrated by another,
+    so file writes and FFTs use separate cores; otherwise one sink does both.
+    """
+    if args.product == "iq" and args.detect:
+        return ("store", "analyse")
+    return ("all",)
+
+
+def create_sink_factory(args):
+    """Returns a function creating the sink selected on the command line for an output file.
+
+    The role picks one of the sinks from sink_roles; "all" is the single sink
+    a threaded Pipeline uses.
+    """
+    def make_integrator(kurtosis):
+        return SpectrumIntegrator(args.sampling_rate, fft_size=args.fft_size, window=args.window,
+                                  overlap=args.overlap, integration_time=args.integration_time,
+                                  max_hold=args.max_hold, kurtosis=kurtosis)
+
+    def make_detector(integrator, center_freq):
+        if not args.detect:
+            return None
+        return RFIDetector(integrator.frequencies(center_freq), integrator.integration_interval,
+                           n_sigma=args.n_sigma, sk_sigma=args.sk_sigma)
+
+    def make_channel_stats(integrator, center_freq):
+        if not args.occupancy or integrator is None:
+            return None
+        return ChannelStats(integrator.frequencies(center_freq), center_freq, args.bandwidth, args.n_sigma)
+
+    def make_sink(path, center_freq, role="all"):
+        if role == "store":
+            return FileSink(path, center_freq, args.sampling_rate, args.bandwidth)
+        if role == "analyse":
+            integrator = make_integrator(kurtosis=True)
+            return AnalysisSink(path, center_freq, args.sampling_rate, args.bandwidth, integrator,
+                                make_detector(integrator, center_freq), args.preview_bins,
+                                make_channel_stats(integrator, center_freq))
+        if args.product == "iq":
+            integrator = make_integrator(kurtosis=True) if args.detect else None
+            detector = make_detector(integrator, center_freq) if args.detect else None
+            return FileSink(path, center_freq, args.sampling_rate, args.bandwidth, integrator, detector,
+                            args.preview_bins, make_channel_stats(integrator, center_freq))
+        integrator = make_integrator(args.kurtosis)
+        return SpectrumSink(path, center_freq, args.sampling_rate, args.bandwidth, integrator,
+                            make_detector(integrator, center_freq), args.preview_bins,
+                            make_channel_stats(integrator, center_freq))
+    return make_sink
+
+
+def serve(engine, commands=sys.stdin, replies=sys.stdout):
+    """Serves JSON line commands from the scheduler until told to quit."""
+    for line in commands:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            cmd = request.get("cmd")
+            if cmd == "tune":
+                reply = engine.tune(float(request["center_freq"]), request["output_file"], request.get("profile"))
+            elif cmd == "stop":
+                reply = engine.stop()
+            elif cmd == "preview":
+                reply = engine.preview(float(request.get("since", 0.0)))
+            elif cmd == "quit":
+                engine.close()
+                replies.write(json.dumps({"ok": True}) + "\n")
+                replies.flush()
+                return
+            else:
+                raise ValueError(f"Unknown command: {cmd}")
+            reply["ok"] = True
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+    engine.close()
+
 
 def main():
-    print("Script Name:", sys.argv[0])
-    print("Arguments:")
-    for i, arg in enumerate(sys.argv[1:], start=1):
-        print(f"Argument {i}: {arg}")
+    parser = argparse.ArgumentParser(description="SDR capture flowgraph.")
+    parser.add_argument("--center_freq", type=float, help="Center frequency in Hz")
+    parser.add_argument("--sampling_rate", type=float, required=True, help="Sampling rate in Hz")
+    parser.add_argument("--bandwidth", type=float, required=True, help="Bandwidth in Hz")
+    parser.add_argument("--output_file", help="Output file path")
+    parser.add_argument("--control", action="store_true", help="Run as a persistent engine controlled over stdin/stdout")
+    parser.add_argument("--source", choices=["synthetic", "soapy"], default="synthetic", help="Sample source")
+    parser.add_argument("--device", default="", help="SoapySDR device arguments")
+    parser.add_argument("--gain", type=float, help="Receiver gain in dB")
+    parser.add_argument("--tones", default="", help="Synthetic tones as freq:power_db,...")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic source random seed")
+    parser.add_argument("--no_throttle", action="store_true", help="Run the synthetic source as fast as possible")
+    parser.add_argument("--block_size", type=int, default=65536, help="Samples per block")
+    parser.add_argument("--duration", type=float, help="Capture duration in seconds (default: until terminated)")
+    parser.add_argument("--product", choices=["iq", "spectra"], default="spectra", help="Write raw IQ or integrated spectra")
+    parser.add_argument("--fft_size", type=int, default=1024, help="FFT size for spectra")
+    parser.add_argument("--window", default="hann", help="FFT window (rect, hann, hamming, blackman)")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Fractional overlap between FFT frames")
+    parser.add_argument("--integration_time", type=float, default=1.0, help="Seconds of data averaged per spectrum")
+    parser.add_argument("--max_hold", action="store_true", help="Also write max-hold spectra")
+    parser.add_argument("--kurtosis", action="store_true", help="Also write spectral kurtosis spectra")
+    parser.add_argument("--detect", action="store_true", help="Run RFI detection and append events to events.jsonl")
+    parser.add_argument("--n_sigma", type=float, default=6.0, help="Detection threshold in robust sigmas above the median")
+    parser.add_argument("--sk_sigma", type=float, default=5.0, help="Spectral kurtosis threshold in sigmas")
+    parser.add_argument("--preview_bins", type=int, default=PREVIEW_BINS, help="Channels per live preview frame")
+    parser.add_argument("--occupancy", action="store_true", help="Report per-channel power and duty cycle for the occupancy database")
+    parser.add_argument("--processes", action="store_true", help="Process and write blocks in separate processes fed through shared memory")
+    parser.add_argument("--ring_slots", type=int, default=32, help="Blocks the shared memory ring holds with --processes")
+    args = parser.parse_args()
+
+    make_sink = create_sink_factory(args)
+    processes = None
+    if args.processes:
+        # Fork the consumers before the source opens the device or starts any threads
+        processes = ProcessPipeline(make_sink, sink_roles(args), block_size=args.block_size, slots=args.ring_slots)
+    engine = CaptureEngine(create_source(args), make_sink, block_size=args.block_size, processes=processes)
+    if args.control:
+        serve(engine)
+        return
+
+    if args.center_freq is None or args.output_file is None:
+        parser.error("--center_freq and --output_file are required without --control")
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    engine.tune(args.center_freq, args.output_file)
+    print(f"Capturing at {args.center_freq} Hz into {args.output_file}")
+    try:
+        if args.duration is None:
+            while True:
+                time.sleep(1)
+        else:
+            time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats = engine.stop()
+        engine.close()
+        print(f"Samples: {stats['samples']}, rate: {stats['samples_per_second'] / 1e6:.2f} MS/s, "
+              f"dropped blocks: {stats['dropped_blocks']} ({stats['dropped_samples']} samples), overflows: {stats['overflows']}, "
+              f"bytes written: {stats['bytes_written']} ({stats['samples'] * 8} bytes of IQ)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
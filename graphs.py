@@ -0,0 +1,142 @@
+import numpy as np
+from PyQt5 import sip
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPolygonF, qRgb
+
+from preview import decode_frame, max_decimate
+
+
+def waterfall_colors():
+    """256-entry dark blue to yellow colour table for the indexed waterfall image."""
+    anchors = np.array([[0, 0, 40], [30, 60, 160], [0, 170, 170], [120, 220, 60], [255, 240, 0]], dtype=float)
+    positions = np.linspace(0, 255, len(anchors))
+    levels = np.arange(256)
+    rgb = np.stack([np.interp(levels, positions, anchors[:, channel]) for channel in range(3)], axis=1).astype(int)
+    return [qRgb(*color) for color in rgb]
+
+
+class SpectrumPanel(QWidget):
+    """Live spectrum trace above a scrolling waterfall of the whole swept span.
+
+    Preview frames are painted into a span-wide row at their band's columns;
+    when a band comes round again the row is pushed into the waterfall, as in
+    waterfall.py. The waterfall is a preallocated uint8 ring buffer wrapped by
+    one indexed QImage, so a new row is a single array write, and repaints are
+    coalesced to at most max_fps.
+    """
+
+    def __init__(self, columns=1024, rows=300, max_fps=10, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.rows = rows
+        self.span = None
+        self.current = np.zeros(columns, dtype=np.float32)
+        self.filled = np.zeros(columns, dtype=bool)
+        self.seen = np.zeros(columns, dtype=bool)
+        self.ring = np.zeros((rows, columns), dtype=np.uint8)
+        self.head = 0
+        self.level_lo = None
+        self.level_hi = None
+        self.x = np.arange(columns, dtype=float)
+        # Wraps the ring's memory without copying, so row writes show up in the image directly
+        self.image = QImage(sip.voidptr(self.ring.ctypes.data), columns, rows, columns, QImage.Format_Indexed8)
+        self.image.setColorTable(waterfall_colors())
+        self.dirty = False
+        self.setMinimumHeight(240)
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render_if_dirty)
+        self.render_timer.start(int(1000 / max_fps))
+
+    def set_span(self, freq_lo, freq_hi):
+        """Sets the swept frequency range; a new range clears the view."""
+        if self.span == (freq_lo, freq_hi) or freq_hi <= freq_lo:
+            return
+        self.span = (freq_lo, freq_hi)
+        self.current[:] = 0
+        self.filled[:] = False
+        self.seen[:] = False
+        self.ring[:] = 0
+        self.level_lo = self.level_hi = None
+        self.dirty = True
+
+    def add_frame(self, frame):
+        """Paints one preview frame into the current row."""
+        if self.span is None:
+            return
+        freq_lo, freq_hi, power_db = decode_frame(frame)
+        span_lo, span_hi = self.span
+        scale = self.columns / (span_hi - span_lo)
+        start = min(self.columns, max(0, int((freq_lo - span_lo) * scale)))
+        stop = min(self.columns, max(start + 1, int((freq_hi - span_lo) * scale)))
+        width = stop - start
+        if start >= self.columns or width <= 0:
+            return
+        if len(power_db) >= width:
+            values = max_decimate(power_db, width)
+        else:
+            values = power_db[np.arange(width) * len(power_db) // width]
+
+        if self.filled[start:stop].any():
+            self.push_row()
+        self.current[start:stop] = values
+        self.filled[start:stop] = True
+        self.seen[start:stop] = True
+        self.track_levels(values)
+        self.dirty = True
+
+    def track_levels(self, values):
+        # Slowly follow the noise floor and the peaks so the colours stay comparable between rows
+        lo, hi = float(np.percentile(values, 5)), float(values.max())
+        if self.level_lo is None:
+            self.level_lo, self.level_hi = lo, max(hi, lo + 10)
+            return
+        self.level_lo += 0.1 * (lo - self.level_lo)
+        self.level_hi = max(self.level_lo + 10, self.level_hi + 0.1 * (hi - self.level_hi))
+
+    def push_row(self):
+        """Quantises the current row into the ring; rows are written backwards so the newest is drawn on top."""
+        self.head = (self.head - 1) % self.rows
+        levels = (self.current - self.level_lo) / (self.level_hi - self.level_lo)
+        self.ring[self.head] = np.where(self.seen, np.clip(levels * 255, 0, 255), 0).astype(np.uint8)
+        self.filled[:] = False
+
+    def render_if_dirty(self):
+        if self.dirty:
+            self.dirty = False
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.span is None or self.level_lo is None:
+            painter.setPen(Qt.gray)
+            painter.drawText(self.rect(), Qt.AlignCenter, "Waiting for spectrum frames...")
+            return
+        trace_height = self.height() // 3
+        self.paint_trace(painter, QRectF(0, 0, self.width(), trace_height))
+        self.paint_waterfall(painter, QRectF(0, trace_height, self.width(), self.height() - trace_height))
+        painter.setPen(Qt.white)
+        painter.drawText(4, 14, f"{self.span[0] / 1e6:.3f} MHz")
+        painter.drawText(QRectF(0, 0, self.width() - 4, 20), Qt.AlignRight,
+                         f"{self.span[1] / 1e6:.3f} MHz   {self.level_lo:.0f} to {self.level_hi:.0f} dB")
+
+    def paint_trace(self, painter, rect):
+        levels = np.clip((self.current - self.level_lo) / (self.level_hi - self.level_lo), 0, 1)
+        xs = rect.left() + self.x * rect.width() / self.columns
+        ys = rect.bottom() - levels * rect.height()
+        painter.setPen(QPen(QColor(255, 240, 0), 1))
+        polyline = QPolygonF()
+        for column in np.flatnonzero(self.seen):
+            polyline.append(QPointF(xs[column], ys[column]))
+        painter.drawPolyline(polyline)
+
+    def paint_waterfall(self, painter, rect):
+        # The ring's newest row is at head: draw head..end above 0..head
+        newer = self.rows - self.head
+        row_height = rect.height() / self.rows
+        painter.drawImage(QRectF(rect.left(), rect.top(), rect.width(), newer * row_height), self.image,
+                          QRectF(0, self.head, self.columns, newer))
+        if self.head:
+            painter.drawImage(QRectF(rect.left(), rect.top() + newer * row_height, rect.width(), self.head * row_height),
+                              self.image, QRectF(0, 0, self.columns, self.head))
@@ -1,56 +1,70 @@
-import paramiko
 import subprocess
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QComboBox, QPushButton, QInputDialog, QMessageBox, QTextEdit
+    QLineEdit, QComboBox, QPushButton, QInputDialog, QMessageBox, QTextEdit, QPlainTextEdit
 )
 from PyQt5.QtCore import Qt
 import threading
 import os
 import signal
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QTimer, pyqtSignal
 import re
+import json
 
-class WorkerThread(QThread):
-    # Define signals for success and error handling
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def __init__(self, command, ssh_client):
-        super().__init__()
-        self.command = command
-        self.ssh_client = ssh_client
-
-    def run(self):
-        try:
-            stdin, stdout, stderr = self.ssh_client.exec_command(self.command)
-            output = stdout.read().decode().strip()
-            error = stderr.read().decode().strip()
-
-            if output:
-                self.finished.emit(f"Command Output: {output}")
-            if error:
-                self.error.emit(f"Command Error: {error}")
-            if not error and not output:
-                self.finished.emit("Scheduler process started successfully on the remote server.")
-        except Exception as e:
-            self.error.emit(f"Error executing the command: {e}")
+from ssh_manager import (
+    SSHConnectionManager, RemoteLogTail, running_instances_command, parse_running_instances, kill_command,
+    parse_log_line
+)
+from status_server import DEFAULT_PORT as STATUS_PORT
+from graphs import SpectrumPanel
+from sweep_plan import compile_plan, describe_plan
 
+SERVER_HOST = "172.27.155.167"
+SERVER_USER = "sdr-user"
+LIVE_LOG_MAX_LINES = 5000  # Older lines are dropped so multi-day runs keep GUI memory bounded
+LIVE_LOG_FLUSH_MS = 250  # Tailed lines are appended in one batch per interval
+STATUS_POLL_MS = 2000  # One small request over the SSH transport per interval, never a ps call
+SPECTRUM_POLL_MS = 500  # Preview frames are a few hundred bytes each, so this stays in the kB/s range
+REMOTE_PLAN_PATH = "Desktop/Data/plan.json"  # Relative to the home directory, where SFTP starts; outside the code checkout
 
 
 class SDRControlGUI(QWidget):
+    # Results of background SSH work, delivered on the UI thread
+    command_finished = pyqtSignal(object, object, bool)
+    login_finished = pyqtSignal(object)
+    log_lines = pyqtSignal(list)
+    status_received = pyqtSignal(object)
+    instance_status = pyqtSignal(object, object)
+    spectrum_received = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SDR Control Panel")
         self.setGeometry(100, 100, 800, 600)
 
 
-        # SSH client
-        self.ssh_client = None
+        # SSH connection manager
+        self.ssh_manager = None
         self.log_thread = None
         self.stop_log = threading.Event()
-        self.ssh_client = None  # Initialize ssh_client to None at the start
         self.is_logged_in = False
+        self.command_finished.connect(self.on_command_finished)
+        self.login_finished.connect(self.on_login_finished)
+        self.log_lines.connect(self.queue_live_log_lines)
+        self.pending_live_lines = []
+        self.live_log_timer = QTimer(self)
+        self.live_log_timer.timeout.connect(self.flush_live_log)
+        self.live_log_timer.start(LIVE_LOG_FLUSH_MS)
+        self.status_received.connect(self.on_status_received)
+        self.instance_status.connect(self.handle_status_instance)
+        self.status_pending = False
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.poll_status)
+        self.spectrum_received.connect(self.on_spectrum_received)
+        self.spectrum_pending = False
+        self.spectrum_seq = 0
+        self.spectrum_timer = QTimer(self)
+        self.spectrum_timer.timeout.connect(self.poll_spectrum)
 
         # Main layout
         self.main_layout = QVBoxLayout()
@@ -92,6 +106,14 @@ class SDRControlGUI(QWidget):
         bw_layout.addWidget(self.bw_input)
         bw_layout.addWidget(self.bw_unit)
         self.main_layout.addLayout(bw_layout)
+
+        # Band overlap input section
+        overlap_layout = QHBoxLayout()
+        self.overlap_label = QLabel("Band Overlap (%):")
+        self.overlap_input = QLineEdit("0")
+        overlap_layout.addWidget(self.overlap_label)
+        overlap_layout.addWidget(self.overlap_input)
+        self.main_layout.addLayout(overlap_layout)
         
         # Sampling rate input section
         sr_layout = QHBoxLayout()
@@ -142,6 +164,19 @@ class SDRControlGUI(QWidget):
         self.stream_button.clicked.connect(self.apply_changes)
         self.main_layout.addWidget(self.stream_button, alignment=Qt.AlignCenter)
 
+        # Resume button, continuing an interrupted run from its checkpoint
+        self.resume_button = QPushButton("Resume")
+        self.resume_button.clicked.connect(self.resume_observation)
+        self.main_layout.addWidget(self.resume_button, alignment=Qt.AlignCenter)
+
+        # Scheduler progress, refreshed from the status endpoint
+        self.status_label = QLabel("Scheduler status: not connected")
+        self.main_layout.addWidget(self.status_label)
+
+        # Live spectrum and waterfall of the swept range
+        self.spectrum_panel = SpectrumPanel()
+        self.main_layout.addWidget(self.spectrum_panel)
+
         # Log box
         log_boxes_layout = QHBoxLayout()
 
@@ -162,6 +197,14 @@ class SDRControlGUI(QWidget):
         self.log_box.setPlaceholderText("General Log Viewer")  # Optional placeholder text
         log_boxes_layout.addWidget(self.log_box)
 
+        # Live log box, following the scheduler's log.txt on the server
+        self.live_log_box = QPlainTextEdit()
+        self.live_log_box.setReadOnly(True)
+        self.live_log_box.setStyleSheet("background-color: #f4f4f4; color: black;")
+        self.live_log_box.setPlaceholderText("Live Log Viewer")
+        self.live_log_box.setMaximumBlockCount(LIVE_LOG_MAX_LINES)
+        log_boxes_layout.addWidget(self.live_log_box)
+
         # Add the log boxes layout to the main layout
         self.main_layout.addLayout(log_boxes_layout)
         # Set main layout
@@ -180,35 +223,133 @@ class SDRControlGUI(QWidget):
         # Prompt user for server password
         password, ok = QInputDialog.getText(self, "Login", "Enter server password:", QLineEdit.Password)
         if ok and password:
-            try:
-                self.ssh_client = paramiko.SSHClient()
-                self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                self.ssh_client.connect("172.27.155.167", username="sdr-user", password=password)
-                self.is_logged_in = True  # Set the flag to True once logged in successfully
-                self.log_message("Login successful!")
-            except Exception as e:
-                self.log_message(f"Error logging into server: {e}")
+            # Connect off the UI thread; on_login_finished reports the result
+            self.ssh_manager = SSHConnectionManager(SERVER_HOST, SERVER_USER, password)
+            future = self.ssh_manager.executor.submit(self.ssh_manager.connect)
+            future.add_done_callback(self.login_finished.emit)
+            self.log_message("Logging in...")
         else:
             self.log_message("Login canceled or no password entered.")
-    
-    def execute_command(self, command):
-        if self.ssh_client:
-            try:
-                self.log_message(f"Executing command: {command}")
-                stdin, stdout, stderr = self.ssh_client.exec_command(command)
-                output = stdout.read().decode().strip()
-                error = stderr.read().decode().strip()
-                if output:
-                    self.log_message(f"Command Output: {output}")
-                if error:
-                    self.log_message(f"Command Error: {error}")
-                return output, error
-            except Exception as e:
-                self.log_message(f"Command execution failed: {e}")
-                return None, str(e)
-        else:
+
+    def on_login_finished(self, future):
+        try:
+            future.result()
+        except Exception as e:
+            self.log_message(f"Error logging into server: {e}")
+            self.ssh_manager.close()
+            self.ssh_manager = None
+            return
+        self.is_logged_in = True  # Set the flag to True once logged in successfully
+        self.log_message("Login successful!")
+        self.start_log_tail()
+        self.status_timer.start(STATUS_POLL_MS)
+        self.spectrum_timer.start(SPECTRUM_POLL_MS)
+        self.poll_status()
+
+    def start_log_tail(self):
+        """Follows the remote log.txt on a background thread feeding the live log box."""
+        self.stop_log.clear()
+        tail = RemoteLogTail(self.ssh_manager)
+        self.log_thread = threading.Thread(target=tail.run, args=(self.stop_log, self.log_lines.emit),
+                                           kwargs={"on_error": lambda message: self.log_lines.emit([message])}, daemon=True)
+        self.log_thread.start()
+
+    def queue_live_log_lines(self, lines):
+        self.pending_live_lines.extend(lines)
+        # Never hold more than the box can show
+        del self.pending_live_lines[:-LIVE_LOG_MAX_LINES]
+
+    def flush_live_log(self):
+        """Appends all pending lines in one edit so repaints happen once per batch."""
+        if not self.pending_live_lines:
+            return
+        formatted = []
+        for line in self.pending_live_lines:
+            timestamp, message, _ = parse_log_line(line)
+            formatted.append(f"{timestamp} {message}" if timestamp else message)
+        self.pending_live_lines = []
+        self.live_log_box.appendPlainText("\n".join(formatted))
+        scrollbar = self.live_log_box.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+    def poll_status(self):
+        """Requests the scheduler status in the background unless a request is still in flight."""
+        if not self.ssh_manager or self.status_pending:
+            return
+        self.status_pending = True
+        future = self.ssh_manager.submit_status(STATUS_PORT)
+        future.add_done_callback(self.status_received.emit)
+
+    def on_status_received(self, future):
+        self.status_pending = False
+        try:
+            status = future.result()
+        except Exception as e:
+            self.status_label.setText(f"Scheduler status: unavailable ({e})")
+            return
+        self.status_label.setText(self.format_status(status) if status else "Scheduler status: no scheduler running")
+        if status:
+            self.spectrum_panel.set_span(status["freq_lo"], status["freq_hi"])
+
+    def poll_spectrum(self):
+        """Requests the preview frames newer than the last one received."""
+        if not self.ssh_manager or self.spectrum_pending:
+            return
+        self.spectrum_pending = True
+        future = self.ssh_manager.submit_status(STATUS_PORT, f"/spectrum?since={self.spectrum_seq}")
+        future.add_done_callback(self.spectrum_received.emit)
+
+    def on_spectrum_received(self, future):
+        self.spectrum_pending = False
+        try:
+            reply = future.result()
+        except Exception:
+            return  # The status poll reports connection problems
+        if not reply:
+            return
+        self.spectrum_seq = reply["seq"]
+        for frame in reply["frames"]:
+            self.spectrum_panel.add_frame(frame)
+
+    def format_status(self, status):
+        lines = [f"Scheduler PID {status['pid']}: {status['elapsed'] / 60:.1f} min elapsed, "
+                 f"{status['remaining'] / 60:.1f} min remaining, {status['bytes_written'] / 1e6:.1f} MB written, "
+                 f"{status['disk_free'] / 1e9:.1f} GB free"]
+        for worker, fields in sorted(status["workers"].items()):
+            if "band" not in fields:
+                continue
+            line = (f"Worker {worker}: {fields['band'] / 1e6:.3f} MHz, pass {fields['sweep_pass'] + 1}, "
+                    f"step {fields['step_in_pass'] + 1}/{fields['steps_per_pass']}")
+            if "dwell_efficiency" in fields:
+                line += f", dwell efficiency {fields['dwell_efficiency']:.1%}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def execute_command(self, command, callback=None, log=True):
+        """Runs a command on the server in the background; callback(output, error) runs on the UI thread."""
+        if not self.ssh_manager:
             self.log_message("Not logged in. Please log in first.")
-            return None, "No SSH connection"
+            if callback:
+                callback(None, "No SSH connection")
+            return
+        if log:
+            self.log_message(f"Executing command: {command}")
+        future = self.ssh_manager.submit(command)
+        future.add_done_callback(lambda done: self.command_finished.emit(done, callback, log))
+
+    def on_command_finished(self, future, callback, log):
+        try:
+            output, error = future.result()
+        except Exception as e:
+            self.log_message(f"Command execution failed: {e}")
+            output, error = None, str(e)
+        else:
+            if log and output:
+                self.log_message(f"Command Output: {output}")
+            if log and error:
+                self.log_message(f"Command Error: {error}")
+        if callback:
+            callback(output, error)
 
     def execute_user_command(self):
         command = self.command_input.text().strip()
@@ -241,54 +382,65 @@ class SDRControlGUI(QWidget):
             raise ValueError("Invalid unit selected.")
     
     def closeEvent(self, event):
+        self.status_timer.stop()
+        self.spectrum_timer.stop()
         self.stop_log.set()
         if self.log_thread:
             self.log_thread.join()
-        if self.ssh_client:
+        if self.ssh_manager:
             self.log_message("Closing SSH connection...")
-            self.ssh_client.close()
+            self.ssh_manager.close()
         event.accept()
 
 
     def extract_info(self, log_line):
-        # Regular expression pattern to extract the required information
-        pattern = re.compile(r"PID: (\d+), Running Time: ([\d:]+), Command: python3 .+ --start_freq (\d+\.\d+) --end_freq (\d+\.\d+) --bandwidth (\d+\.\d+) --sampling_rate ([\d\.]+) --observation_time ([\d\.]+) --observation_interval ([\d\.]+)")
-        
-        # Match the log line against the pattern
-        match = pattern.search(log_line)
-        
-        if match:
-            pid = match.group(1)
-            running_time = match.group(2)
-            start_freq = match.group(3)
-            end_freq = match.group(4)
-            bandwidth = match.group(5)
-            sample_rate = match.group(6)
-            observation_time = match.group(7)
-            observation_interval = match.group(8)
-
-            # Format the output
-            formatted_string = f"Process ID: {pid}\n" \
-                            f"Running Time: {running_time}\n" \
-                            f"Start Frequency: {start_freq} Hz\n" \
-                            f"End Frequency: {end_freq} Hz\n" \
-                            f"Bandwidth: {bandwidth} Hz\n" \
-                            f"Sample Rate: {sample_rate} Hz\n" \
-                            f"Observation Time: {observation_time} seconds\n" \
-                            f"Observation Interval: {observation_interval} seconds"
-            return formatted_string
-        else:
-            return "No match found in the log line."
+        """Formats the ps details of running schedulers for the kill dialog.
+
+        Options are read from each command line whatever their order, so runs
+        started with --plan or --resume are described too; a line that cannot
+        be parsed is shown as it is.
+        """
+        labels = {
+            "plan": ("Plan", ""), "start_freq": ("Start Frequency", " Hz"), "end_freq": ("End Frequency", " Hz"),
+            "bandwidth": ("Bandwidth", " Hz"), "sampling_rate": ("Sample Rate", " Hz"),
+            "observation_time": ("Observation Time", " seconds"), "observation_interval": ("Observation Interval", " seconds"),
+        }
+        pattern = re.compile(r"PID: (\d+), Running Time: ([\d:-]+), Command: (.+)")
+        descriptions = []
+        for line in log_line.splitlines():
+            match = pattern.search(line)
+            if not match:
+                descriptions.append(line)
+                continue
+            pid, running_time, command = match.groups()
+            tokens = command.split()
+            lines = [f"Process ID: {pid}", f"Running Time: {running_time}"]
+            for index, token in enumerate(tokens):
+                if not token.startswith("--"):
+                    continue
+                name = token[2:]
+                has_value = index + 1 < len(tokens) and not tokens[index + 1].startswith("--")
+                value = tokens[index + 1] if has_value else ""
+                if name in labels:
+                    label, unit = labels[name]
+                    lines.append(f"{label}: {value}{unit}")
+                elif name == "resume":
+                    lines.append("Resumed from checkpoint")
+            if len(lines) == 2:
+                lines.append(f"Command: {command}")
+            descriptions.append("\n".join(lines))
+        return "\n\n".join(descriptions) or log_line
 
 
     from PyQt5.QtWidgets import QMessageBox
 
-    def ask_to_kill_process(self, process_info):
+    def ask_to_kill_process(self, process_info, process_string=None):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Question)
         msg.setText("A process is already running:")
 
-        process_string = self.extract_info(process_info)
+        if process_string is None:
+            process_string = self.extract_info(process_info)
         msg.setInformativeText(process_string)
         msg.setWindowTitle("Process Running")
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
@@ -312,52 +464,61 @@ class SDRControlGUI(QWidget):
         else:
             return False
 
-    def check_and_handle_running_instance(self):
-        # Check for running instance
-        command = 'ps aux | grep "python3 $HOME/Desktop/RFI/scheduler.py" | grep -v grep'
-        output, error = self.execute_command(command)
-        
+    def check_and_handle_running_instance(self, on_proceed):
+        """Asks the status endpoint whether a scheduler is running and calls on_proceed once it is safe to start.
+
+        Falls back to listing processes when the endpoint does not answer, which
+        also covers schedulers started with the endpoint disabled.
+        """
+        future = self.ssh_manager.submit_status(STATUS_PORT)
+        future.add_done_callback(lambda done: self.instance_status.emit(done, on_proceed))
+
+    def handle_status_instance(self, future, on_proceed):
+        try:
+            status = future.result()
+        except Exception:
+            status = None
+        if not status:
+            self.execute_command(running_instances_command(),
+                                 callback=lambda output, error: self.handle_running_instances(output, error, on_proceed))
+            return
+        if not self.ask_to_kill_process(None, self.format_status(status)):
+            self.log_message("Stream canceled by user.")
+            return
+        self.kill_instances([str(status["pid"])], on_proceed)
+
+    def handle_running_instances(self, output, error, on_proceed):
         if error:
             self.log_message(f"Error checking for running instances: {error}")
-            return False
-        
-        if output:
-            # Extract PID and elapsed time
-            lines = output.strip().split("\n")
-            process_info = []
-            for line in lines:
-                parts = line.split()
-                pid = parts[1]
-                
-                # Get elapsed time
-                elapsed_time_command = f"ps -o etime= -p {pid}"
-                elapsed_time_output, _ = self.execute_command(elapsed_time_command)
-                elapsed_time = elapsed_time_output.strip()
-
-                # (Optional) Parse command-line arguments from the running process
-                process_details = " ".join(parts[10:])
-                process_info.append(f"PID: {pid}, Running Time: {elapsed_time}, Command: {process_details}")
-            
-            # Show details and ask to kill
-            details = "\n".join(process_info)
-            if self.ask_to_kill_process(details):
-                for line in process_info:
-                    pid = line.split(",")[0].split(":")[1].strip()
-                    kill_command = f"kill -9 {pid}"
-                    _, kill_error = self.execute_command(kill_command)
-                    if kill_error:
-                        self.log_message(f"Error killing process {pid}: {kill_error}")
-                    else:
-                        self.log_message(f"Process {pid} killed.")
-                return True
-            else:
-                return False
-        else:
+            return
+
+        instances = parse_running_instances(output)
+        if not instances:
             self.log_message("No running instances found.")
-            return True
+            on_proceed()
+            return
+
+        # Show details and ask to kill
+        details = "\n".join(f"PID: {pid}, Running Time: {elapsed}, Command: {command}" for pid, elapsed, command in instances)
+        if not self.ask_to_kill_process(details):
+            self.log_message("Stream canceled by user.")
+            return
+
+        self.kill_instances([pid for pid, _, _ in instances], on_proceed)
+
+    def kill_instances(self, pids, on_proceed):
+        def killed(output, kill_error):
+            if kill_error:
+                self.log_message(f"Error killing processes {', '.join(pids)}: {kill_error}")
+                return
+            for pid in pids:
+                self.log_message(f"Process {pid} killed.")
+            on_proceed()
+
+        self.execute_command(kill_command(pids), callback=killed)
 
     def apply_changes(self):
-        if not self.ssh_client:
+        if not self.ssh_manager:
             self.log_message("Not logged in. Please log in first.")
             return
 
@@ -376,6 +537,7 @@ class SDRControlGUI(QWidget):
         observation_interval_unit = self.oi_unit.currentText()
         observation_time = self.ot_input.text()
         observation_time_unit = self.ot_unit.currentText()
+        band_overlap = self.overlap_input.text() or "0"
 
         try:
             # Convert input values to the appropriate units (Hz for frequencies, seconds for time)
@@ -385,35 +547,58 @@ class SDRControlGUI(QWidget):
             sr_in_hz = self.convert_to_hz(float(sampling_rate_value), sr_unit)
             observation_time_in_seconds = self.convert_to_seconds(float(observation_time), observation_time_unit)
             observation_interval_in_seconds = self.convert_to_seconds(float(observation_interval), observation_interval_unit)
-            if observation_interval_in_seconds > observation_time_in_seconds:
-                self.log_message(f"ERROR: Time Interval > Observation Time")
-                return
-            if start_freq_in_hz > end_freq_in_hz:
-                self.log_message(f'ERROR: Start Frequency Higher Than End Frequency')
-                return
-
-            can_proceed = self.check_and_handle_running_instance()
-            if not can_proceed:
-                self.log_message("Stream canceled by user.")
-                return
-            
-            # Build the command to execute on the remote Linux machine
-            command = f"nohup python3 ~/Desktop/RFI/scheduler.py --start_freq {start_freq_in_hz} --end_freq {end_freq_in_hz} --bandwidth {bw_in_hz} --sampling_rate {sr_in_hz} --observation_time {observation_time_in_seconds} --observation_interval {observation_interval_in_seconds} &"
-            
-            # Create the worker thread to execute the command
-            self.log_message(f"Starting background task to execute command: {command}")
-            self.worker_thread = WorkerThread(command, self.ssh_client)
-            self.worker_thread.finished.connect(self.log_message)
-            self.worker_thread.error.connect(self.log_message)
-            
-            # Start the worker thread
-            self.worker_thread.start()
-
+            band_overlap_fraction = float(band_overlap) / 100
         except ValueError:
             self.log_message("Invalid input. Please enter numeric values.")
+            return
+
+        try:
+            # The same compiler the scheduler uses validates the sweep and estimates it before anything starts
+            plan = compile_plan(start_freq_in_hz, end_freq_in_hz, bw_in_hz, sr_in_hz, observation_interval_in_seconds,
+                                observation_time_in_seconds, band_overlap_fraction)
+        except ValueError as e:
+            self.log_message(f"ERROR: {e}")
+            return
+        self.log_message(describe_plan(plan))
+        self.log_message("The scheduler recomputes these estimates with the step overhead measured on the server.")
+        for warning in plan["warnings"]:
+            self.log_message(f"Warning: {warning}")
+
+        # The scheduler runs the uploaded plan as compiled. Output is discarded
+        # (the scheduler writes log.txt) so the channel closes at once.
+        command = f"nohup python3 ~/Desktop/RFI/scheduler.py --plan ~/{REMOTE_PLAN_PATH} > /dev/null 2>&1 &"
+        try:
+            self.check_and_handle_running_instance(lambda: self.upload_plan(plan, lambda: self.start_scheduler(command)))
         except Exception as e:
             self.log_message(f"Error preparing the command: {e}")
 
+    def upload_plan(self, plan, on_uploaded):
+        """Writes the compiled plan to the server in the background, then calls on_uploaded."""
+        def uploaded(output, error):
+            if error:
+                self.log_message(f"Could not upload the sweep plan: {error}")
+                return
+            on_uploaded()
+
+        future = self.ssh_manager.submit_write_file(REMOTE_PLAN_PATH, json.dumps(plan))
+        future.add_done_callback(lambda done: self.command_finished.emit(done, uploaded, False))
+
+    def resume_observation(self):
+        """Restarts an interrupted run from the scheduler's checkpoint with its remaining observation time."""
+        if not self.ssh_manager:
+            self.log_message("Not logged in. Please log in first.")
+            return
+        command = "nohup python3 ~/Desktop/RFI/scheduler.py --resume > /dev/null 2>&1 &"
+        self.check_and_handle_running_instance(lambda: self.start_scheduler(command))
+
+    def start_scheduler(self, command):
+        self.log_message(f"Starting background task to execute command: {command}")
+
+        def started(output, error):
+            if not error:
+                self.log_message("Scheduler process started successfully on the remote server.")
+
+        self.execute_command(command, callback=started)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+import os
+import sys
+import math
+import time
+import argparse
+import threading
+from collections import Counter
+
+from checkpoint import read_checkpoint, write_checkpoint
+
+
+BUCKETS_PER_DECADE = 20
+MIN_SECONDS = 1e-6
+MAX_SECONDS = 1e4
+
+
+def timing_path(folder_path, worker):
+    """One worker's timing histograms, written next to log.txt."""
+    return os.path.join(folder_path, f"timing_{worker}.json")
+
+
+def profile_path(folder_path, worker, step, side):
+    """Collapsed-stack profile of one step, for the scheduler or engine side."""
+    return os.path.join(folder_path, f"profile_{worker}_step{step}_{side}.txt")
+
+
+class TimingHistogram:
+    """Log-spaced histogram of durations from 1 us to 10^4 s.
+
+    Recording is one log10 and a list increment, so it is cheap enough to call
+    for every stage of every step. Percentiles are read back to within one
+    bucket (about 12%).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (int(math.log10(MAX_SECONDS / MIN_SECONDS)) * BUCKETS_PER_DECADE + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        seconds = max(seconds, 0.0)
+        if seconds <= MIN_SECONDS:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, int(math.log10(seconds / MIN_SECONDS) * BUCKETS_PER_DECADE))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile, capped at the largest value seen."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.max, MIN_SECONDS * 10 ** ((index + 1) / BUCKETS_PER_DECADE))
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "total": self.total,
+        }
+
+
+class Instrumentation:
+    """Per-stage timing of sweep steps, aggregated into histograms.
+
+    The scheduler records how long each stage of a step took (retune, dwell,
+    stop, the engine's read, processing, file writes and close, and its own
+    bookkeeping). Every interval seconds, and on close, the p50/p99 summary is
+    written atomically to path so it can be read while the sweep runs.
+    """
+
+    def __init__(self, path, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.stages = {}
+        self.started = time.time()
+        self.last_dump = time.monotonic()
+
+    def record(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = TimingHistogram()
+        histogram.record(seconds)
+
+    def record_step(self, **stages):
+        """Records one step's stage durations, dumping the summary when the interval has passed."""
+        for stage, seconds in stages.items():
+            if seconds is not None:
+                self.record(stage, seconds)
+        if time.monotonic() - self.last_dump >= self.interval:
+            self.dump()
+
+    def summary(self):
+        return {"started": self.started, "updated": time.time(),
+                "stages": {stage: histogram.summary() for stage, histogram in self.stages.items()}}
+
+    def dump(self):
+        self.last_dump = time.monotonic()
+        try:
+            write_checkpoint(self.path, self.summary(), sync=False)
+        except OSError:
+            pass  # Diagnostics must never stop a sweep
+
+    def describe(self, stages=("step", "overhead", "retune", "stop", "engine_process", "engine_write")):
+        """One line of p50/p99 for the stages that matter most, for the log."""
+        parts = []
+        for stage in stages:
+            if stage in self.stages:
+                summary = self.stages[stage].summary()
+                parts.append(f"{stage} {summary['p50'] * 1000:.1f}/{summary['p99'] * 1000:.1f} ms")
+        return "p50/p99: " + ", ".join(parts)
+
+
+class StackSampler:
+    """Wall-clock sampling profiler for every thread of the process.
+
+    A background thread snapshots all Python stacks every interval seconds and
+    counts them in collapsed form ("thread;outer;...;inner count"), which
+    flamegraph.pl and speedscope read directly. Unlike cProfile it sees the
+    capture pipeline's reader and worker threads, and time spent waiting shows
+    up where it is spent.
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def write(self, path):
+        """Stops sampling and writes the collapsed stacks, most frequent first."""
+        self.stop()
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the timing histograms written by an instrumented scheduler run.")
+    parser.add_argument("paths", nargs="+", help="timing_<worker>.json files")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        timing = read_checkpoint(path)
+        if timing is None:
+            print(f"{path}: unreadable")
+            continue
+        print(f"{path} (updated {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timing['updated']))})")
+        print(f"  {'stage':<16}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, summary in sorted(timing["stages"].items(), key=lambda item: -item[1]["total"]):
+            print(f"  {stage:<16}{summary['count']:>8}{summary['mean'] * 1000:>10.2f}{summary['p50'] * 1000:>10.2f}"
+                  f"{summary['p99'] * 1000:>10.2f}{summary['max'] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
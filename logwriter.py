@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import queue
+import atexit
+import datetime
+import threading
+
+
+class LogWriter:
+    """Non-blocking log file writer.
+
+    write() only timestamps the record and puts it on a queue. A background
+    thread drains the queue in batches, appends each batch with a single
+    write, echoes it to stdout, and rotates the file to log.txt.1, .2, ...
+    once it grows past max_bytes. In JSON mode every line is a JSON object
+    with the time, the message and any extra fields.
+    """
+
+    def __init__(self, path, json_lines=False, max_bytes=50 * 1024 * 1024, backups=5, flush_interval=0.5,
+                 batch_size=1000, echo=True):
+        self.path = path
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.echo = echo
+        self.pid = os.getpid()
+        self.records = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, message, **fields):
+        """Queues one record; never touches the file on the caller's thread."""
+        self.records.put((datetime.datetime.now(), message, fields))
+
+    def format(self, record):
+        timestamp, message, fields = record
+        if self.json_lines:
+            return json.dumps({"time": timestamp.isoformat(timespec="milliseconds"), "message": message, **fields}) + "\n"
+        return f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] {message}\n"
+
+    def run(self):
+        while True:
+            batch = [self.records.get()]
+            # Give a burst of records time to arrive so they share one write
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self.records.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                self.flush_batch(batch)
+            if done:
+                return
+
+    def flush_batch(self, batch):
+        text = "".join(self.format(record) for record in batch)
+        try:
+            self.rotate_if_needed()
+            with open(self.path, "a") as log_file:
+                log_file.write(text)
+        except OSError as e:
+            print(f"Log write failed: {e}")
+        if self.echo:
+            print("\n".join(record[1] for record in batch), flush=True)
+
+    def rotate_if_needed(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size < self.max_bytes:
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer thread."""
+        self.records.put(None)
+        self.thread.join()
+
+
+writers = {}
+settings = {}
+writers_lock = threading.Lock()
+
+
+def configure(**options):
+    """Sets LogWriter options (json_lines, max_bytes, ...) for writers created afterwards."""
+    settings.update(options)
+
+
+def get_writer(path):
+    """Returns this process's writer for path, creating it on first use.
+
+    Writers inherited from a parent process across fork have no thread, so
+    they are replaced.
+    """
+    with writers_lock:
+        writer = writers.get(path)
+        if writer is None or writer.pid != os.getpid():
+            writer = LogWriter(path, **settings)
+            writers[path] = writer
+        return writer
+
+
+def close_all():
+    """Flushes and closes every writer created by this process."""
+    with writers_lock:
+        for writer in writers.values():
+            if writer.pid == os.getpid():
+                writer.close()
+        writers.clear()
+
+
+atexit.register(close_all)
@@ -0,0 +1,344 @@
+import os
+import time
+import base64
+import sqlite3
+import argparse
+import tempfile
+
+import numpy as np
+
+from capture_file import CaptureFile, load_index
+from detection import mad_flags
+
+
+DB_NAME = "occupancy.sqlite"
+FREQ_STEP = 10e3  # Hz per frequency bin at the finest level
+# (seconds per time bin, frequency bins merged) for each level, finest first
+LEVELS = ((60, 1), (900, 10), (3600, 100), (86400, 1000))
+MAX_CELLS = 200000  # Cells a query may return before a coarser level is used
+CHUNK_RECORDS = 256  # Spectra records read at a time when backfilling
+
+
+def db_path(data_root):
+    """The occupancy database shared by every day's folder under the data root."""
+    return os.path.join(data_root, DB_NAME)
+
+
+def in_band(freqs, center_freq, bandwidth):
+    """Mask of the channels inside the captured bandwidth."""
+    return np.abs(np.asarray(freqs) - center_freq) < bandwidth / 2
+
+
+class ChannelStats:
+    """Accumulates per-channel statistics over one capture's integrations, in the engine.
+
+    For every integrated spectrum the in-band channels' linear power is summed
+    and max-held, and channels above the median/MAD threshold are counted, so
+    the step's mean power, peak and duty cycle can be sent to the scheduler
+    in a few kilobytes.
+    """
+
+    def __init__(self, freqs, center_freq, bandwidth, n_sigma=6.0):
+        self.keep = in_band(freqs, center_freq, bandwidth)
+        self.freqs = np.asarray(freqs, dtype=np.float64)[self.keep]
+        self.n_sigma = n_sigma
+        self.power_sum = np.zeros(len(self.freqs), dtype=np.float64)
+        self.power_max = np.zeros(len(self.freqs), dtype=np.float32)
+        self.flagged = np.zeros(len(self.freqs), dtype=np.int32)
+        self.integrations = 0
+        self.start_time = time.time()
+
+    def update(self, mean):
+        mean = np.asarray(mean)[self.keep]
+        self.power_sum += mean
+        np.maximum(self.power_max, mean, out=self.power_max)
+        self.flagged += mad_flags(10 * np.log10(np.maximum(mean, 1e-20)), self.n_sigma)
+        self.integrations += 1
+
+    def summary(self):
+        """JSON-safe summary for the engine's stop reply, or None if nothing was integrated."""
+        if not self.integrations or not len(self.freqs):
+            return None
+        return {
+            "start_time": self.start_time,
+            "end_time": time.time(),
+            "freq_lo": float(self.freqs[0]),
+            "channel_width": float(self.freqs[1] - self.freqs[0]) if len(self.freqs) > 1 else 0.0,
+            "integrations": self.integrations,
+            "mean": encode_array(self.power_sum / self.integrations, np.float32),
+            "max": encode_array(self.power_max, np.float32),
+            "flagged": encode_array(self.flagged, np.int32),
+        }
+
+
+def encode_array(values, dtype):
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode()
+
+
+def decode_array(text, dtype):
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+class OccupancyStore:
+    """SQLite store of channel occupancy at several time and frequency resolutions.
+
+    Every level is a table of (frequency bin, time bin) cells holding the
+    summed and peak linear power, the number of flagged channel-integrations
+    and the number observed, so mean power and duty cycle are exact at any
+    level and a cell can be updated in place by later steps. Each step is
+    binned with NumPy and upserted into every level, so a multi-week query
+    reads a few thousand coarse rows instead of raw files. The database is in
+    WAL mode so several workers can write while the GUI reads.
+    """
+
+    def __init__(self, path, freq_step=FREQ_STEP, levels=LEVELS):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('freq_step', ?)", (repr(float(freq_step)),))
+            self.connection.execute("CREATE TABLE IF NOT EXISTS ingested (file TEXT PRIMARY KEY)")
+        # An existing database keeps the resolution it was created with
+        self.freq_step = float(self.connection.execute("SELECT value FROM meta WHERE key = 'freq_step'").fetchone()[0])
+        self.levels = levels
+        with self.connection:
+            for level in range(len(levels)):
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS level_{level} (f INTEGER, t INTEGER, power_sum REAL, "
+                                        f"power_max REAL, flagged INTEGER, count INTEGER, PRIMARY KEY (f, t)) WITHOUT ROWID")
+
+    def add(self, freqs, mean, peak, flagged, integrations, timestamp, commit=True):
+        """Adds one step's per-channel mean power, peak power and flagged integration counts."""
+        base = np.floor(np.asarray(freqs) / self.freq_step).astype(np.int64)
+        for level, (time_bin, merge) in enumerate(self.levels):
+            bins = base // merge
+            edges = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+            counts = np.diff(np.append(edges, len(bins))) * integrations
+            rows = zip(bins[edges].tolist(), [int(timestamp // time_bin)] * len(edges),
+                       (np.add.reduceat(mean, edges) * integrations).tolist(), np.maximum.reduceat(peak, edges).tolist(),
+                       np.add.reduceat(flagged, edges).tolist(), counts.tolist())
+            self.connection.executemany(
+                f"INSERT INTO level_{level} VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (f, t) DO UPDATE SET "
+                f"power_sum = power_sum + excluded.power_sum, power_max = max(power_max, excluded.power_max), "
+                f"flagged = flagged + excluded.flagged, count = count + excluded.count", rows)
+        if commit:
+            self.connection.commit()
+
+    def add_summary(self, summary, file=None, commit=True):
+        """Adds a ChannelStats summary sent back by the engine for the capture file named file.
+
+        The file is recorded as ingested in the same transaction, so a later
+        ingest_folder of the day does not count it again, and a summary for a
+        file already recorded is ignored.
+        """
+        if file is not None:
+            if self.connection.execute("SELECT 1 FROM ingested WHERE file = ?", (file,)).fetchone():
+                return
+            self.connection.execute("INSERT INTO ingested VALUES (?)", (file,))
+        mean = decode_array(summary["mean"], np.float32).astype(np.float64)
+        freqs = summary["freq_lo"] + np.arange(len(mean)) * summary["channel_width"]
+        self.add(freqs, mean, decode_array(summary["max"], np.float32), decode_array(summary["flagged"], np.int32),
+                 summary["integrations"], (summary["start_time"] + summary["end_time"]) / 2, commit)
+
+    def choose_level(self, f_lo, f_hi, t0, t1, max_cells=MAX_CELLS):
+        """The finest level at which the range spans at most max_cells cells."""
+        for level, (time_bin, merge) in enumerate(self.levels):
+            cells = ((f_hi - f_lo) / (self.freq_step * merge) + 1) * ((t1 - t0) / time_bin + 1)
+            if cells <= max_cells:
+                return level
+        return len(self.levels) - 1
+
+    def bounds(self, level, f_lo, f_hi, t0, t1):
+        time_bin, merge = self.levels[level]
+        width = self.freq_step * merge
+        return int(f_lo // width), int(np.ceil(f_hi / width)), int(t0 // time_bin), int(np.ceil(t1 / time_bin))
+
+    def query(self, f_lo, f_hi, t0, t1, max_cells=MAX_CELLS, level=None):
+        """Returns the cells overlapping [f_lo, f_hi) x [t0, t1) as a frequency x time grid.
+
+        The level is the finest that keeps the grid within max_cells unless
+        given. Cells never observed are NaN.
+        """
+        level = self.choose_level(f_lo, f_hi, t0, t1, max_cells) if level is None else level
+        time_bin, merge = self.levels[level]
+        width = self.freq_step * merge
+        f_start, f_stop, t_start, t_stop = self.bounds(level, f_lo, f_hi, t0, t1)
+        rows = self.connection.execute(
+            f"SELECT f, t, power_sum, power_max, flagged, count FROM level_{level} "
+            f"WHERE f >= ? AND f < ? AND t >= ? AND t < ?", (f_start, f_stop, t_start, t_stop)).fetchall()
+        shape = (max(0, f_stop - f_start), max(0, t_stop - t_start))
+        mean_db = np.full(shape, np.nan, dtype=np.float32)
+        max_db = np.full(shape, np.nan, dtype=np.float32)
+        duty = np.full(shape, np.nan, dtype=np.float32)
+        if rows:
+            f, t, power_sum, power_max, flagged, count = (np.array(column) for column in zip(*rows))
+            f -= f_start
+            t -= t_start
+            mean_db[f, t] = 10 * np.log10(np.maximum(power_sum / count, 1e-20))
+            max_db[f, t] = 10 * np.log10(np.maximum(power_max, 1e-20))
+            duty[f, t] = flagged / count
+        return {
+            "level": level,
+            "freqs": (f_start + np.arange(shape[0])) * width,
+            "times": (t_start + np.arange(shape[1])) * float(time_bin),
+            "freq_step": width,
+            "time_bin": time_bin,
+            "mean_db": mean_db,
+            "max_db": max_db,
+            "duty": duty,
+        }
+
+    def summary(self, f_lo, f_hi, t0, t1, max_cells=MAX_CELLS):
+        """Overall duty cycle, mean and peak power over a range, aggregated in SQL at the chosen level."""
+        level = self.choose_level(f_lo, f_hi, t0, t1, max_cells)
+        row = self.connection.execute(
+            f"SELECT sum(power_sum), max(power_max), sum(flagged), sum(count), count(*) FROM level_{level} "
+            f"WHERE f >= ? AND f < ? AND t >= ? AND t < ?", self.bounds(level, f_lo, f_hi, t0, t1)).fetchone()
+        power_sum, power_max, flagged, count, cells = row
+        if not count:
+            return {"level": level, "cells": 0, "duty": None, "mean_db": None, "max_db": None}
+        return {
+            "level": level,
+            "cells": cells,
+            "duty": flagged / count,
+            "mean_db": float(10 * np.log10(max(power_sum / count, 1e-20))),
+            "max_db": float(10 * np.log10(max(power_max, 1e-20))),
+        }
+
+    def ingest_folder(self, folder_path, n_sigma=6.0, progress=None):
+        """Backfills the store from a day's spectra captures, skipping files already ingested or recorded live.
+
+        Records are read in chunks and grouped by the finest time bin, so the
+        cells match what live capture would have stored.
+        """
+        files = 0
+        time_bin = self.levels[0][0]
+        for entry in load_index(folder_path):
+            if entry.get("deleted") or entry["kind"] != "spectra":
+                continue
+            if self.connection.execute("SELECT 1 FROM ingested WHERE file = ?", (entry["file"],)).fetchone():
+                continue
+            capture = CaptureFile(os.path.join(folder_path, entry["file"]))
+            header = capture.header
+            product = header.get("products", ["mean"]).index("mean")
+            keep = in_band(capture.frequencies(), header["center_freq"], header["bandwidth"])
+            freqs = capture.frequencies()[keep]
+            times = capture.times()
+            bins = times // time_bin
+            for start in range(0, capture.records, CHUNK_RECORDS):
+                chunk = capture.read(start, start + CHUNK_RECORDS)[:, product][:, keep].astype(np.float64)
+                flags = mad_flags(10 * np.log10(np.maximum(chunk, 1e-20)), n_sigma)
+                chunk_bins = bins[start:start + len(chunk)]
+                edges = np.flatnonzero(np.diff(chunk_bins, prepend=chunk_bins[0] - 1))
+                for first, last in zip(edges, np.append(edges[1:], len(chunk))):
+                    rows = chunk[first:last]
+                    self.add(freqs, rows.mean(axis=0), rows.max(axis=0), flags[first:last].sum(axis=0), last - first,
+                             times[start + first], commit=False)
+            self.connection.execute("INSERT INTO ingested VALUES (?)", (entry["file"],))
+            self.connection.commit()
+            files += 1
+            if progress:
+                progress(entry["file"])
+        return files
+
+    def close(self):
+        self.connection.close()
+
+
+def benchmark(days=14, bands=50, pass_minutes=30, bandwidth=1e6, fft_size=1024, start_freq=1.4e9, queries=20):
+    """Fills a store with synthetic sweeps over days and times inserts and range queries."""
+    rng = np.random.default_rng(0)
+    freqs = np.fft.fftshift(np.fft.fftfreq(fft_size, 1.0 / bandwidth))
+    mean = rng.exponential(1.0, fft_size)
+    peak = mean * 3
+    flagged = (rng.random(fft_size) < 0.02).astype(np.int32) * 10
+    end = time.time()
+    start = end - days * 86400
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        store = OccupancyStore(os.path.join(folder, DB_NAME))
+        steps = 0
+        started = time.perf_counter()
+        for sweep_time in np.arange(start, end, pass_minutes * 60):
+            for band in range(bands):
+                center = start_freq + (band + 0.5) * bandwidth
+                store.add(center + freqs, mean, peak, flagged, 10, sweep_time + band, commit=False)
+                steps += 1
+            store.connection.commit()
+        results["steps"] = steps
+        results["steps_per_second"] = steps / (time.perf_counter() - started)
+        results["db_mb"] = os.path.getsize(store.path) / 1e6
+
+        store.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        span = bands * bandwidth
+        for name, f_lo, f_hi, t0 in (("week_30mhz", start_freq, start_freq + 30e6, end - 7 * 86400),
+                                     ("all_full_span", start_freq, start_freq + span, start),
+                                     ("hour_1mhz", start_freq + span / 2, start_freq + span / 2 + 1e6, end - 3600)):
+            started = time.perf_counter()
+            for _ in range(queries):
+                grid = store.query(f_lo, f_hi, t0, end)
+            query_time = (time.perf_counter() - started) / queries
+            started = time.perf_counter()
+            for _ in range(queries):
+                store.summary(f_lo, f_hi, t0, end)
+            results[name] = {"level": grid["level"], "cells": int(grid["duty"].size), "query_ms": query_time * 1000,
+                             "summary_ms": (time.perf_counter() - started) / queries * 1000}
+        store.close()
+    return results
+
+
+def parse_time(text):
+    """Unix seconds, or a dd_mm_yyyy date as used for the data folders."""
+    try:
+        return float(text)
+    except ValueError:
+        return time.mktime(time.strptime(text, "%d_%m_%Y"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or backfill the RFI occupancy database.")
+    parser.add_argument("--db", default=db_path(os.path.expanduser("~/Desktop/Data")), help="Occupancy database file")
+    parser.add_argument("--f_lo", type=float, help="Lower frequency in Hz")
+    parser.add_argument("--f_hi", type=float, help="Upper frequency in Hz")
+    parser.add_argument("--start", help="Start time (Unix seconds or dd_mm_yyyy); default --days ago")
+    parser.add_argument("--end", help="End time (Unix seconds or dd_mm_yyyy); default now")
+    parser.add_argument("--days", type=float, default=7.0, help="Days back from --end when --start is not given")
+    parser.add_argument("--ingest", nargs="+", metavar="FOLDER", help="Backfill from these data folders' spectra captures")
+    parser.add_argument("--n_sigma", type=float, default=6.0, help="Threshold for flagged channels when backfilling")
+    parser.add_argument("--benchmark", action="store_true", help="Time inserts and range queries on a synthetic store")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark()
+        print(f"Inserted {results['steps']} steps at {results['steps_per_second']:.0f} steps/s ({results['db_mb']:.1f} MB)")
+        for name in ("week_30mhz", "all_full_span", "hour_1mhz"):
+            row = results[name]
+            print(f"  {name}: level {row['level']}, {row['cells']} cells, query {row['query_ms']:.2f} ms, summary {row['summary_ms']:.2f} ms")
+        return
+
+    store = OccupancyStore(args.db)
+    if args.ingest:
+        for folder in args.ingest:
+            files = store.ingest_folder(os.path.expanduser(folder), args.n_sigma)
+            print(f"{folder}: ingested {files} captures")
+        return
+    if args.f_lo is None or args.f_hi is None:
+        parser.error("--f_lo and --f_hi are required for a query")
+    end = parse_time(args.end) if args.end else time.time()
+    start = parse_time(args.start) if args.start else end - args.days * 86400
+    started = time.perf_counter()
+    summary = store.summary(args.f_lo, args.f_hi, start, end)
+    seconds = time.perf_counter() - started
+    if summary["duty"] is None:
+        print("No observations in that range.")
+        return
+    time_bin, merge = store.levels[summary["level"]]
+    print(f"{args.f_lo / 1e6:.3f}-{args.f_hi / 1e6:.3f} MHz, {time.strftime('%Y-%m-%d %H:%M', time.localtime(start))} to "
+          f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(end))}: duty cycle {summary['duty']:.2%}, "
+          f"mean {summary['mean_db']:.1f} dB, peak {summary['max_db']:.1f} dB "
+          f"({summary['cells']} cells of {store.freq_step * merge / 1e3:.0f} kHz x {time_bin} s, {seconds * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
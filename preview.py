@@ -0,0 +1,46 @@
+import base64
+
+import numpy as np
+
+
+PREVIEW_BINS = 256  # Channels per preview frame, whatever the FFT size
+PREVIEW_HISTORY = 64  # Frames the status endpoint keeps for slow pollers
+
+
+def max_decimate(values, bins):
+    """Reduces values to at most bins channels, keeping the peak of each group so narrow RFI survives."""
+    if len(values) <= bins:
+        return values
+    edges = np.linspace(0, len(values), bins + 1).astype(int)[:-1]
+    return np.maximum.reduceat(values, edges)
+
+
+def encode_frame(power, center_freq, sampling_rate, bandwidth, timestamp, bins=PREVIEW_BINS):
+    """Packs one fftshifted power spectrum into a compact JSON-safe preview frame.
+
+    The spectrum is trimmed to the captured bandwidth, max-decimated to bins
+    channels and quantised to 8 bits over its own dB range, so a frame is a
+    few hundred bytes regardless of FFT size or sampling rate.
+    """
+    span = min(bandwidth, sampling_rate)
+    keep = int(round(len(power) * span / sampling_rate / 2))
+    middle = len(power) // 2
+    power = power[middle - keep:middle + keep] if keep else power
+    db = 10 * np.log10(max_decimate(np.asarray(power, dtype=np.float64), bins) + 1e-20)
+    db_min = float(db.min())
+    db_step = max(float(db.max()) - db_min, 0.1) / 255
+    quantised = np.round((db - db_min) / db_step).astype(np.uint8)
+    return {
+        "time": timestamp,
+        "freq_lo": center_freq - span / 2,
+        "freq_hi": center_freq + span / 2,
+        "db_min": db_min,
+        "db_step": db_step,
+        "bins": base64.b64encode(quantised.tobytes()).decode(),
+    }
+
+
+def decode_frame(frame):
+    """Returns (freq_lo, freq_hi, power_db) for a frame made by encode_frame."""
+    quantised = np.frombuffer(base64.b64decode(frame["bins"]), dtype=np.uint8)
+    return frame["freq_lo"], frame["freq_hi"], frame["db_min"] + quantised.astype(np.float32) * frame["db_step"]
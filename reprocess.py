@@ -0,0 +1,372 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+from capture_file import MAGIC, CaptureFile, CaptureWriter, append_index, index_entry, load_index, read_header
+from checkpoint import read_checkpoint, write_checkpoint
+from detection import RFIDetector
+from flowgraph import detect_integrations
+from spectrum import SpectrumIntegrator
+
+
+CAPTURE_NAME = re.compile(r"^\d+_\d{2}_\d{2}_\d{4}_\d{2}_\d{2}_\d{2}(_\d{3})?\.dat$")  # scheduler.generate_filename
+CACHE_NAME = "reprocess_cache"
+CACHE_VERSION = 2  # Bumped whenever detection changes what a cached result would hold
+HASH_CHUNK = 8 * 1024 * 1024
+CHUNK_RECORDS = 256  # Spectra records thresholded per read
+CHUNK_SAMPLES = 1 << 20  # IQ samples integrated per read
+IQ_OPTIONS = ("fft_size", "window", "overlap", "integration_time")
+DETECTION_OPTIONS = ("n_sigma", "sk_sigma")
+
+
+def is_capture(path):
+    """Whether path exists and starts with the capture file magic number."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def find_captures(folder_path):
+    """Lists the folder's captures: live ones from the index, or every scheduler capture file without one.
+
+    Files that do not start with the capture magic number (raw IQ from older
+    versions, stray .dat files) are left out.
+    """
+    entries = load_index(folder_path)
+    if entries:
+        names = [entry["file"] for entry in entries if not entry.get("deleted")]
+    else:
+        names = sorted(name for name in os.listdir(folder_path) if CAPTURE_NAME.match(name))
+    return [os.path.join(folder_path, name) for name in names if is_capture(os.path.join(folder_path, name))]
+
+
+def content_hash(path):
+    """BLAKE2b of the whole file, read in large chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_key(kind, options):
+    """The options a capture's result depends on: spectra were already integrated, so only detection counts."""
+    names = DETECTION_OPTIONS + (IQ_OPTIONS if kind == "iq" else ())
+    return {name: options[name] for name in names}
+
+
+def record_frames(header):
+    """FFT frames integrated into each stored spectra record.
+
+    Every record but the last holds a full integration; the last one's length
+    follows from the dwell the header records, as it is usually partial.
+    """
+    hop = max(1, int(round(header["fft_size"] * (1 - header.get("overlap", 0.5)))))
+    nominal = max(1, int(round(header["record_interval"] * header["sample_rate"] / hop)))
+    frames = np.full(header["records"], nominal)
+    if header["records"] and header.get("dwell"):
+        remainder = header["dwell"] - (header["records"] - 1) * header["record_interval"]
+        frames[-1] = min(nominal, max(1, int(round(remainder * header["sample_rate"] / hop))))
+    return frames, nominal
+
+
+def detect_spectra(capture, options):
+    """Thresholds stored spectra records in chunks with the live sinks' detection rules."""
+    header = capture.header
+    products = header.get("products", ["mean"])
+    frames, nominal = record_frames(dict(header, records=capture.records))
+    detector = RFIDetector(capture.frequencies(), header["record_interval"], n_sigma=options["n_sigma"],
+                           sk_sigma=options["sk_sigma"])
+    events = []
+    total = None
+    integrations = 0
+    for start in range(0, capture.records, CHUNK_RECORDS):
+        chunk = capture.read(start, start + CHUNK_RECORDS)
+        mean = chunk[:, products.index("mean")]
+        kurtosis = chunk[:, products.index("kurtosis")] if "kurtosis" in products else None
+        chunk_events, rows = detect_integrations(detector, header["start_time"], header["record_interval"], nominal,
+                                                 integrations, mean, kurtosis, frames[start:start + len(chunk)])
+        events.extend(chunk_events)
+        integrations += rows
+        chunk_sum = mean.sum(axis=0, dtype=np.float64)
+        total = chunk_sum if total is None else total + chunk_sum
+    events.extend(detector.flush())
+    spectrum = total / capture.records if capture.records else None
+    return detector, events, spectrum
+
+
+def detect_iq(capture, options):
+    """Integrates raw IQ in chunks and thresholds every integration with the live sinks' detection rules."""
+    header = capture.header
+    integrator = SpectrumIntegrator(header["sample_rate"], fft_size=options["fft_size"], window=options["window"],
+                                    overlap=options["overlap"], integration_time=options["integration_time"],
+                                    kurtosis=True)
+    detector = RFIDetector(integrator.frequencies(header["center_freq"]), integrator.integration_interval,
+                           n_sigma=options["n_sigma"], sk_sigma=options["sk_sigma"])
+    events = []
+    total = None
+    integrations = 0
+
+    def handle(results):
+        nonlocal total, integrations
+        for result in results:
+            result_events, rows = detect_integrations(detector, header["start_time"], integrator.integration_interval,
+                                                      integrator.frames_per_integration, integrations, result["mean"],
+                                                      result["kurtosis"], result["frames"])
+            events.extend(result_events)
+            if rows:
+                total = result["mean"].astype(np.float64) if total is None else total + result["mean"]
+                integrations += rows
+
+    for start in range(0, capture.records, CHUNK_SAMPLES):
+        handle(integrator.process(capture.read(start, start + CHUNK_SAMPLES)))
+    handle(integrator.flush())
+    events.extend(detector.flush())
+    spectrum = total / integrations if integrations else None
+    return detector, events, spectrum
+
+
+def reprocess_capture(path, known_hash, options, cache_path=None):
+    """Re-runs detection on one capture, or returns its cached result if the content and options are unchanged.
+
+    Runs in a pool process. Returns the result dict, which includes the
+    content hash so the caller can remember it.
+    """
+    started = time.perf_counter()
+    header = read_header(path)
+    digest = None
+    cache_file = None
+    if cache_path:
+        digest = known_hash or content_hash(path)
+        key = hashlib.blake2b(json.dumps([CACHE_VERSION, digest, options_key(header["kind"], options)], sort_keys=True).encode(),
+                              digest_size=16).hexdigest()
+        cache_file = os.path.join(cache_path, f"{key}.json")
+        cached = read_checkpoint(cache_file)
+        if cached is not None:
+            cached.update(file=os.path.basename(path), hash=digest, cached=True, seconds=time.perf_counter() - started)
+            return cached
+
+    capture = CaptureFile(path)
+    if header["kind"] == "spectra":
+        detector, events, spectrum = detect_spectra(capture, options)
+    else:
+        detector, events, spectrum = detect_iq(capture, options)
+    result = {
+        "file": os.path.basename(path),
+        "kind": header["kind"],
+        "center_freq": header["center_freq"],
+        "t_start": header["start_time"],
+        "records": capture.records,
+        "bytes": capture.data.nbytes,
+        "flagged_cells": detector.flagged_cells,
+        "total_cells": detector.total_cells,
+        "occupancy": detector.occupancy,
+        "events": events,
+        "mean_db": None if spectrum is None else float(10 * np.log10(max(float(np.median(spectrum)), 1e-20))),
+    }
+    if cache_file:
+        write_checkpoint(cache_file, result, sync=False)
+    result.update(hash=digest, cached=False, seconds=time.perf_counter() - started)
+    return result
+
+
+def reprocess_job(job):
+    """Runs reprocess_capture, turning a file it cannot read into an error result so the batch carries on."""
+    try:
+        return reprocess_capture(*job)
+    except (ValueError, OSError) as e:
+        return {"file": os.path.basename(job[0]), "error": str(e)}
+
+
+def load_hashes(cache_path):
+    """Known content hashes by file name, with the size and mtime they were computed for."""
+    return read_checkpoint(os.path.join(cache_path, "hashes.json")) or {}
+
+
+def reprocess_folder(folder_path, options, workers=None, use_cache=True, progress=None):
+    """Re-analyses every capture in a data folder on a process pool and merges the results.
+
+    Files are handed out largest first so the pool stays busy to the end. With
+    the cache, a file whose size and mtime match its remembered hash is not
+    even re-hashed, and a file whose content and options match an earlier run
+    is not re-read. A file that turns out to be truncated or unreadable is
+    reported to progress and listed under "skipped" instead of stopping the
+    batch. Returns the merged summary.
+    """
+    started = time.perf_counter()
+    paths = find_captures(folder_path)
+    cache_path = os.path.join(folder_path, CACHE_NAME) if use_cache else None
+    hashes = {}
+    if cache_path:
+        os.makedirs(cache_path, exist_ok=True)
+        hashes = load_hashes(cache_path)
+    jobs = []
+    for path in sorted(paths, key=os.path.getsize, reverse=True):
+        stat = os.stat(path)
+        known = hashes.get(os.path.basename(path))
+        unchanged = known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns
+        jobs.append((path, known["hash"] if unchanged else None, options, cache_path))
+
+    results = []
+    skipped = []
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        mapped = map(reprocess_job, jobs)
+    else:
+        pool = multiprocessing.Pool(min(workers, len(jobs)))
+        mapped = pool.imap_unordered(reprocess_job, jobs)
+    try:
+        for result in mapped:
+            (skipped if "error" in result else results).append(result)
+            if progress:
+                progress(len(results) + len(skipped), len(jobs), result)
+    finally:
+        if workers > 1 and len(jobs) > 1:
+            pool.close()
+            pool.join()
+
+    if cache_path:
+        for result in results:
+            stat = os.stat(os.path.join(folder_path, result["file"]))
+            hashes[result["file"]] = {"hash": result["hash"], "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        write_checkpoint(os.path.join(cache_path, "hashes.json"), hashes, sync=False)
+    summary = merge_results(results, options, time.perf_counter() - started, workers)
+    summary["skipped"] = skipped
+    return summary
+
+
+def merge_results(results, options, seconds, workers):
+    """Merges per-capture results into one summary: totals, per-band occupancy and every event in time order."""
+    results.sort(key=lambda result: (result["t_start"], result["center_freq"]))
+    bands = {}
+    events = []
+    for result in results:
+        band = bands.setdefault(result["center_freq"], {"center_freq": result["center_freq"], "captures": 0,
+                                                         "flagged_cells": 0, "total_cells": 0, "events": 0})
+        band["captures"] += 1
+        band["flagged_cells"] += result["flagged_cells"]
+        band["total_cells"] += result["total_cells"]
+        band["events"] += len(result["events"])
+        events.extend(dict(event, file=result["file"]) for event in result["events"])
+    for band in bands.values():
+        band["occupancy"] = band["flagged_cells"] / band["total_cells"] if band["total_cells"] else 0.0
+    events.sort(key=lambda event: (event["time"], event["freq"]))
+    processed = [result for result in results if not result["cached"]]
+    processed_bytes = sum(result["bytes"] for result in processed)
+    flagged = sum(result["flagged_cells"] for result in results)
+    cells = sum(result["total_cells"] for result in results)
+    return {
+        "options": options,
+        "files": len(results),
+        "processed": len(processed),
+        "cached": len(results) - len(processed),
+        "bytes_processed": processed_bytes,
+        "seconds": seconds,
+        "workers": workers,
+        "occupancy": flagged / cells if cells else 0.0,
+        "events": events,
+        "bands": sorted(bands.values(), key=lambda band: band["center_freq"]),
+        "captures": [dict({name: result[name] for name in ("file", "kind", "center_freq", "t_start", "records", "occupancy",
+                                                             "mean_db", "hash")}, events=len(result["events"]))
+                     for result in results],
+    }
+
+
+def make_synthetic_iq_day(folder_path, files, samples=1 << 21, sample_rate=2e6, start_freq=1e9, seed=0):
+    """Writes a folder of synthetic IQ captures, noise plus a tone, named like the scheduler's, for benchmarking."""
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    noise = (rng.standard_normal(samples) + 1j * rng.standard_normal(samples)).astype(np.complex64) * np.float32(np.sqrt(0.5))
+    tone = (np.exp(2j * np.pi * 0.1 * np.arange(samples)) * 3).astype(np.complex64)
+    t = time.time()
+    for index in range(files):
+        center = start_freq + (index + 0.5) * sample_rate
+        stamp = time.strftime("%d_%m_%Y_%H_%M_%S", time.localtime(t + index))
+        path = os.path.join(folder_path, f"{int(center - sample_rate / 2)}_{stamp}.dat")
+        writer = CaptureWriter(path, "iq", np.complex64, (), center, sample_rate, sample_rate, t + index, 1.0 / sample_rate)
+        writer.write(np.roll(noise, index * 4096) + (tone if index % 2 else 0))
+        append_index(folder_path, index_entry(path, writer.close()))
+
+
+def benchmark(files=16, samples=1 << 21, workers=(1, 2, 4), options=None):
+    """Reprocesses a synthetic IQ day with each pool size, then again from the cache."""
+    options = options or default_options()
+    results = {"files": files, "mb": files * samples * 8 / 1e6, "runs": []}
+    with tempfile.TemporaryDirectory() as folder_path:
+        make_synthetic_iq_day(folder_path, files, samples)
+        for count in workers:
+            summary = reprocess_folder(folder_path, options, count, use_cache=False)
+            results["runs"].append({"workers": count, "seconds": summary["seconds"],
+                                    "mb_per_second": summary["bytes_processed"] / summary["seconds"] / 1e6})
+        reprocess_folder(folder_path, options, workers[-1])
+        cached = reprocess_folder(folder_path, options, workers[-1])
+        results["cached_seconds"] = cached["seconds"]
+    base = results["runs"][0]["seconds"]
+    for run in results["runs"]:
+        run["speedup"] = base / run["seconds"]
+    return results
+
+
+def default_options():
+    return {"fft_size": 1024, "window": "hann", "overlap": 0.5, "integration_time": 1.0, "n_sigma": 6.0, "sk_sigma": 5.0}
+
+
+def main():
+    defaults = default_options()
+    parser = argparse.ArgumentParser(description="Re-run RFI detection over a day's captures on a process pool.")
+    parser.add_argument("folder", nargs="?", help="Data folder, e.g. ~/Desktop/Data/<dd_mm_yyyy>")
+    parser.add_argument("--output", help="Summary JSON file (default: <folder>/reprocess_summary.json)")
+    parser.add_argument("--workers", type=int, help="Pool processes (default: one per core)")
+    parser.add_argument("--fft_size", type=int, default=defaults["fft_size"], help="FFT size for raw IQ captures")
+    parser.add_argument("--window", default=defaults["window"], help="FFT window for raw IQ captures (rect, hann, hamming, blackman)")
+    parser.add_argument("--overlap", type=float, default=defaults["overlap"], help="Fractional FFT frame overlap for raw IQ captures")
+    parser.add_argument("--integration_time", type=float, default=defaults["integration_time"], help="Seconds per integration for raw IQ captures")
+    parser.add_argument("--n_sigma", type=float, default=defaults["n_sigma"], help="Detection threshold in robust sigmas above the median")
+    parser.add_argument("--sk_sigma", type=float, default=defaults["sk_sigma"], help="Spectral kurtosis threshold in sigmas")
+    parser.add_argument("--no_cache", action="store_true", help="Reprocess every file, ignoring and not updating the cache")
+    parser.add_argument("--benchmark", action="store_true", help="Measure scaling with pool size on a synthetic IQ day")
+    parser.add_argument("--files", type=int, default=16, help="Captures for --benchmark")
+    args = parser.parse_args()
+
+    options = {name: getattr(args, name) for name in defaults}
+    if args.benchmark:
+        counts = sorted({1, 2, args.workers or os.cpu_count() or 1})
+        results = benchmark(args.files, workers=counts, options=options)
+        print(f"Reprocessing {results['files']} IQ captures ({results['mb']:.0f} MB):")
+        for run in results["runs"]:
+            print(f"  {run['workers']} workers: {run['seconds']:.2f} s, {run['mb_per_second']:.0f} MB/s, speedup {run['speedup']:.2f}x")
+        print(f"  cached rerun: {results['cached_seconds']:.3f} s")
+        return
+
+    if not args.folder:
+        parser.error("folder is required without --benchmark")
+    folder_path = os.path.expanduser(args.folder)
+    output_path = args.output or os.path.join(folder_path, "reprocess_summary.json")
+
+    def progress(done, total, result):
+        if "error" in result:
+            print(f"[{done}/{total}] {result['file']}: skipped, {result['error']}")
+            return
+        state = "cached" if result["cached"] else f"{result['seconds']:.2f} s"
+        print(f"[{done}/{total}] {result['file']}: {len(result['events'])} events, occupancy {result['occupancy']:.2%} ({state})")
+
+    summary = reprocess_folder(folder_path, options, args.workers, not args.no_cache, progress)
+    with open(output_path, "w") as f:
+        json.dump(summary, f, indent=1)
+    rate = summary["bytes_processed"] / summary["seconds"] / 1e6 if summary["seconds"] > 0 else 0.0
+    skipped = f", {len(summary['skipped'])} skipped" if summary["skipped"] else ""
+    print(f"Reprocessed {summary['processed']} files ({summary['cached']} cached{skipped}) in {summary['seconds']:.2f} s "
+          f"({rate:.0f} MB/s): {len(summary['events'])} events, occupancy {summary['occupancy']:.2%}. Summary: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
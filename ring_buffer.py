@@ -0,0 +1,77 @@
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedRing:
+    """Preallocated sample blocks in one shared memory segment, handed between processes by slot number.
+
+    The producer acquires a free slot, fills blocks[slot] in place and sends
+    only the slot number to each consumer, which reads the same memory through
+    its own NumPy view: samples are never copied or pickled. A slot returns to
+    the free list once every consumer has released it. When none is free the
+    producer is told so and the overflow is counted, as Pipeline counts
+    dropped blocks; high_water records the most slots ever in flight.
+
+    Consumers must be forked after the ring is created so they inherit the
+    mapping; the free list and hold counts live on the producer's side.
+    """
+
+    def __init__(self, slots, block_size, consumers=1, dtype=np.complex64):
+        self.slots = slots
+        self.block_size = block_size
+        self.consumers = consumers
+        self.dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * block_size * self.dtype.itemsize)
+        self.blocks = np.ndarray((slots, block_size), dtype=self.dtype, buffer=self.shm.buf)
+        self.free = queue.SimpleQueue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.pending = [0] * slots
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.high_water = 0
+        self.overflows = 0
+
+    def acquire(self):
+        """Returns a free slot to fill, or None (counted as an overflow) if every slot is in flight."""
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            self.overflows += 1
+            return None
+        with self.lock:
+            self.in_use += 1
+            self.high_water = max(self.high_water, self.in_use)
+        return slot
+
+    def publish(self, slot):
+        """Marks a filled slot as held by every consumer until each releases it."""
+        self.pending[slot] = self.consumers
+
+    def release(self, slot):
+        """One consumer is done with slot; the last one returns it to the free list."""
+        with self.lock:
+            self.pending[slot] -= 1
+            if self.pending[slot] > 0:
+                return
+            self.in_use -= 1
+        self.free.put(slot)
+
+    def abandon(self, slot):
+        """Returns a slot that was acquired but never published."""
+        with self.lock:
+            self.in_use -= 1
+        self.free.put(slot)
+
+    def reset_stats(self):
+        self.overflows = 0
+        self.high_water = self.in_use
+
+    def close(self):
+        """Unmaps and removes the segment; only the producer calls this."""
+        self.blocks = None
+        self.shm.close()
+        self.shm.unlink()
@@ -1,10 +1,34 @@
 import os
 import sys
+import json
+import asyncio
 import argparse
 import subprocess
+import multiprocessing
 import datetime
 import time
+import shutil
 import datetime
+import sqlite3
+import threading
+from collections import deque
+
+import logwriter
+from checkpoint import plan_path, read_checkpoint, remove_checkpoints, worker_path, write_checkpoint
+from instrument import Instrumentation, StackSampler, profile_path, timing_path
+from occupancy import OccupancyStore, db_path
+from storage import StorageManager
+from status_server import DEFAULT_PORT, QueueReporter, StatusBoard, forward_updates, start_status_server
+from sweep_policy import POLICIES, create_policy
+from sweep_plan import (ORDERS, PLAN_NAME, compile_plan, describe_plan, estimate_plan, load_plan, measured_overhead,
+                        save_plan)
+
+
+FLOWGRAPH_PATH = os.path.expanduser("~/Desktop/RFI/flowgraph.py")
+STDERR_LINES = 20  # Engine stderr lines kept for the log when it dies
+RETRY_DELAY = 0.5  # Seconds before the first retry of a failed step, doubling per consecutive failure
+MAX_RETRY_DELAY = 30.0
+MAX_STEP_FAILURES = 6  # Consecutive failed steps after which the sweep is abandoned
 
 
 def create_data_folder():
@@ -31,110 +55,618 @@ def get_total_runtime(startTime):
     totalRuntime = timeDifference.total_seconds()
     return totalRuntime
 
-def run_flowgraph(center_freq, sampling_rate, bandwidth, output_file, observation_interval, log_path, start_time, observation_time):
-    """Runs the flowgraph script and stops it after the observation interval."""
-    try:
-        touch_cmd = ["touch", output_file]
-        subprocess.run(touch_cmd, check=True)
+class CaptureEngine:
+    """Asyncio client for a persistent flowgraph.py engine retuned over a stdin/stdout pipe.
 
+    The engine's stderr is drained continuously and its last lines kept, so
+    the reason it died can be logged.
+    """
+
+    def __init__(self, sampling_rate, bandwidth, log_path, engine_args=(), flowgraph_path=FLOWGRAPH_PATH):
+        self.sampling_rate = sampling_rate
+        self.bandwidth = bandwidth
+        self.log_path = log_path
+        self.engine_args = list(engine_args)
+        self.flowgraph_path = flowgraph_path
+        self.process = None
+        self.stderr = deque(maxlen=STDERR_LINES)
+        self.stderr_reader = None
+        self.lock = asyncio.Lock()  # One request in flight on the pipe at a time
+
+    async def start(self):
+        """Starts the engine process once for the whole observation."""
         cmd = [
-            "python3", os.path.expanduser("~/Desktop/RFI/flowgraph.py"),
-            "--center_freq", str(center_freq),
-            "--sampling_rate", str(sampling_rate),
-            "--bandwidth", str(bandwidth),
-            "--output_file", output_file
-        ]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        log_message(log_path, f"Started flowgraph (PID: {process.pid}) for center frequency {center_freq} Hz.")
-        
-        # Wait for the observation interval
-        sleep_total = 0
-        while sleep_total < observation_interval:
-            time.sleep(1)
-            if get_total_runtime(start_time) >= observation_time:
-                break
-            sleep_total += 1
-        
-        
-        # Attempt to terminate the process
-        process.terminate()
-        process.wait(timeout=5)
-        log_message(log_path, f"Flowgraph terminated successfully (PID: {process.pid}).")
-        
-        sleep_total = 0
-        while sleep_total < 10:
-            time.sleep(1)
-            if get_total_runtime(start_time) >= observation_time:
+            "python3", self.flowgraph_path,
+            "--control",
+            "--sampling_rate", str(self.sampling_rate),
+            "--bandwidth", str(self.bandwidth)
+        ] + self.engine_args
+        self.process = await asyncio.create_subprocess_exec(*cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                            stderr=subprocess.PIPE)
+        self.stderr.clear()
+        self.stderr_reader = asyncio.ensure_future(self.read_stderr(self.process.stderr))
+        log_message(self.log_path, f"Started capture engine (PID: {self.process.pid}).")
+
+    async def read_stderr(self, stream):
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            self.stderr.append(line.decode(errors="replace").rstrip())
+
+    async def exit_reason(self):
+        """Waits for an engine that closed its pipe to exit and describes why, with its last stderr lines."""
+        code = await self.process.wait()
+        if self.stderr_reader is not None:
+            await self.stderr_reader
+        reason = f"Capture engine (PID: {self.process.pid}) exited with code {code}"
+        if self.stderr:
+            reason += ". Its last output:\n" + "\n".join(self.stderr)
+        return reason
+
+    def is_running(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def request(self, cmd, **params):
+        """Sends one command to the engine and awaits its reply."""
+        params["cmd"] = cmd
+        async with self.lock:
+            try:
+                self.process.stdin.write((json.dumps(params) + "\n").encode())
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                raise RuntimeError(await self.exit_reason())
+            line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(await self.exit_reason())
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "Unknown engine error"))
+        return reply
+
+    async def retune(self, center_freq, output_file, profile=None):
+        """Retunes the engine and starts a capture, returning the retune latency in seconds.
+
+        With a profile path the engine samples its threads until the capture stops.
+        """
+        tune_start = time.monotonic()
+        await self.request("tune", center_freq=center_freq, output_file=output_file, profile=profile)
+        return time.monotonic() - tune_start
+
+    async def stop_capture(self):
+        """Stops the current capture and returns the engine's reply."""
+        return await self.request("stop")
+
+    async def close(self):
+        """Asks the engine to quit and awaits its exit, killing it if needed."""
+        if not self.is_running():
+            return
+        try:
+            await self.request("quit")
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+            log_message(self.log_path, f"Capture engine terminated successfully (PID: {self.process.pid}).")
+        except Exception:
+            self.process.kill()
+            await self.process.wait()
+            log_message(self.log_path, f"Capture engine (PID: {self.process.pid}) was forcefully terminated.")
+
+
+async def run_step(engine, center_freq, output_file, dwell, observation_deadline, profile=None):
+    """Captures one band for the dwell and returns (retune latency, capture stats).
+
+    The dwell is timed on the event loop's monotonic clock from the moment the
+    engine acknowledges the retune, and never runs past observation_deadline.
+    The stats gain the planned and actual dwell so jitter can be measured, and
+    how long the engine took to stop the capture.
+    """
+    loop = asyncio.get_running_loop()
+    latency = await engine.retune(center_freq, output_file, profile)
+
+    capture_start = loop.time()
+    deadline = min(capture_start + dwell, observation_deadline)
+    await asyncio.sleep(max(0.0, deadline - loop.time()))
+    stop_time = loop.time()
+
+    stats = await engine.stop_capture()
+    if stats.get("error"):
+        raise RuntimeError(stats["error"])
+    stats["planned_dwell"] = max(0.0, deadline - capture_start)
+    stats["actual_dwell"] = stop_time - capture_start
+    stats["stop_latency"] = loop.time() - stop_time
+    return latency, stats
+
+
+async def stream_preview(engine, worker, status, interval):
+    """Forwards the engine's newest preview frame to the status board at most once per interval."""
+    since = 0.0
+    while True:
+        await asyncio.sleep(interval)
+        if not engine.is_running():
+            continue
+        try:
+            frame = (await engine.request("preview", since=since))["frame"]
+        except Exception:
+            continue  # The step loop reports and recovers engine failures
+        if frame:
+            since = frame["time"]
+            status.add_frame(worker, frame)
+
+
+def log_message(log_path, message, **fields):
+    """Queues a log message for the log file and stdout without blocking the caller."""
+    logwriter.get_writer(log_path).write(message, **fields)
+
+
+def build_engine_args(args, device):
+    """Builds the capture engine command line options for one device."""
+    engine_args = [
+        "--source", args.source, "--device", device, "--tones", args.tones,
+        "--product", args.product, "--fft_size", str(args.fft_size), "--window", args.window,
+        "--overlap", str(args.overlap), "--integration_time", str(args.integration_time), "--n_sigma", str(args.n_sigma)
+    ]
+    if args.max_hold:
+        engine_args.append("--max_hold")
+    if args.kurtosis:
+        engine_args.append("--kurtosis")
+    if args.detect:
+        engine_args.append("--detect")
+    if not args.no_occupancy:
+        engine_args.append("--occupancy")
+    if args.processes:
+        engine_args.append("--processes")
+    return engine_args
+
+
+def store_occupancy(store, channel_stats, output_file, log_path, prefix):
+    """Adds one step's channel statistics to the occupancy database; runs on an executor thread."""
+    try:
+        store.add_summary(channel_stats, os.path.basename(output_file))
+    except sqlite3.Error as e:
+        log_message(log_path, f"{prefix}Occupancy database update failed: {e}")
+
+
+async def run_sweep(engine, policy, args, folder_path, log_path, start_time, worker=0, status=None,
+                    checkpoint_file=None, resume_state=None, space_ok=None, timing=None, occupancy=None):
+    """Runs sweep steps chosen by the policy until the observation time is used up.
+
+    Progress is reported to status (a StatusBoard or QueueReporter) when given,
+    and saved to checkpoint_file after every step so a restarted scheduler can
+    continue with the next band; resume_state is such a checkpoint. Capture
+    pauses while the storage manager's space_ok event is cleared. Each step's
+    channel statistics go to the occupancy store (an OccupancyStore) in the
+    background. With timing (an Instrumentation), every step's stages are
+    recorded, and step args.profile_step is profiled on both sides of the pipe.
+    Returns the totals used to compute the duty cycle.
+    """
+    loop = asyncio.get_running_loop()
+    prefix = f"[worker {worker}] " if args.workers > 1 else ""
+    bandwidth = args.bandwidth
+    observation_deadline = loop.time() + args.observation_time - get_total_runtime(start_time)
+    totals = {"steps": 0, "capture_time": 0.0, "wall_time": 0.0, "bytes_written": 0}
+    sweep_pass = resume_state["sweep_pass"] if resume_state else 0
+    run_start = time.monotonic()
+
+    step = None
+    sweep_steps = resume_state["step_in_pass"] if resume_state else 0
+    sweep_start = time.monotonic()
+    sweep_capture_time = 0.0
+    sweep_latencies = []
+    sweep_jitter = []
+    sweep_checkpoint_times = []
+    pending_checkpoint = None
+    pending_occupancy = None
+    parent = multiprocessing.parent_process()
+    failures = 0
+
+    while loop.time() < observation_deadline:
+        if parent is not None and not parent.is_alive():
+            # Orphaned pool worker: stop rather than race a resumed run for the receiver and checkpoint
+            log_message(log_path, f"{prefix}Scheduler process is gone; stopping.")
+            break
+        if space_ok is not None and not space_ok.is_set():
+            log_message(log_path, f"{prefix}Storage full: capture paused.")
+            if status:
+                status.update(worker, paused=True)
+            while not space_ok.is_set() and loop.time() < observation_deadline:
+                await asyncio.sleep(1.0)
+            if status:
+                status.update(worker, paused=False)
+            continue
+        # A failed step is retried on the same band
+        policy_time = None
+        if step is None:
+            policy_start = time.monotonic()
+            step = policy.next_step(policy_start)
+            policy_time = time.monotonic() - policy_start
+        current_freq, dwell = step
+        center_freq = compute_center_frequency(current_freq, bandwidth)
+        # Milliseconds keep sub-second dwells on the same band from reusing a name
+        timestamp = datetime.datetime.now().strftime("%d_%m_%Y_%H_%M_%S_%f")[:-3]
+        output_file = generate_filename(folder_path, current_freq, timestamp)
+
+        log_message(log_path, f"{prefix}Capturing center frequency {center_freq} Hz for {dwell:.3f} s...")
+        if status:
+            status.update(worker, band=center_freq, dwell=dwell, sweep_pass=sweep_pass, step_in_pass=sweep_steps,
+                          steps_per_pass=policy.steps_per_pass)
+        profile = None
+        sampler = None
+        if args.profile_step == totals["steps"] + 1:
+            profile = profile_path(folder_path, worker, totals["steps"] + 1, "engine")
+            sampler = StackSampler().start()
+        step_start = time.monotonic()
+        try:
+            latency, stats = await run_step(engine, center_freq, output_file, dwell, observation_deadline, profile)
+        except Exception as e:
+            if sampler:
+                sampler.stop()
+            failures += 1
+            if failures >= MAX_STEP_FAILURES:
+                log_message(log_path, f"{prefix}Error: {e}. Giving up after {failures} consecutive failed steps.")
                 break
-            sleep_total += 1
-        #time.sleep(10) # Let's wait 10 seocnds here
-        return process.communicate()
-    except subprocess.TimeoutExpired:
-        # Force kill if the process doesn't terminate
-        process.kill()
-        log_message(log_path, f"Flowgraph (PID: {process.pid}) was forcefully terminated.")
-        return None, f"Forcefully terminated process with PID {process.pid}"
-    except Exception as e:
-        return None, str(e)
-
-
-def log_message(log_path, message):
-    """Writes a log message to the log file and prints it."""
-    with open(log_path, "a") as log_file:
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_file.write(f"[{timestamp}] {message}\n")
-    print(message)
+            delay = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (failures - 1))
+            log_message(log_path, f"{prefix}Error: {e}. Retrying in {delay:.1f} s...")
+            await asyncio.sleep(max(0.0, min(delay, observation_deadline - loop.time())))
+            if not engine.is_running():
+                restart_start = time.monotonic()
+                try:
+                    await engine.start()
+                except OSError as start_error:
+                    log_message(log_path, f"{prefix}Capture engine could not be started: {start_error}")
+                if timing:
+                    timing.record("engine_start", time.monotonic() - restart_start)
+            continue
+        step = None
+        failures = 0
+        bookkeeping_start = time.monotonic()
+        channel_stats = stats.pop("channel_stats", None)
+        if occupancy and channel_stats:
+            # Like the checkpoint, the database write overlaps the next step, one at a time
+            if pending_occupancy:
+                await pending_occupancy
+            pending_occupancy = loop.run_in_executor(None, store_occupancy, occupancy, channel_stats, output_file,
+                                                     log_path, prefix)
+        policy.update(current_freq, stats, time.monotonic())
+
+        totals["steps"] += 1
+        totals["capture_time"] += stats["capture_time"]
+        totals["bytes_written"] += stats["bytes_written"]
+        sweep_capture_time += stats["capture_time"]
+        sweep_latencies.append(latency)
+        jitter = stats["actual_dwell"] - stats["planned_dwell"]
+        sweep_jitter.append(abs(jitter))
+        log_message(log_path, f"{prefix}Dwell planned {stats['planned_dwell']:.3f} s, actual {stats['actual_dwell']:.3f} s, jitter {jitter * 1000:+.2f} ms.")
+        log_message(log_path, f"{prefix}Capture completed. Retune latency: {latency * 1000:.1f} ms, capture time: {stats['capture_time']:.3f} s, "
+                              f"rate: {stats['samples_per_second'] / 1e6:.2f} MS/s, dropped blocks: {stats['dropped_blocks']}, overflows: {stats['overflows']}, bytes written: {stats['bytes_written']}.",
+                    event="step", worker=worker, center_freq=center_freq, retune_latency=latency, **stats)
+        if "events" in stats:
+            log_message(log_path, f"{prefix}Detected {stats['events']} RFI events, occupancy {stats['occupancy']:.2%}.")
+        if status:
+            step_wall_time = time.monotonic() - step_start
+            status.update(worker, steps=totals["steps"], bytes_written=totals["bytes_written"],
+                          dwell_efficiency=stats["capture_time"] / step_wall_time if step_wall_time > 0 else 0.0,
+                          duty_cycle=totals["capture_time"] / (time.monotonic() - run_start))
+
+        sweep_steps += 1
+        pass_complete = sweep_steps >= policy.steps_per_pass
+        if checkpoint_file:
+            # The fsynced write runs on a thread during the next step; only one is ever in flight
+            checkpoint_start = time.perf_counter()
+            if pending_checkpoint:
+                await pending_checkpoint
+            state = {
+                "worker": worker, "bands": policy.bands, "last_band": current_freq,
+                "sweep_pass": sweep_pass + 1 if pass_complete else sweep_pass,
+                "step_in_pass": 0 if pass_complete else sweep_steps,
+                "elapsed": get_total_runtime(start_time), "policy": policy.state(time.monotonic()),
+            }
+            pending_checkpoint = loop.run_in_executor(None, write_checkpoint, checkpoint_file, state)
+            sweep_checkpoint_times.append(time.perf_counter() - checkpoint_start)
+        if sampler:
+            scheduler_profile = sampler.write(profile_path(folder_path, worker, totals["steps"], "scheduler"))
+            log_message(log_path, f"{prefix}Profiled step {totals['steps']}: {stats.get('profile')} and {scheduler_profile}.")
+        if timing:
+            step_end = time.monotonic()
+            timing.record_step(policy=policy_time, retune=latency, dwell=stats["actual_dwell"],
+                               stop=stats["stop_latency"], engine_read=stats.get("read_time"),
+                               engine_process=stats.get("process_time"), engine_write=stats.get("write_time"),
+                               engine_close=stats.get("close_time"), bookkeeping=step_end - bookkeeping_start,
+                               step=step_end - step_start, overhead=step_end - step_start - stats["actual_dwell"])
+        if pass_complete or loop.time() >= observation_deadline:
+            sweep_wall_time = time.monotonic() - sweep_start
+            if sweep_latencies and sweep_wall_time > 0:
+                efficiency = sweep_capture_time / sweep_wall_time
+                mean_latency = sum(sweep_latencies) / len(sweep_latencies)
+                checkpoint_time = sum(sweep_checkpoint_times) / len(sweep_checkpoint_times) if sweep_checkpoint_times else 0.0
+                log_message(log_path, f"{prefix}Sweep completed: {len(sweep_latencies)} bands in {sweep_wall_time:.3f} s, dwell efficiency {efficiency:.1%}, "
+                                      f"mean retune latency {mean_latency * 1000:.1f} ms, max dwell jitter {max(sweep_jitter) * 1000:.2f} ms, "
+                                      f"mean checkpoint overhead {checkpoint_time * 1000:.2f} ms.",
+                            event="sweep", worker=worker, bands=len(sweep_latencies), wall_time=sweep_wall_time,
+                            dwell_efficiency=efficiency, mean_retune_latency=mean_latency, max_jitter=max(sweep_jitter),
+                            checkpoint_time=checkpoint_time)
+            sweep_steps = 0
+            sweep_pass += 1
+            sweep_start = time.monotonic()
+            sweep_capture_time = 0.0
+            sweep_latencies = []
+            sweep_jitter = []
+            sweep_checkpoint_times = []
+
+    if pending_checkpoint:
+        await pending_checkpoint
+    if pending_occupancy:
+        await pending_occupancy
+    if timing:
+        timing.dump()
+        log_message(log_path, f"{prefix}Step timing {timing.describe()}; histograms in {timing.path}.")
+    totals["wall_time"] = time.monotonic() - run_start
+    return totals
+
+
+async def sweep_bands(worker, bands, device, args, folder_path, log_path, start_time, checkpoint_file=None, status=None,
+                      space_ok=None):
+    """Sweeps one group of bands with its own capture engine and device on an asyncio event loop."""
+    prefix = f"[worker {worker}] " if args.workers > 1 else ""
+    engine = CaptureEngine(args.sampling_rate, args.bandwidth, log_path, build_engine_args(args, device))
+    timing = None
+    if args.instrument:
+        timing = Instrumentation(timing_path(folder_path, worker), args.timing_interval)
+    engine_start = time.monotonic()
+    await engine.start()
+    if timing:
+        timing.record("engine_start", time.monotonic() - engine_start)
+    occupancy = None
+    if not args.no_occupancy:
+        try:
+            occupancy = OccupancyStore(db_path(os.path.dirname(folder_path)))
+        except sqlite3.Error as e:
+            log_message(log_path, f"{prefix}Occupancy database unavailable: {e}")
+    policy = create_policy(args.policy, bands, args.observation_interval, args.max_revisit, args.step_overhead)
+    log_message(log_path, f"{prefix}Sweeping {len(bands)} bands from {bands[0]} Hz with the {policy.name} policy.")
+    if getattr(policy, "capped", False):
+        log_message(log_path, f"{prefix}Warning: a pass at the longest dwell exceeds the {policy.max_revisit:.1f} s maximum "
+                              f"revisit interval, so dwells on active bands will be shortened to meet it.")
+    resume_state = read_checkpoint(checkpoint_file) if args.resume and checkpoint_file else None
+    if resume_state and resume_state.get("bands") == bands:
+        policy.restore(resume_state["policy"], time.monotonic())
+        log_message(log_path, f"{prefix}Resuming at pass {resume_state['sweep_pass'] + 1}, step {resume_state['step_in_pass'] + 1} "
+                              f"after band {resume_state['last_band']} Hz.")
+    else:
+        resume_state = None
+    preview = None
+    if status and args.preview_interval > 0:
+        preview = asyncio.create_task(stream_preview(engine, worker, status, args.preview_interval))
+    try:
+        return await run_sweep(engine, policy, args, folder_path, log_path, start_time, worker, status,
+                               checkpoint_file, resume_state, space_ok, timing, occupancy)
+    finally:
+        if preview:
+            preview.cancel()
+        await engine.close()
+        if occupancy:
+            occupancy.close()
+
+
+pool_status = None
+pool_space_ok = None
+
+
+def init_pool_worker(updates, space_ok, log_settings):
+    """Pool initializer: gives each worker process the status queue, the storage backpressure event and the log options."""
+    global pool_status, pool_space_ok
+    logwriter.configure(**log_settings)
+    pool_status = QueueReporter(updates)
+    pool_space_ok = space_ok
+
+
+def sweep_worker(worker, bands, device, args, folder_path, log_path, start_time, checkpoint_file=None, status=None,
+                 space_ok=None):
+    """Pool worker: runs sweep_bands on a fresh event loop."""
+    status = status or pool_status
+    space_ok = space_ok or pool_space_ok
+    try:
+        totals = asyncio.run(sweep_bands(worker, bands, device, args, folder_path, log_path, start_time,
+                                         checkpoint_file, status, space_ok))
+    finally:
+        if multiprocessing.parent_process() is not None:
+            # Pool processes exit without running atexit handlers
+            logwriter.close_all()
+    totals["worker"] = worker
+    totals["bands"] = len(bands)
+    return totals
 
 
 def main():
     start_time = datetime.datetime.now()
 
     parser = argparse.ArgumentParser(description="Scheduler for flowgraph execution.")
-    parser.add_argument("--start_freq", type=float, required=True, help="Starting frequency in Hz")
-    parser.add_argument("--end_freq", type=float, required=True, help="Ending frequency in Hz")
-    parser.add_argument("--bandwidth", type=float, required=True, help="Bandwidth in Hz")
-    parser.add_argument("--sampling_rate", type=float, required=True, help="Sampling rate in Hz")
-    parser.add_argument("--observation_interval", type=float, required=True, help="Observation interval in seconds")
-    parser.add_argument("--observation_time", type=float, required=True, help="Total observation time in seconds")
+    parser.add_argument("--start_freq", type=float, help="Starting frequency in Hz")
+    parser.add_argument("--end_freq", type=float, help="Ending frequency in Hz")
+    parser.add_argument("--bandwidth", type=float, help="Bandwidth in Hz")
+    parser.add_argument("--sampling_rate", type=float, help="Sampling rate in Hz")
+    parser.add_argument("--observation_interval", type=float, help="Observation interval in seconds")
+    parser.add_argument("--observation_time", type=float, help="Total observation time in seconds")
+    parser.add_argument("--source", choices=["synthetic", "soapy"], default="synthetic", help="Sample source used by the capture engine")
+    parser.add_argument("--device", default="", help="SoapySDR device arguments")
+    parser.add_argument("--tones", default="", help="Synthetic tones as freq:power_db,...")
+    parser.add_argument("--product", choices=["iq", "spectra"], default="spectra", help="Store raw IQ or integrated spectra")
+    parser.add_argument("--fft_size", type=int, default=1024, help="FFT size for spectra")
+    parser.add_argument("--window", default="hann", help="FFT window (rect, hann, hamming, blackman)")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Fractional overlap between FFT frames")
+    parser.add_argument("--integration_time", type=float, default=1.0, help="Seconds of data averaged per spectrum")
+    parser.add_argument("--max_hold", action="store_true", help="Also store max-hold spectra")
+    parser.add_argument("--kurtosis", action="store_true", help="Also store spectral kurtosis spectra")
+    parser.add_argument("--detect", action="store_true", help="Run RFI detection and record events in events.jsonl")
+    parser.add_argument("--n_sigma", type=float, default=6.0, help="Detection threshold in robust sigmas above the median")
+    parser.add_argument("--processes", action="store_true", help="Run the engine's processing and file writing in separate processes fed through shared memory")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="raster", help="Sweep scheduling policy")
+    parser.add_argument("--max_revisit", type=float, help="Adaptive policy: longest time in seconds any band may go unvisited (default: one pass at the longest dwell)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of receivers sweeping the range in parallel")
+    parser.add_argument("--devices", default="", help="Semicolon separated SoapySDR device arguments, one per worker")
+    parser.add_argument("--log_format", choices=["text", "json"], default="text", help="Write log.txt as plain text or JSON lines")
+    parser.add_argument("--log_max_bytes", type=int, default=50 * 1024 * 1024, help="Rotate log.txt once it grows past this size")
+    parser.add_argument("--status_port", type=int, default=DEFAULT_PORT, help="Localhost port of the JSON status endpoint (0 disables it)")
+    parser.add_argument("--preview_interval", type=float, default=1.0, help="Seconds between live spectrum frames on the status endpoint (0 disables them)")
+    parser.add_argument("--storage_budget", type=float, help="Bytes the data root may use; the oldest raw IQ is dropped, then capture pauses")
+    parser.add_argument("--min_free", type=float, default=1e9, help="Pause capture while the disk has fewer free bytes than this")
+    parser.add_argument("--no_compress", action="store_true", help="Keep finished captures uncompressed")
+    parser.add_argument("--iq_bits", type=int, choices=[8, 16], default=16, help="Bits per I and Q component for compressed IQ")
+    parser.add_argument("--iq_retention_hours", type=float, help="Delete raw IQ captures older than this, keeping spectra")
+    parser.add_argument("--retention_hours", type=float, help="Delete all captures older than this")
+    parser.add_argument("--resume", action="store_true", help="Continue the interrupted run recorded in the checkpoint; all other options come from it")
+    parser.add_argument("--no_checkpoint", action="store_true", help="Do not write checkpoints, so the run cannot be resumed")
+    parser.add_argument("--plan", help="Run a plan compiled by sweep_plan.py (or the GUI) as stored; its sweep options replace those given here")
+    parser.add_argument("--band_overlap", type=float, default=0.0, help="Fraction of the bandwidth adjacent bands share, for filter roll-off")
+    parser.add_argument("--band_order", choices=ORDERS, default="ascending", help="Visiting order of the bands in a pass")
+    parser.add_argument("--step_overhead", type=float, help="Seconds per step beyond the dwell for the plan's estimates (default: measured)")
+    parser.add_argument("--no_occupancy", action="store_true", help="Do not record channel occupancy in the database under the data root")
+    parser.add_argument("--instrument", action="store_true", help="Record per-stage step timings and write p50/p99 histograms to timing_<worker>.json")
+    parser.add_argument("--timing_interval", type=float, default=60.0, help="Seconds between timing histogram dumps")
+    parser.add_argument("--profile_step", type=int, help="Write sampling profiles of the scheduler and engine for this step (1 = first)")
     args = parser.parse_args()
 
     # Variables
     folder_path = create_data_folder()
+    data_root = os.path.dirname(folder_path)
+    plan = None
+    sweep_plan = None
+    if args.resume:
+        plan = read_checkpoint(plan_path(data_root))
+        if plan is None:
+            parser.error(f"--resume: no checkpoint found in {data_root}")
+        # Options added since the checkpoint was written keep their defaults;
+        # diagnostics are chosen per invocation rather than restored
+        restored = vars(parser.parse_args([]))
+        restored.update(plan["args"])
+        restored.update(resume=True, instrument=args.instrument, timing_interval=args.timing_interval,
+                        profile_step=args.profile_step)
+        args = argparse.Namespace(**restored)
+        # Only observation time actually spent counts: the time the scheduler was down is not lost
+        progress = [read_checkpoint(worker_path(data_root, worker)) or {} for worker in range(len(plan["groups"]))]
+        elapsed = max([0.0] + [state.get("elapsed", 0.0) for state in progress])
+        start_time -= datetime.timedelta(seconds=elapsed)
+    else:
+        loaded_plan = None
+        if args.plan:
+            try:
+                loaded_plan = load_plan(os.path.expanduser(args.plan))
+            except (OSError, ValueError) as e:
+                parser.error(f"--plan: {e}")
+            for name, value in loaded_plan["params"].items():
+                setattr(args, name, value)
+        missing = [name for name in ("start_freq", "end_freq", "bandwidth", "sampling_rate", "observation_interval",
+                                     "observation_time") if getattr(args, name) is None]
+        if missing:
+            parser.error("the following arguments are required: " + ", ".join(f"--{name}" for name in missing))
+        step_overhead = args.step_overhead if args.step_overhead is not None else measured_overhead(data_root)
+        products = 1 + args.max_hold + args.kurtosis
+        if loaded_plan:
+            # The plan's bands run as stored; only its estimates are redone with the
+            # step overhead measured here rather than the default the GUI had to assume
+            sweep_plan = estimate_plan(loaded_plan, args.product, args.fft_size, args.integration_time, products,
+                                       step_overhead)
+        else:
+            try:
+                sweep_plan = compile_plan(args.start_freq, args.end_freq, args.bandwidth, args.sampling_rate,
+                                          args.observation_interval, args.observation_time, args.band_overlap,
+                                          args.band_order, max(1, args.workers), args.product, args.fft_size,
+                                          args.integration_time, products, step_overhead)
+            except ValueError as e:
+                parser.error(str(e))
+    logwriter.configure(json_lines=args.log_format == "json", max_bytes=args.log_max_bytes)
     log_path = os.path.join(folder_path, "log.txt")
     log_message(log_path, "Scheduler started.")
+    if plan:
+        log_message(log_path, f"Resuming the run started {plan['start_time']}: {get_total_runtime(start_time):.0f} s of "
+                              f"{args.observation_time:.0f} s observation time already used.")
 
-    start_freq = args.start_freq
-    end_freq = args.end_freq
-    bandwidth = args.bandwidth
-    sampling_rate = args.sampling_rate
-    observation_interval = args.observation_interval
-    observation_time = args.observation_time
+    if args.policy == "adaptive" and not args.detect:
+        # The adaptive policy is driven by the occupancy the detector reports
+        args.detect = True
+        log_message(log_path, "Adaptive policy selected: enabling RFI detection.")
 
-    initial_start_freq = start_freq  # Preserve the initial start frequency
-    total_runtime = 0
+    if plan:
+        groups, devices = plan["groups"], plan["devices"]
+        bands = [band for group in groups for band in group]
+    else:
+        save_plan(os.path.join(folder_path, PLAN_NAME), sweep_plan)
+        log_message(log_path, describe_plan(sweep_plan))
+        for warning in sweep_plan["warnings"]:
+            log_message(log_path, f"Warning: {warning}")
+        total_bytes = sweep_plan["estimates"]["total_bytes"]
+        disk_free = shutil.disk_usage(data_root).free
+        if total_bytes > disk_free:
+            log_message(log_path, f"Warning: the run may write {total_bytes / 1e9:.1f} GB with {disk_free / 1e9:.1f} GB free; "
+                                  f"the storage manager will drop raw IQ or pause capture when space runs out.")
+        bands = sweep_plan["bands"]
+        groups = sweep_plan["groups"]
+        # The adaptive policy's revisit deadlines use the same step overhead as the plan's estimates
+        args.step_overhead = sweep_plan["estimates"]["step_overhead"]
+        devices = args.devices.split(";") if args.devices else [args.device] * len(groups)
+        if len(devices) < len(groups):
+            parser.error(f"--devices lists {len(devices)} devices for {len(groups)} workers")
+        for group in groups:
+            try:
+                create_policy(args.policy, group, args.observation_interval, args.max_revisit, args.step_overhead)
+            except ValueError as e:
+                parser.error(f"--max_revisit: {e}")
+        args.workers = len(groups)
+        if not args.no_checkpoint:
+            remove_checkpoints(data_root)
+            write_checkpoint(plan_path(data_root), {"args": vars(args), "groups": groups, "devices": devices,
+                                                    "start_time": start_time.isoformat()})
 
-    while get_total_runtime(start_time) < observation_time:
-        current_freq = start_freq
+    board = StatusBoard(folder_path, args.observation_time, start_time.timestamp(), policy=args.policy, bands=len(bands), worker_count=len(groups),
+                        start_freq=args.start_freq, end_freq=args.end_freq, bandwidth=args.bandwidth,
+                        freq_lo=min(bands), freq_hi=max(bands) + args.bandwidth,
+                        sampling_rate=args.sampling_rate, observation_interval=args.observation_interval)
+    server = None
+    if args.status_port:
+        try:
+            server = start_status_server(board, args.status_port)
+            log_message(log_path, f"Status endpoint listening on 127.0.0.1:{args.status_port}.")
+        except OSError as e:
+            log_message(log_path, f"Status endpoint unavailable on port {args.status_port}: {e}")
 
-        while current_freq <= end_freq:
-            center_freq = compute_center_frequency(current_freq, bandwidth)
-            timestamp = datetime.datetime.now().strftime("%d_%m_%Y_%H_%M_%S")
-            output_file = generate_filename(folder_path, current_freq, timestamp)
+    # Pool workers are started by a fork server: by now the log writer, storage, status
+    # server and forwarder threads are running, and a plain fork could copy one of their
+    # locks while held
+    context = multiprocessing.get_context("forkserver")
+    storage = StorageManager(data_root, args.storage_budget, args.min_free, not args.no_compress, args.iq_bits,
+                             args.iq_retention_hours, args.retention_hours,
+                             log=lambda message: log_message(log_path, message), context=context)
+    storage.start()
 
-            log_message(log_path, f"Running flowgraph for center frequency {center_freq} Hz...")
-            output, error = run_flowgraph(center_freq, sampling_rate, bandwidth, output_file, observation_interval, log_path, start_time, observation_time)
+    jobs = [(worker, group, devices[worker], args, folder_path, log_path, start_time,
+             None if args.no_checkpoint else worker_path(data_root, worker)) for worker, group in enumerate(groups)]
+    if len(jobs) == 1:
+        results = [sweep_worker(*jobs[0], status=board, space_ok=storage.space_ok)]
+    else:
+        log_message(log_path, f"Splitting {len(bands)} bands across {len(jobs)} workers.")
+        # Pool workers cannot share the board, so their updates come back over a queue. It is
+        # inherited through the initializer rather than served by a manager process, which
+        # would outlive a killed scheduler.
+        updates = context.Queue()
+        stop_forwarding = threading.Event()
+        forwarder = threading.Thread(target=forward_updates, args=(updates, board, stop_forwarding), daemon=True)
+        forwarder.start()
+        with context.Pool(len(jobs), initializer=init_pool_worker,
+                          initargs=(updates, storage.space_ok, dict(logwriter.settings))) as pool:
+            results = pool.starmap(sweep_worker, jobs)
+        stop_forwarding.set()
+        forwarder.join()
+    if server:
+        server.shutdown()
+    storage.stop()
+    log_message(log_path, storage.report())
 
-            if error:
-                log_message(log_path, f"Error: {error}. Retrying...")
-                continue
+    for result in results:
+        duty_cycle = result["capture_time"] / result["wall_time"] if result["wall_time"] > 0 else 0.0
+        log_message(log_path, f"Worker {result['worker']}: {result['bands']} bands, {result['steps']} steps, "
+                              f"capture {result['capture_time']:.1f} s of {result['wall_time']:.1f} s, duty cycle {duty_cycle:.1%}.",
+                    event="worker", duty_cycle=duty_cycle, **result)
 
-            log_message(log_path, f"Flowgraph completed. Output: {output.strip() if output else 'No output.'}")
-            current_freq += bandwidth
-            if (get_total_runtime(start_time) >= observation_time):
-                break
-        # Reset frequencies for next loop
-        start_freq = initial_start_freq
-    
+    if not args.no_checkpoint:
+        remove_checkpoints(data_root)
     log_message(log_path, "Observation complete. Scheduler terminated.")
 
 
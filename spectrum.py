@@ -0,0 +1,125 @@
+import numpy as np
+
+
+WINDOWS = {
+    "rect": np.ones,
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+}
+
+
+def make_window(name, fft_size):
+    """Returns the named window as float32."""
+    if name not in WINDOWS:
+        raise ValueError(f"Unknown window: {name}")
+    return WINDOWS[name](fft_size).astype(np.float32)
+
+
+def spectral_kurtosis(s1, s2, m):
+    """Generalised spectral kurtosis estimator from power sums; ~1 for Gaussian noise."""
+    s1 = np.maximum(s1, np.finfo(np.float32).tiny)
+    return ((m + 1) / (m - 1)) * (m * s2 / (s1 * s1) - 1)
+
+
+class SpectrumIntegrator:
+    """Reduces a stream of IQ blocks to integrated Welch power spectra.
+
+    Blocks are cut into overlapping windowed frames, transformed in one batched
+    FFT per block and accumulated until integration_time worth of frames has been
+    seen. Each finished integration is returned as a dict with the averaged
+    power spectrum (fftshifted, DC in the middle) and, if enabled, the max-hold
+    and spectral kurtosis spectra. Powers are scaled so white noise of unit
+    variance averages to 1 per bin.
+    """
+
+    def __init__(self, sampling_rate, fft_size=1024, window="hann", overlap=0.5, integration_time=1.0,
+                 max_hold=False, kurtosis=False):
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        self.sampling_rate = sampling_rate
+        self.fft_size = fft_size
+        self.window_name = window
+        self.window = make_window(window, fft_size)
+        self.scale = np.float32(1.0 / np.sum(self.window ** 2))
+        self.hop = max(1, int(round(fft_size * (1 - overlap))))
+        self.frames_per_integration = max(1, int(round(integration_time * sampling_rate / self.hop)))
+        self.max_hold = max_hold
+        self.kurtosis = kurtosis
+        self.carry = np.empty(0, dtype=np.complex64)
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.power_sum = np.zeros(self.fft_size, dtype=np.float64)
+        self.power_sq_sum = np.zeros(self.fft_size, dtype=np.float64) if self.kurtosis else None
+        self.power_max = np.zeros(self.fft_size, dtype=np.float32) if self.max_hold else None
+
+    def process(self, block):
+        """Consumes one IQ block and returns the list of integrations it completed."""
+        samples = np.concatenate((self.carry, block)) if len(self.carry) else block
+        count = (len(samples) - self.fft_size) // self.hop + 1 if len(samples) >= self.fft_size else 0
+        if count <= 0:
+            self.carry = np.array(samples, dtype=np.complex64)
+            return []
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.fft_size)[::self.hop][:count]
+        self.carry = np.array(samples[count * self.hop:], dtype=np.complex64)
+
+        spectra = np.fft.fft(frames * self.window, axis=1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        power *= self.scale
+
+        results = []
+        start = 0
+        while start < count:
+            take = min(count - start, self.frames_per_integration - self.frames)
+            self.accumulate(power[start:start + take])
+            start += take
+            if self.frames >= self.frames_per_integration:
+                results.append(self.finish())
+        return results
+
+    def accumulate(self, power):
+        self.frames += len(power)
+        self.power_sum += power.sum(axis=0, dtype=np.float64)
+        if self.kurtosis:
+            self.power_sq_sum += np.einsum("ij,ij->j", power, power, dtype=np.float64)
+        if self.max_hold:
+            np.maximum(self.power_max, power.max(axis=0), out=self.power_max)
+
+    def finish(self):
+        """Returns the current integration and starts a new one."""
+        result = {
+            "frames": self.frames,
+            "mean": np.fft.fftshift(self.power_sum / self.frames).astype(np.float32),
+        }
+        if self.max_hold:
+            result["max"] = np.fft.fftshift(self.power_max)
+        if self.kurtosis:
+            if self.frames > 1:
+                sk = spectral_kurtosis(self.power_sum, self.power_sq_sum, self.frames)
+            else:
+                sk = np.ones(self.fft_size)
+            result["kurtosis"] = np.fft.fftshift(sk).astype(np.float32)
+        self.reset()
+        return result
+
+    def flush(self):
+        """Returns the partial integration still being accumulated, if any."""
+        self.carry = np.empty(0, dtype=np.complex64)
+        if self.frames == 0:
+            return []
+        return [self.finish()]
+
+    @property
+    def integration_interval(self):
+        """Exact seconds of samples covered by one full integration."""
+        return self.frames_per_integration * self.hop / self.sampling_rate
+
+    def products(self):
+        """Names of the spectra written per integration, in order."""
+        return ["mean"] + (["max"] if self.max_hold else []) + (["kurtosis"] if self.kurtosis else [])
+
+    def frequencies(self, center_freq):
+        """Absolute frequency of each output bin in Hz."""
+        return center_freq + np.fft.fftshift(np.fft.fftfreq(self.fft_size, 1.0 / self.sampling_rate))
@@ -0,0 +1,369 @@
+import io
+import re
+import json
+import time
+import datetime
+import posixpath
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+
+class SSHConnectionManager:
+    """Keeps one authenticated SSH transport alive and runs commands on it concurrently.
+
+    Every command gets its own channel on the shared transport, so several can
+    be in flight at once without new handshakes. Commands run on a thread pool,
+    never on the caller's (UI) thread. The transport sends keepalives and is
+    re-established transparently if it drops.
+    """
+
+    def __init__(self, host, username, password, keepalive=15, max_workers=4, client_factory=paramiko.SSHClient):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.client_factory = client_factory
+        self.client = None
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ssh")
+
+    def connect(self):
+        """Opens the transport; called lazily by run() as well."""
+        with self.lock:
+            if self.is_connected():
+                return
+            if self.client is not None:
+                self.client.close()
+            client = self.client_factory()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(self.host, username=self.username, password=self.password)
+            client.get_transport().set_keepalive(self.keepalive)
+            self.client = client
+
+    def is_connected(self):
+        if self.client is None:
+            return False
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def run(self, command, timeout=None):
+        """Runs a command on its own channel and returns (output, error); blocks the calling thread."""
+        try:
+            self.connect()
+            _, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError):
+            # The transport died between commands: reconnect once and retry
+            with self.lock:
+                if self.client is not None:
+                    self.client.close()
+                self.client = None
+            self.connect()
+            _, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+        output = stdout.read().decode().strip()
+        error = stderr.read().decode().strip()
+        return output, error
+
+    def submit(self, command, timeout=None):
+        """Runs a command on the pool and returns a Future of (output, error)."""
+        return self.executor.submit(self.run, command, timeout)
+
+    def run_many(self, commands, timeout=None):
+        """Runs several commands concurrently over the one transport and returns their results in order."""
+        futures = [self.submit(command, timeout) for command in commands]
+        return [future.result() for future in futures]
+
+    def fetch_status(self, port, path="/status", timeout=5.0):
+        """GETs the scheduler's localhost status endpoint through a direct-tcpip channel on the shared transport.
+
+        Returns the decoded JSON, or None if nothing is listening (no scheduler running).
+        """
+        self.connect()
+        try:
+            channel = self.client.get_transport().open_channel("direct-tcpip", ("127.0.0.1", port), ("127.0.0.1", 0),
+                                                               timeout=timeout)
+        except paramiko.ChannelException:
+            return None
+        try:
+            channel.settimeout(timeout)
+            channel.sendall(f"GET {path} HTTP/1.0\r\nHost: 127.0.0.1\r\n\r\n".encode())
+            chunks = []
+            while True:
+                chunk = channel.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            channel.close()
+        head, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+        status_line = head.split(b"\r\n", 1)[0].split()
+        if len(status_line) < 2 or status_line[1] != b"200":
+            return None
+        return json.loads(body)
+
+    def submit_status(self, port, path="/status"):
+        """Fetches the status on the pool and returns a Future of the status dict or None."""
+        return self.executor.submit(self.fetch_status, port, path)
+
+    def open_sftp(self):
+        """Opens an SFTP session on the shared transport."""
+        self.connect()
+        return self.client.open_sftp()
+
+    def write_file(self, path, text):
+        """Writes text to a file on the server over SFTP, creating its folder; returns (output, error) like run()."""
+        sftp = self.open_sftp()
+        try:
+            folder = posixpath.dirname(path)
+            if folder:
+                try:
+                    sftp.stat(folder)
+                except IOError:
+                    sftp.mkdir(folder)
+            with sftp.open(path, "w") as f:
+                f.write(text)
+        finally:
+            sftp.close()
+        return "", ""
+
+    def submit_write_file(self, path, text):
+        """Writes a file on the pool and returns a Future of (output, error)."""
+        return self.executor.submit(self.write_file, path, text)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+
+LOG_LINE_PATTERN = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$")
+
+
+def parse_log_line(line):
+    """Parses a text or JSON lines scheduler log record into (timestamp, message, fields)."""
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return "", line, {}
+        timestamp = record.pop("time", "").replace("T", " ")
+        return timestamp, record.pop("message", ""), record
+    match = LOG_LINE_PATTERN.match(line)
+    if match:
+        return match.group(1), match.group(2), {}
+    return "", line, {}
+
+
+def latest_data_folder(sftp, data_root="Desktop/Data"):
+    """Returns the newest dd_mm_yyyy folder under the remote data root, or None."""
+    dated = []
+    for name in sftp.listdir(data_root):
+        try:
+            dated.append((datetime.datetime.strptime(name, "%d_%m_%Y"), name))
+        except ValueError:
+            continue
+    return f"{data_root}/{max(dated)[1]}" if dated else None
+
+
+class RemoteLogTail:
+    """Follows the newest day's log.txt on the server, reading only bytes appended since the last poll.
+
+    Uses one SFTP session on the manager's transport. The first read starts at
+    most initial_bytes from the end, and no poll reads more than max_read, so
+    a multi-day log never has to be pulled whole. Complete lines are passed to
+    on_lines as a list; a trailing partial line waits for the next poll.
+    """
+
+    def __init__(self, manager, poll_interval=1.0, initial_bytes=64 * 1024, max_read=1024 * 1024):
+        self.manager = manager
+        self.poll_interval = poll_interval
+        self.initial_bytes = initial_bytes
+        self.max_read = max_read
+        self.path = None
+        self.offset = None
+        self.partial = b""
+        self.skip_first_line = False
+
+    def poll(self, sftp):
+        folder = latest_data_folder(sftp)
+        if folder is None:
+            return []
+        path = f"{folder}/log.txt"
+        try:
+            size = sftp.stat(path).st_size
+        except IOError:
+            return []
+        if path != self.path or self.offset is None or size < self.offset:
+            # New day or rotated log: start near the end of the new file
+            self.path = path
+            self.offset = max(0, size - self.initial_bytes) if self.offset is None else 0
+            self.partial = b""
+            # Starting mid-file lands mid-line; drop that fragment
+            self.skip_first_line = self.offset > 0
+        if size == self.offset:
+            return []
+        with sftp.open(path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, self.max_read))
+        self.offset += len(data)
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        if self.skip_first_line and lines:
+            lines.pop(0)
+            self.skip_first_line = False
+        return [line.decode(errors="replace") for line in lines if line]
+
+    def run(self, stop_event, on_lines, on_error=None):
+        """Polls until stop_event is set; meant to run on its own thread."""
+        sftp = None
+        while not stop_event.is_set():
+            try:
+                if sftp is None:
+                    sftp = self.manager.open_sftp()
+                lines = self.poll(sftp)
+                if lines:
+                    on_lines(lines)
+            except Exception as e:
+                sftp = None
+                if on_error:
+                    on_error(f"Log tail error: {e}")
+            stop_event.wait(self.poll_interval)
+        if sftp is not None:
+            sftp.close()
+
+
+SCHEDULER_PATTERN = "python3 $HOME/Desktop/RFI/scheduler.py"
+
+
+def running_instances_command():
+    """One remote call listing PID, elapsed time and command line of every running scheduler.
+
+    The pattern is expanded by the remote shell, so the shell's own command
+    line (which holds the literal $HOME) never matches it.
+    """
+    return f'pids=$(pgrep -d, -f "{SCHEDULER_PATTERN}"); [ -z "$pids" ] || ps -o pid=,etime=,args= -p "$pids"'
+
+
+def parse_running_instances(output):
+    """Parses running_instances_command output into (pid, elapsed, command) tuples."""
+    instances = []
+    for line in (output or "").splitlines():
+        parts = line.split(None, 2)
+        if len(parts) == 3:
+            instances.append(tuple(parts))
+    return instances
+
+
+def kill_command(pids):
+    """One remote call killing every given PID."""
+    return "kill -9 " + " ".join(str(pid) for pid in pids)
+
+
+class FakeStream:
+    def __init__(self, data):
+        self.stream = io.BytesIO(data.encode())
+
+    def read(self):
+        return self.stream.read()
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def close(self):
+        self.active = False
+
+
+class FakeSSHClient:
+    """Stand-in for paramiko.SSHClient whose every round trip costs latency seconds."""
+
+    latency = 0.1
+    pids = 3
+
+    def __init__(self):
+        self.transport = None
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, host, username=None, password=None):
+        time.sleep(3 * self.latency)  # Handshake and authentication round trips
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def exec_command(self, command, timeout=None):
+        time.sleep(self.latency)
+        if command.startswith("ps aux"):
+            output = "\n".join(f"user {4000 + i} 0.0 0.1 1 1 ? S 10:00 0:01 {SCHEDULER_PATTERN} --start_freq 1.0"
+                               for i in range(self.pids))
+        elif command.startswith("pids="):
+            output = "\n".join(f"{4000 + i} 01:02:03 {SCHEDULER_PATTERN} --start_freq 1.0" for i in range(self.pids))
+        elif command.startswith("ps -o etime="):
+            output = "01:02:03"
+        else:
+            output = ""
+        return None, FakeStream(output), FakeStream("")
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+
+def benchmark(latency=0.1, pids=3):
+    """Compares the old per-PID round trips with the batched calls over a fake high-latency transport."""
+    FakeSSHClient.latency = latency
+    FakeSSHClient.pids = pids
+    manager = SSHConnectionManager("fake", "user", "password", client_factory=FakeSSHClient)
+    manager.connect()
+    results = {}
+
+    # Old flow: ps aux, then one ps -o etime= and one kill -9 per PID, strictly in sequence
+    started = time.perf_counter()
+    output, _ = manager.run('ps aux | grep "python3 $HOME/Desktop/RFI/scheduler.py" | grep -v grep')
+    for line in output.splitlines():
+        pid = line.split()[1]
+        manager.run(f"ps -o etime= -p {pid}")
+    for line in output.splitlines():
+        manager.run(f"kill -9 {line.split()[1]}")
+    results["sequential_seconds"] = time.perf_counter() - started
+
+    # New flow: one listing call and one kill call
+    started = time.perf_counter()
+    instances = parse_running_instances(manager.run(running_instances_command())[0])
+    manager.run(kill_command(pid for pid, _, _ in instances))
+    results["batched_seconds"] = time.perf_counter() - started
+
+    # Independent commands in flight together over the one transport
+    started = time.perf_counter()
+    manager.run_many(["uptime", "df -h", "free -m", "date"])
+    results["concurrent_4_seconds"] = time.perf_counter() - started
+    manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSH command channel latency benchmark against a fake transport.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated round trip time in seconds")
+    parser.add_argument("--pids", type=int, default=3, help="Running scheduler instances to simulate")
+    args = parser.parse_args()
+
+    results = benchmark(args.latency, args.pids)
+    print(f"Per-PID round trips: {results['sequential_seconds']:.2f} s, batched: {results['batched_seconds']:.2f} s, "
+          f"4 concurrent commands: {results['concurrent_4_seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
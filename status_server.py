@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import queue
+import shutil
+import threading
+import collections
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+from preview import PREVIEW_HISTORY
+
+
+DEFAULT_PORT = 8765
+
+
+class StatusBoard:
+    """Thread-safe snapshot of a running sweep, served as JSON by the status endpoint.
+
+    Workers report their own fields (current band, pass, efficiency, bytes
+    written); elapsed/remaining time and disk space are computed per request.
+    Live spectrum preview frames are kept in a short numbered history so each
+    poller fetches only the frames it has not seen.
+    """
+
+    def __init__(self, folder_path, observation_time, started=None, **info):
+        self.folder_path = folder_path
+        self.observation_time = observation_time
+        self.started = time.time() if started is None else started
+        self.info = dict(info, pid=os.getpid(), start_time=self.started, observation_time=observation_time)
+        self.workers = {}
+        self.frames = collections.deque(maxlen=PREVIEW_HISTORY)
+        self.frame_seq = 0
+        self.lock = threading.Lock()
+
+    def update(self, worker, **fields):
+        with self.lock:
+            self.workers.setdefault(worker, {}).update(fields, last_update=time.time())
+
+    def add_frame(self, worker, frame):
+        with self.lock:
+            self.frame_seq += 1
+            self.frames.append(dict(frame, seq=self.frame_seq, worker=worker))
+
+    def frames_since(self, seq):
+        with self.lock:
+            if seq > self.frame_seq:
+                seq = 0  # The poller's cursor belongs to an earlier scheduler run
+            return {"seq": self.frame_seq, "frames": [frame for frame in self.frames if frame["seq"] > seq]}
+
+    def snapshot(self):
+        with self.lock:
+            workers = {str(worker): dict(fields) for worker, fields in self.workers.items()}
+        elapsed = time.time() - self.started
+        disk = shutil.disk_usage(self.folder_path)
+        return dict(
+            self.info,
+            elapsed=elapsed,
+            remaining=max(0.0, self.observation_time - elapsed),
+            bytes_written=sum(fields.get("bytes_written", 0) for fields in workers.values()),
+            disk_free=disk.free,
+            disk_total=disk.total,
+            workers=workers,
+        )
+
+
+class QueueReporter:
+    """Stands in for the StatusBoard inside pool workers, forwarding updates over a queue."""
+
+    def __init__(self, updates):
+        self.updates = updates
+
+    def update(self, worker, **fields):
+        self.updates.put(("update", worker, fields))
+
+    def add_frame(self, worker, frame):
+        self.updates.put(("frame", worker, frame))
+
+
+def forward_updates(updates, board, stop_event):
+    """Applies QueueReporter updates to the board until stop_event is set."""
+    while not stop_event.is_set():
+        try:
+            kind, worker, payload = updates.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        except (EOFError, OSError):
+            return
+        if kind == "frame":
+            board.add_frame(worker, payload)
+        else:
+            board.update(worker, **payload)
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ("/", "/status"):
+            reply = self.server.board.snapshot()
+        elif url.path == "/spectrum":
+            since = parse_qs(url.query).get("since", ["0"])[0]
+            reply = self.server.board.frames_since(int(since))
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Polling every few seconds would flood stderr
+
+
+def start_status_server(board, port=DEFAULT_PORT):
+    """Serves the board on localhost only (reach it through the SSH tunnel) from a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+    server.daemon_threads = True
+    server.board = board
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
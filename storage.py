@@ -0,0 +1,276 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+import numpy as np
+
+from capture_file import CaptureFile, CaptureWriter, INDEX_NAME, append_index, index_entry, load_index
+
+CHUNK_BYTES = 64 * 1024 * 1024  # Stored bytes converted per read, bounds memory per file
+BASE_HEADER = ("kind", "dtype", "record_shape", "center_freq", "sample_rate", "bandwidth", "start_time",
+               "record_interval", "records", "dwell")
+
+
+def compress_capture(path, iq_bits=16):
+    """Rewrites a finished capture in a compact encoding and returns (bytes before, bytes after).
+
+    Raw IQ becomes int8 or int16 I/Q pairs scaled to the file's peak; spectra
+    become float16 scaled by each product's median, so the noise floor sits
+    near 1 where float16 is most precise. The new file replaces the old one
+    atomically and stays memory-mappable; CaptureFile decodes it on read.
+    """
+    capture = CaptureFile(path)
+    header = capture.header
+    extra = {key: value for key, value in header.items() if key not in BASE_HEADER}
+    tmp_path = f"{path}.tmp"
+    chunk_records = max(1, CHUNK_BYTES // (capture.data.itemsize * int(np.prod(capture.record_shape, dtype=np.int64))))
+    if header["kind"] == "iq":
+        dtype = np.int8 if iq_bits == 8 else np.int16
+        peak = 0.0
+        for start in range(0, capture.records, chunk_records):
+            chunk = capture.data[start:start + chunk_records]
+            peak = max(peak, float(np.abs(chunk.real).max(initial=0)), float(np.abs(chunk.imag).max(initial=0)))
+        scale = (peak or 1.0) / np.iinfo(dtype).max
+        writer = CaptureWriter(tmp_path, "iq", dtype, (2,), header["center_freq"], header["sample_rate"],
+                               header["bandwidth"], header["start_time"], header["record_interval"],
+                               **dict(extra, encoding="iq_int", scale=scale))
+        for start in range(0, capture.records, chunk_records):
+            chunk = capture.data[start:start + chunk_records]
+            pairs = np.empty((len(chunk), 2), dtype=dtype)
+            pairs[:, 0] = np.round(chunk.real / scale)
+            pairs[:, 1] = np.round(chunk.imag / scale)
+            writer.write(pairs)
+    else:
+        medians = np.median(capture.data[:chunk_records].astype(np.float32), axis=(0, 2)) if capture.records else []
+        scale = [float(median) if median > 0 else 1.0 for median in medians] or [1.0] * capture.record_shape[0]
+        writer = CaptureWriter(tmp_path, "spectra", np.float16, capture.record_shape, header["center_freq"],
+                               header["sample_rate"], header["bandwidth"], header["start_time"],
+                               header["record_interval"], **dict(extra, encoding="float16", scale=scale))
+        limit = np.finfo(np.float16).max
+        divisor = np.asarray(scale, dtype=np.float32)[:, None]
+        for start in range(0, capture.records, chunk_records):
+            chunk = capture.data[start:start + chunk_records] / divisor
+            writer.write(np.minimum(chunk, limit).astype(np.float16))
+    before = os.path.getsize(path)
+    new_header = writer.close(dwell=header["dwell"])
+    del capture
+    os.replace(tmp_path, path)
+    append_index(os.path.dirname(os.path.abspath(path)), index_entry(path, new_header))
+    return before, os.path.getsize(path)
+
+
+def delete_capture(folder_path, entry):
+    """Removes a capture and records a tombstone so index positions stay stable."""
+    try:
+        size = os.path.getsize(os.path.join(folder_path, entry["file"]))
+        os.remove(os.path.join(folder_path, entry["file"]))
+    except FileNotFoundError:
+        size = 0
+    append_index(folder_path, {"file": entry["file"], "deleted": True})
+    return size
+
+
+class StorageManager:
+    """Keeps the data root inside a byte budget while the scheduler runs.
+
+    A background thread periodically compresses finished captures (those in
+    a day's index), applies retention (raw IQ after iq_retention_hours,
+    everything after retention_hours) and, while usage is over budget, drops
+    the oldest raw IQ. Spectra are only ever removed by retention. If the
+    data root is still over budget, or the disk has less than min_free bytes
+    free, space_ok is cleared and the scheduler pauses capture until it is
+    set again. space_ok is an Event from the given multiprocessing context so
+    pool workers started with that context can wait on it too.
+    """
+
+    def __init__(self, data_root, budget=None, min_free=1e9, compress=True, iq_bits=16, iq_retention_hours=None,
+                 retention_hours=None, poll_interval=10.0, log=print, context=multiprocessing):
+        self.data_root = data_root
+        self.budget = budget
+        self.min_free = min_free
+        self.compress = compress
+        self.iq_bits = iq_bits
+        self.iq_retention_hours = iq_retention_hours
+        self.retention_hours = retention_hours
+        self.poll_interval = poll_interval
+        self.log = log
+        self.space_ok = context.Event()
+        self.space_ok.set()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {"files": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "deleted": 0, "deleted_bytes": 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                self.log(f"Storage manager error: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+    def folders(self):
+        """Day folders under the data root that have an index, oldest first."""
+        folders = []
+        for name in os.listdir(self.data_root):
+            folder_path = os.path.join(self.data_root, name)
+            if os.path.exists(os.path.join(folder_path, INDEX_NAME)):
+                folders.append(folder_path)
+        return sorted(folders, key=os.path.getmtime)
+
+    def usage(self):
+        """Bytes used by all day folders."""
+        total = 0
+        for folder_path in self.folders():
+            with os.scandir(folder_path) as entries:
+                total += sum(entry.stat().st_size for entry in entries if entry.is_file())
+        return total
+
+    def step(self):
+        """One pass of compression, retention, budget enforcement and the backpressure check."""
+        indexes = {folder_path: load_index(folder_path) for folder_path in self.folders()}
+        if self.compress:
+            self.compress_pending(indexes)
+        self.apply_retention(indexes)
+        usage = self.usage()
+        if self.budget is not None and usage > self.budget:
+            usage -= self.drop_oldest_iq(indexes, usage - self.budget)
+        free = shutil.disk_usage(self.data_root).free
+        ok = free >= self.min_free and (self.budget is None or usage <= self.budget)
+        if ok != self.space_ok.is_set():
+            if ok:
+                self.space_ok.set()
+                self.log(f"Storage: space available again ({usage / 1e9:.2f} GB used, {free / 1e9:.2f} GB free), resuming capture.")
+            else:
+                self.space_ok.clear()
+                self.log(f"Storage: {usage / 1e9:.2f} GB used of a {self.budget / 1e9 if self.budget else float('inf'):.2f} GB budget, "
+                         f"{free / 1e9:.2f} GB free: pausing capture.")
+        return usage
+
+    def compress_pending(self, indexes):
+        done = dict(self.stats)
+        for folder_path, entries in indexes.items():
+            for entry in entries:
+                if self.stop_event.is_set():
+                    return
+                if entry.get("deleted") or entry.get("encoding"):
+                    continue
+                cpu_start = time.thread_time()
+                try:
+                    before, after = compress_capture(os.path.join(folder_path, entry["file"]), self.iq_bits)
+                except (OSError, ValueError) as e:
+                    self.log(f"Storage: could not compress {entry['file']}: {e}")
+                    continue
+                self.stats["cpu_seconds"] += time.thread_time() - cpu_start
+                self.stats["files"] += 1
+                self.stats["bytes_in"] += before
+                self.stats["bytes_out"] += after
+        if self.stats["files"] > done["files"]:
+            self.log(self.report())
+
+    def report(self):
+        stats = self.stats
+        ratio = stats["bytes_in"] / stats["bytes_out"] if stats["bytes_out"] else 0.0
+        per_core = stats["bytes_in"] / stats["cpu_seconds"] / 1e6 if stats["cpu_seconds"] else 0.0
+        return (f"Storage: compressed {stats['files']} files, {stats['bytes_in'] / 1e6:.1f} MB to {stats['bytes_out'] / 1e6:.1f} MB "
+                f"(ratio {ratio:.2f}), {per_core:.1f} MB/s per core; deleted {stats['deleted']} files "
+                f"({stats['deleted_bytes'] / 1e6:.1f} MB).")
+
+    def delete(self, folder_path, entry):
+        self.stats["deleted_bytes"] += delete_capture(folder_path, entry)
+        self.stats["deleted"] += 1
+        entry["deleted"] = True
+
+    def apply_retention(self, indexes):
+        now = time.time()
+        for folder_path, entries in indexes.items():
+            for entry in entries:
+                if entry.get("deleted"):
+                    continue
+                age_hours = (now - entry["t_end"]) / 3600
+                if (self.retention_hours is not None and age_hours > self.retention_hours) or \
+                        (entry["kind"] == "iq" and self.iq_retention_hours is not None and age_hours > self.iq_retention_hours):
+                    self.delete(folder_path, entry)
+
+    def drop_oldest_iq(self, indexes, excess):
+        """Deletes the oldest raw IQ captures until excess bytes are freed; returns the bytes freed."""
+        candidates = [(entry["t_start"], folder_path, entry) for folder_path, entries in indexes.items()
+                      for entry in entries if entry["kind"] == "iq" and not entry.get("deleted")]
+        freed = 0
+        for _, folder_path, entry in sorted(candidates, key=lambda candidate: candidate[0]):
+            if freed >= excess:
+                break
+            before = self.stats["deleted_bytes"]
+            self.delete(folder_path, entry)
+            freed += self.stats["deleted_bytes"] - before
+        return freed
+
+
+def benchmark(records=2048, fft_size=1024, iq_samples=1 << 22, iq_bits=16):
+    """Compresses synthetic spectra and IQ captures, returning ratio, per-core throughput and decode error."""
+    rng = np.random.default_rng(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as folder_path:
+        spectra_path = os.path.join(folder_path, "spectra.dat")
+        writer = CaptureWriter(spectra_path, "spectra", np.float32, (1, fft_size), 1e9, 2e6, 2e6, time.time(), 1.0,
+                               products=["mean"], fft_size=fft_size)
+        spectra = rng.exponential(1e-3, (records, 1, fft_size)).astype(np.float32)
+        spectra[:, 0, fft_size // 3] *= 1e4  # A strong carrier
+        writer.write(spectra)
+        append_index(folder_path, index_entry(spectra_path, writer.close()))
+
+        iq_path = os.path.join(folder_path, "iq.dat")
+        writer = CaptureWriter(iq_path, "iq", np.complex64, (), 1e9, 2e6, 2e6, time.time(), 0.5e-6)
+        iq = ((rng.standard_normal(iq_samples) + 1j * rng.standard_normal(iq_samples)) * 0.1).astype(np.complex64)
+        writer.write(iq)
+        append_index(folder_path, index_entry(iq_path, writer.close()))
+
+        for name, path, original in (("spectra", spectra_path, spectra), ("iq", iq_path, iq)):
+            cpu_start = time.process_time()
+            before, after = (compress_capture(path, iq_bits) if name == "iq" else compress_capture(path))
+            cpu_seconds = max(time.process_time() - cpu_start, 1e-9)
+            decoded = CaptureFile(path).read()
+            error = np.abs(decoded - original) / np.maximum(np.abs(original), 1e-12)
+            results[name] = {"ratio": before / after, "mb_per_core_second": before / cpu_seconds / 1e6,
+                             "median_relative_error": float(np.median(error))}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress, expire and budget captures under a data root.")
+    parser.add_argument("data_root", nargs="?", default=os.path.expanduser("~/Desktop/Data"), help="Data root holding the day folders")
+    parser.add_argument("--budget", type=float, help="Byte budget for the data root")
+    parser.add_argument("--min_free", type=float, default=1e9, help="Free disk bytes below which capture should pause")
+    parser.add_argument("--iq_bits", type=int, choices=[8, 16], default=16, help="Bits per I and Q component for compressed IQ")
+    parser.add_argument("--iq_retention_hours", type=float, help="Delete raw IQ captures older than this")
+    parser.add_argument("--retention_hours", type=float, help="Delete all captures older than this")
+    parser.add_argument("--benchmark", action="store_true", help="Measure compression ratio and throughput on synthetic captures")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for name, result in benchmark(iq_bits=args.iq_bits).items():
+            print(f"{name}: ratio {result['ratio']:.2f}, {result['mb_per_core_second']:.1f} MB/s per core, "
+                  f"median relative error {result['median_relative_error']:.2e}")
+        return
+
+    manager = StorageManager(args.data_root, args.budget, args.min_free, iq_bits=args.iq_bits,
+                             iq_retention_hours=args.iq_retention_hours, retention_hours=args.retention_hours)
+    usage = manager.step()
+    print(manager.report())
+    print(f"Usage: {usage / 1e9:.2f} GB, capture {'allowed' if manager.space_ok.is_set() else 'paused'}.")
+
+
+if __name__ == "__main__":
+    main()
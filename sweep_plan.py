@@ -0,0 +1,253 @@
+import os
+import json
+import math
+import argparse
+
+from capture_file import HEADER_SIZE
+from checkpoint import read_checkpoint
+
+
+PLAN_VERSION = 1
+PLAN_NAME = "plan.json"
+ORDERS = ("ascending", "interleaved")
+DEFAULT_STEP_OVERHEAD = 0.04  # Seconds per step beyond the dwell, as measured by benchmarks.py
+
+
+def band_edges(start_freq, end_freq, bandwidth, overlap=0.0):
+    """Lower edges of the fewest bands whose usable parts tile [start_freq, end_freq].
+
+    Adjacent bands share overlap of the bandwidth, so the usable part of each
+    is the band less overlap / 2 at either edge, where the filter rolls off.
+    Edges are computed by multiplication, never accumulated, so the count and
+    the last band are exact.
+    """
+    step = bandwidth * (1 - overlap)
+    margin = (bandwidth - step) / 2
+    count = max(1, math.ceil((end_freq - start_freq) / step - 1e-9))
+    return [round(start_freq - margin + index * step, 3) for index in range(count)]
+
+
+def split_bands(bands, workers):
+    """Splits bands into contiguous groups whose sizes differ by at most one."""
+    groups = []
+    start = 0
+    for worker in range(workers):
+        size = len(bands) // workers + (1 if worker < len(bands) % workers else 0)
+        groups.append(bands[start:start + size])
+        start += size
+    return [group for group in groups if group]
+
+
+def order_bands(bands, order):
+    """Visiting order for one pass over ascending bands.
+
+    ascending sweeps up and jumps back to the bottom between passes.
+    interleaved goes up over every other band and down over the rest, so the
+    same total tuning distance is covered without the full-span jump.
+    """
+    if order == "interleaved":
+        return bands[0::2] + bands[1::2][::-1]
+    return list(bands)
+
+
+def retune_jumps(ordered):
+    """Tuning distances between consecutive steps of a pass, including the wrap to the next pass."""
+    return [abs(b - a) for a, b in zip(ordered, ordered[1:] + ordered[:1])] if len(ordered) > 1 else [0.0]
+
+
+def step_bytes(dwell, sampling_rate, product="spectra", fft_size=1024, integration_time=1.0, products=1):
+    """Bytes one capture of dwell seconds writes."""
+    if product == "iq":
+        return HEADER_SIZE + int(dwell * sampling_rate) * 8
+    # A partial final integration is flushed as a record too
+    return HEADER_SIZE + math.ceil(dwell / integration_time) * products * fft_size * 4
+
+
+def measured_overhead(data_root, folders=7):
+    """Median per-step overhead p50 from instrumented runs in the newest day folders, or None."""
+    try:
+        names = [os.path.join(data_root, name) for name in os.listdir(data_root)]
+    except OSError:
+        return None
+    overheads = []
+    for folder in sorted(filter(os.path.isdir, names), key=os.path.getmtime, reverse=True)[:folders]:
+        for name in os.listdir(folder):
+            if name.startswith("timing_") and name.endswith(".json"):
+                timing = read_checkpoint(os.path.join(folder, name))
+                if timing and "overhead" in timing.get("stages", {}):
+                    overheads.append(timing["stages"]["overhead"]["p50"])
+    if not overheads:
+        return None
+    overheads.sort()
+    return overheads[len(overheads) // 2]
+
+
+def compile_plan(start_freq, end_freq, bandwidth, sampling_rate, observation_interval, observation_time,
+                 band_overlap=0.0, order="ascending", workers=1, product="spectra", fft_size=1024,
+                 integration_time=1.0, products=1, step_overhead=None):
+    """Validates sweep parameters and compiles them into the plan the scheduler executes.
+
+    Raises ValueError for parameters that cannot be swept. The plan holds the
+    ascending bands, each worker's group in visiting order, the covered range,
+    estimates of the sweep period and data volume, and warnings about
+    parameters that are valid but probably not intended.
+    """
+    for name, value in (("Bandwidth", bandwidth), ("Sampling rate", sampling_rate),
+                        ("Observation interval", observation_interval), ("Observation time", observation_time)):
+        if not value > 0:
+            raise ValueError(f"{name} must be positive")
+    if start_freq > end_freq:
+        raise ValueError("Start Frequency Higher Than End Frequency")
+    if observation_interval > observation_time:
+        raise ValueError("Time Interval > Observation Time")
+    if bandwidth > sampling_rate:
+        raise ValueError("Bandwidth exceeds the sampling rate, which would leave gaps between bands")
+    if not 0 <= band_overlap < 1:
+        raise ValueError("Band overlap must be in [0, 1)")
+    if order not in ORDERS:
+        raise ValueError(f"Unknown band order: {order}")
+    if workers < 1:
+        raise ValueError("At least one worker is needed")
+
+    bands = band_edges(start_freq, end_freq, bandwidth, band_overlap)
+    groups = [order_bands(group, order) for group in split_bands(bands, workers)]
+    margin = bandwidth * band_overlap / 2
+    plan = {
+        "version": PLAN_VERSION,
+        "params": {
+            "start_freq": start_freq, "end_freq": end_freq, "bandwidth": bandwidth, "sampling_rate": sampling_rate,
+            "observation_interval": observation_interval, "observation_time": observation_time,
+            "band_overlap": band_overlap, "band_order": order, "workers": len(groups),
+        },
+        "bands": bands,
+        "groups": groups,
+        "freq_lo": bands[0],
+        "freq_hi": bands[-1] + bandwidth,
+        "covered": [bands[0] + margin, bands[-1] + bandwidth - margin],
+    }
+    return estimate_plan(plan, product, fft_size, integration_time, products, step_overhead)
+
+
+def estimate_plan(plan, product="spectra", fft_size=1024, integration_time=1.0, products=1, step_overhead=None):
+    """Fills in a plan's estimates and warnings for the given products and step overhead, and returns it.
+
+    Only the bands and parameters the plan already holds are used, so a saved
+    plan can be re-estimated with a measured overhead without changing what it
+    sweeps.
+    """
+    params, groups = plan["params"], plan["groups"]
+    observation_interval, observation_time = params["observation_interval"], params["observation_time"]
+    overhead = DEFAULT_STEP_OVERHEAD if step_overhead is None else step_overhead
+    step_time = observation_interval + overhead
+    period = max(len(group) for group in groups) * step_time
+    steps = len(groups) * int(observation_time // step_time)
+    per_step = step_bytes(observation_interval, params["sampling_rate"], product, fft_size, integration_time, products)
+    jumps = [jump for group in groups for jump in retune_jumps(group)]
+
+    warnings = []
+    if period > observation_time:
+        warnings.append(f"One sweep pass takes {period:.1f} s, longer than the {observation_time:.0f} s observation time")
+    if product == "spectra" and observation_interval < integration_time:
+        warnings.append(f"The {observation_interval} s dwell is shorter than the {integration_time} s integration time")
+    if plan["covered"][1] - params["end_freq"] > params["bandwidth"] / 2:
+        warnings.append(f"The last band extends {(plan['covered'][1] - params['end_freq']) / 1e6:.3f} MHz past the end frequency")
+
+    plan["estimates"] = {
+        "step_overhead": overhead,
+        "period": period,
+        "passes": observation_time / period,
+        "steps": steps,
+        "bytes_per_step": per_step,
+        "total_bytes": steps * per_step,
+        "dwell_efficiency": observation_interval / step_time,
+        "max_retune_jump": max(jumps),
+        "retune_distance_per_pass": sum(jumps),
+    }
+    plan["warnings"] = warnings
+    return plan
+
+
+def describe_plan(plan):
+    """One-line summary of a plan for logs and the GUI."""
+    params, estimates = plan["params"], plan["estimates"]
+    workers = f" on {params['workers']} workers" if params["workers"] > 1 else ""
+    return (f"Plan: {len(plan['bands'])} bands of {params['bandwidth'] / 1e6:.3f} MHz ({params['band_overlap']:.0%} overlap, "
+            f"{params['band_order']} order){workers} covering {plan['covered'][0] / 1e6:.3f}-{plan['covered'][1] / 1e6:.3f} MHz; "
+            f"sweep period about {estimates['period']:.1f} s ({estimates['passes']:.1f} passes), "
+            f"about {estimates['total_bytes'] / 1e9:.2f} GB of data.")
+
+
+def save_plan(path, plan):
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=1)
+
+
+def validate_plan(plan):
+    """Raises ValueError unless plan has the structure the scheduler executes."""
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported sweep plan version: {plan.get('version') if isinstance(plan, dict) else None}")
+    params = plan.get("params")
+    if not isinstance(params, dict):
+        raise ValueError("The plan has no parameters")
+    for name in ("start_freq", "end_freq", "bandwidth", "sampling_rate", "observation_interval", "observation_time"):
+        if not isinstance(params.get(name), (int, float)):
+            raise ValueError(f"The plan's {name} is missing or not a number")
+    for name in ("bandwidth", "sampling_rate", "observation_interval", "observation_time"):
+        if not params[name] > 0:
+            raise ValueError(f"The plan's {name} must be positive")
+    if not isinstance(params.get("band_overlap"), (int, float)) or params.get("band_order") not in ORDERS:
+        raise ValueError("The plan's band overlap or order is missing or invalid")
+    bands, groups = plan.get("bands"), plan.get("groups")
+    if not isinstance(bands, list) or not bands or not all(isinstance(band, (int, float)) for band in bands):
+        raise ValueError("The plan has no bands")
+    if not isinstance(groups, list) or not groups or not all(isinstance(group, list) and group for group in groups):
+        raise ValueError("The plan's worker groups are missing or empty")
+    if sorted(band for group in groups for band in group) != sorted(bands):
+        raise ValueError("The plan's worker groups do not cover its bands exactly once")
+    covered = plan.get("covered")
+    if not (isinstance(covered, list) and len(covered) == 2 and all(isinstance(edge, (int, float)) for edge in covered)):
+        raise ValueError("The plan's covered range is missing")
+
+
+def load_plan(path):
+    """Reads a compiled plan, refusing one that fails validate_plan."""
+    with open(path) as f:
+        plan = json.load(f)
+    validate_plan(plan)
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile sweep parameters into a plan file for scheduler.py --plan.")
+    parser.add_argument("--start_freq", type=float, required=True, help="Starting frequency in Hz")
+    parser.add_argument("--end_freq", type=float, required=True, help="Ending frequency in Hz")
+    parser.add_argument("--bandwidth", type=float, required=True, help="Bandwidth in Hz")
+    parser.add_argument("--sampling_rate", type=float, required=True, help="Sampling rate in Hz")
+    parser.add_argument("--observation_interval", type=float, required=True, help="Observation interval in seconds")
+    parser.add_argument("--observation_time", type=float, required=True, help="Total observation time in seconds")
+    parser.add_argument("--band_overlap", type=float, default=0.0, help="Fraction of the bandwidth adjacent bands share")
+    parser.add_argument("--band_order", choices=ORDERS, default="ascending", help="Visiting order of the bands in a pass")
+    parser.add_argument("--workers", type=int, default=1, help="Number of receivers sweeping the range in parallel")
+    parser.add_argument("--product", choices=["iq", "spectra"], default="spectra", help="Store raw IQ or integrated spectra")
+    parser.add_argument("--fft_size", type=int, default=1024, help="FFT size for spectra")
+    parser.add_argument("--integration_time", type=float, default=1.0, help="Seconds of data averaged per spectrum")
+    parser.add_argument("--step_overhead", type=float, help="Seconds per step beyond the dwell (default: measured, else 0.04)")
+    parser.add_argument("--data_root", default=os.path.expanduser("~/Desktop/Data"), help="Where to look for measured step overhead")
+    parser.add_argument("--output", default=PLAN_NAME, help="Plan file to write")
+    args = parser.parse_args()
+
+    step_overhead = args.step_overhead if args.step_overhead is not None else measured_overhead(args.data_root)
+    try:
+        plan = compile_plan(args.start_freq, args.end_freq, args.bandwidth, args.sampling_rate, args.observation_interval,
+                            args.observation_time, args.band_overlap, args.band_order, args.workers, args.product,
+                            args.fft_size, args.integration_time, step_overhead=step_overhead)
+    except ValueError as e:
+        parser.error(str(e))
+    save_plan(args.output, plan)
+    print(describe_plan(plan))
+    for warning in plan["warnings"]:
+        print(f"Warning: {warning}")
+
+
+if __name__ == "__main__":
+    main()
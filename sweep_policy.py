@@ -0,0 +1,152 @@
+from sweep_plan import DEFAULT_STEP_OVERHEAD
+
+
+class RasterPolicy:
+    """The fixed raster: every band in the plan's order, each for the same dwell."""
+
+    name = "raster"
+
+    def __init__(self, bands, observation_interval):
+        self.bands = list(bands)
+        self.observation_interval = observation_interval
+        self.position = 0
+
+    @property
+    def steps_per_pass(self):
+        return len(self.bands)
+
+    def next_step(self, now):
+        """Returns (band, dwell) for the next sweep step."""
+        band = self.bands[self.position]
+        self.position = (self.position + 1) % len(self.bands)
+        return band, self.observation_interval
+
+    def update(self, band, stats, now):
+        """Records the outcome of a step; the raster ignores it."""
+
+    def state(self, now):
+        """JSON-safe policy state for a checkpoint."""
+        return {"position": self.position}
+
+    def restore(self, state, now):
+        """Continues from a state() saved by an earlier run."""
+        self.position = state["position"] % len(self.bands)
+
+
+class AdaptivePolicy(RasterPolicy):
+    """Spends more capture time on active or changing bands while bounding every band's revisit interval.
+
+    Each band keeps an exponentially weighted occupancy and how much that
+    occupancy changed between visits; their sum over occupancy_scale (the
+    flagged fraction at which a band counts as fully active) is its activity.
+    The next band is the one with the largest (1 + gain * activity) * time
+    since its last visit, so quiet bands still age into the schedule. Dwell
+    grows with activity between min_dwell and max_dwell. Bands never visited
+    go first, in frequency order.
+
+    max_revisit is enforced as a deadline for every band: a band may only be
+    chosen, and its dwell only be as long, as still leaves every band
+    reachable by its deadline when the rest are visited at min_dwell in
+    deadline order. That is always possible while max_revisit covers a pass
+    at min_dwell, which the constructor checks; step_overhead is the time
+    each step takes beyond its dwell. Below a pass at max_dwell, dwells are
+    capped (capped is set). Without a max_revisit, one pass at max_dwell is
+    used, so nothing is capped.
+    """
+
+    name = "adaptive"
+
+    def __init__(self, bands, observation_interval, max_revisit=None, gain=4.0, alpha=0.3, occupancy_scale=0.01,
+                 min_dwell=None, max_dwell=None, step_overhead=DEFAULT_STEP_OVERHEAD):
+        super().__init__(bands, observation_interval)
+        self.gain = gain
+        self.occupancy_scale = occupancy_scale
+        self.alpha = alpha
+        self.min_dwell = observation_interval if min_dwell is None else min_dwell
+        self.max_dwell = 4 * observation_interval if max_dwell is None else max_dwell
+        self.step_overhead = step_overhead
+        longest_pass = len(self.bands) * (self.max_dwell + step_overhead)
+        self.max_revisit = longest_pass if max_revisit is None else max_revisit
+        shortest_pass = len(self.bands) * (self.min_dwell + step_overhead)
+        if self.max_revisit < shortest_pass:
+            raise ValueError(f"A maximum revisit interval of {self.max_revisit:.1f} s cannot be met: one pass over "
+                             f"{len(self.bands)} bands takes at least {shortest_pass:.1f} s")
+        self.capped = self.max_revisit < longest_pass
+        self.occupancy = {band: 0.0 for band in self.bands}
+        self.change = {band: 0.0 for band in self.bands}
+        self.last_visit = {band: None for band in self.bands}
+
+    def activity(self, band):
+        return min(1.0, (self.occupancy[band] + self.change[band]) / self.occupancy_scale)
+
+    def dwell(self, band):
+        dwell = self.min_dwell * (1 + self.gain * self.activity(band))
+        return min(self.max_dwell, max(self.min_dwell, dwell))
+
+    def longest_dwell(self, band, now):
+        """Longest dwell on band now that still lets every band be reached by its deadline.
+
+        After this step the other visited bands, and band itself with its new
+        deadline, are taken at min_dwell in deadline order; the k-th of them
+        starts k short steps after this step ends.
+        """
+        deadlines = sorted([self.last_visit[other] + self.max_revisit for other in self.bands
+                            if other != band and self.last_visit[other] is not None] + [now + self.max_revisit])
+        short_step = self.min_dwell + self.step_overhead
+        return min(deadline - now - k * short_step for k, deadline in enumerate(deadlines)) - self.step_overhead
+
+    def next_step(self, now):
+        unvisited = [band for band in self.bands if self.last_visit[band] is None]
+        if unvisited:
+            band = unvisited[0]
+        else:
+            feasible = [band for band in self.bands if self.longest_dwell(band, now) >= self.min_dwell]
+            if feasible:
+                band = max(feasible, key=lambda b: (1 + self.gain * self.activity(b)) * (now - self.last_visit[b]))
+            else:
+                # Steps overran the overhead estimate; catch up in deadline order
+                band = min(self.bands, key=lambda b: self.last_visit[b])
+        dwell = max(self.min_dwell, min(self.dwell(band), self.longest_dwell(band, now)))
+        self.last_visit[band] = now
+        return band, dwell
+
+    def update(self, band, stats, now):
+        occupancy = stats.get("occupancy")
+        if occupancy is None:
+            return
+        previous = self.occupancy[band]
+        self.occupancy[band] = (1 - self.alpha) * previous + self.alpha * occupancy
+        self.change[band] = (1 - self.alpha) * self.change[band] + self.alpha * abs(occupancy - previous)
+
+    def state(self, now):
+        # Visit times are monotonic clock readings, meaningless in another process, so ages are saved
+        return {
+            "occupancy": [self.occupancy[band] for band in self.bands],
+            "change": [self.change[band] for band in self.bands],
+            "ages": [None if self.last_visit[band] is None else now - self.last_visit[band] for band in self.bands],
+        }
+
+    def restore(self, state, now):
+        for band, occupancy, change, age in zip(self.bands, state["occupancy"], state["change"], state["ages"]):
+            self.occupancy[band] = occupancy
+            self.change[band] = change
+            self.last_visit[band] = None if age is None else now - age
+
+
+POLICIES = {
+    "raster": RasterPolicy,
+    "adaptive": AdaptivePolicy,
+}
+
+
+def create_policy(name, bands, observation_interval, max_revisit=None, step_overhead=None):
+    """Creates the named sweep policy over the given bands.
+
+    Raises ValueError if the adaptive policy's max_revisit cannot be met.
+    """
+    step_overhead = DEFAULT_STEP_OVERHEAD if step_overhead is None else step_overhead
+    if name == "raster":
+        return RasterPolicy(bands, observation_interval)
+    if name == "adaptive":
+        return AdaptivePolicy(bands, observation_interval, max_revisit, step_overhead=step_overhead)
+    raise ValueError(f"Unknown sweep policy: {name}")
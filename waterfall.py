@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from capture_file import CaptureFile, CaptureWriter, append_index, index_entry, load_index, query_index, rebuild_index
+from spectrum import SpectrumIntegrator
+
+
+CHUNK_RECORDS = 256  # Spectra records averaged per read, bounds memory per file
+CHUNK_SAMPLES = 1 << 20  # IQ samples integrated per read
+
+
+class Waterfall:
+    """A growing frequency x time waterfall: float32 rows in a raw file plus a JSON sidecar.
+
+    Row i holds one sweep pass stitched onto a common frequency grid starting at
+    freq_start with freq_step spacing; channels no band covered are NaN. The
+    sidecar remembers how many index entries the complete rows consumed, and
+    whether the last row is a pass still in progress, so the next update only
+    ingests new captures.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = path + ".json"
+        with open(self.meta_path) as f:
+            self.meta = json.load(f)
+
+    @classmethod
+    def create(cls, path, freq_start, freq_step, channels):
+        meta = {"freq_start": freq_start, "freq_step": freq_step, "channels": channels,
+                "rows": 0, "times": [], "entries": 0, "partial": False}
+        open(path, "wb").close()
+        with open(path + ".json", "w") as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    @property
+    def channels(self):
+        return self.meta["channels"]
+
+    def frequencies(self):
+        return self.meta["freq_start"] + np.arange(self.channels) * self.meta["freq_step"]
+
+    def data(self):
+        """Memory-maps the rows written so far."""
+        if self.meta["rows"] == 0:
+            return np.empty((0, self.channels), dtype=np.float32)
+        return np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.meta["rows"], self.channels))
+
+    def truncate(self, rows):
+        """Drops rows past the given count (e.g. a partial pass about to be rebuilt)."""
+        with open(self.path, "r+b") as f:
+            f.truncate(rows * self.channels * 4)
+        self.meta["rows"] = rows
+        self.meta["times"] = self.meta["times"][:rows]
+
+    def append_row(self, row, row_time, entries, partial=False):
+        with open(self.path, "ab") as f:
+            f.write(memoryview(row.astype(np.float32)))
+        self.meta["rows"] += 1
+        self.meta["times"].append(row_time)
+        self.meta["entries"] = entries
+        self.meta["partial"] = partial
+
+    def save(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+
+def mean_spectrum(capture, product="mean", fft_size=1024):
+    """Averages one capture file into a single spectrum, reading it in bounded chunks.
+
+    Returns (frequencies, spectrum, bytes read).
+    """
+    header = capture.header
+    total = None
+    count = 0
+    if header["kind"] == "spectra":
+        product_index = header.get("products", ["mean"]).index(product)
+        for start in range(0, capture.records, CHUNK_RECORDS):
+            chunk = capture.read(start, start + CHUNK_RECORDS)[:, product_index]
+            chunk_sum = chunk.sum(axis=0, dtype=np.float64)
+            total = chunk_sum if total is None else total + chunk_sum
+            count += len(chunk)
+        freqs = capture.frequencies()
+    else:
+        integrator = SpectrumIntegrator(header["sample_rate"], fft_size=fft_size, integration_time=CHUNK_SAMPLES / header["sample_rate"])
+        for start in range(0, capture.records, CHUNK_SAMPLES):
+            for result in integrator.process(capture.read(start, start + CHUNK_SAMPLES)):
+                total = result["mean"] * result["frames"] if total is None else total + result["mean"] * result["frames"]
+                count += result["frames"]
+        for result in integrator.flush():
+            total = result["mean"] * result["frames"] if total is None else total + result["mean"] * result["frames"]
+            count += result["frames"]
+        freqs = integrator.frequencies(header["center_freq"])
+    if not count:
+        return freqs, None, 0
+    return freqs, total / count, capture.data.nbytes
+
+
+def trim_edges(freqs, spectrum, header, edge_trim):
+    """Keeps the channels inside the captured bandwidth, less edge_trim of it at each edge."""
+    keep = min(header["bandwidth"], header["sample_rate"]) / 2 * (1 - 2 * edge_trim)
+    offset = freqs - header["center_freq"]
+    mask = (offset >= -keep) & (offset < keep)
+    return freqs[mask], spectrum[mask]
+
+
+def build_waterfall(folder_path, output_path, edge_trim=0.0, product="mean", freq_start=None, freq_stop=None,
+                    fft_size=1024, progress=None):
+    """Streams a data folder's captures into the waterfall at output_path, creating or extending it.
+
+    Captures are taken in index order; a new row starts whenever a band that
+    is already in the current row comes round again, which holds for the
+    raster, adaptive and multi-worker sweeps alike. Overlapping channels from adjacent bands
+    are averaged. Returns ingest statistics.
+    """
+    entries = load_index(folder_path) or rebuild_index(folder_path)
+    stats = {"files": 0, "bytes": 0, "rows": 0, "seconds": 0.0}
+    if not entries:
+        return stats
+    started = time.perf_counter()
+
+    if os.path.exists(output_path + ".json"):
+        waterfall = Waterfall(output_path)
+        if waterfall.meta["partial"]:
+            # The last row was an unfinished pass, so rebuild it from its first capture
+            waterfall.truncate(waterfall.meta["rows"] - 1)
+    else:
+        first = CaptureFile(os.path.join(folder_path, query_index(entries)[0]["file"]))
+        if first.header["kind"] == "spectra":
+            freq_step = first.header["sample_rate"] / first.record_shape[-1]
+        else:
+            freq_step = first.header["sample_rate"] / fft_size
+        lo = freq_start if freq_start is not None else min(entry["freq_lo"] for entry in entries)
+        hi = freq_stop if freq_stop is not None else max(entry["freq_hi"] for entry in entries)
+        waterfall = Waterfall.create(output_path, lo, freq_step, int(np.ceil((hi - lo) / freq_step)))
+
+    channels = waterfall.channels
+    row_sum = np.zeros(channels, dtype=np.float64)
+    row_count = np.zeros(channels, dtype=np.int32)
+    row_time = None
+    row_first_entry = waterfall.meta["entries"]
+    row_bands = set()
+
+    def finish_row(consumed, partial=False):
+        row = np.where(row_count > 0, row_sum / np.maximum(row_count, 1), np.nan)
+        waterfall.append_row(row, row_time, consumed, partial)
+        stats["rows"] += 1
+        row_sum.fill(0)
+        row_count.fill(0)
+
+    for position in range(waterfall.meta["entries"], len(entries)):
+        entry = entries[position]
+        if entry.get("deleted"):
+            continue
+        if entry["center_freq"] in row_bands:
+            finish_row(position)
+            waterfall.save()
+            row_first_entry = position
+            row_time = None
+            row_bands.clear()
+        row_bands.add(entry["center_freq"])
+        if row_time is None:
+            row_time = entry["t_start"]
+
+        capture = CaptureFile(os.path.join(folder_path, entry["file"]))
+        freqs, spectrum, nbytes = mean_spectrum(capture, product, fft_size)
+        stats["files"] += 1
+        stats["bytes"] += nbytes
+        if spectrum is None:
+            continue
+        freqs, spectrum = trim_edges(freqs, spectrum, capture.header, edge_trim)
+        idx = np.round((freqs - waterfall.meta["freq_start"]) / waterfall.meta["freq_step"]).astype(np.int64)
+        valid = (idx >= 0) & (idx < channels)
+        np.add.at(row_sum, idx[valid], spectrum[valid])
+        np.add.at(row_count, idx[valid], 1)
+        if progress:
+            progress(stats)
+
+    if row_time is not None:
+        # Write the pass in progress too, but record its first entry so the next update redoes it
+        finish_row(row_first_entry, partial=True)
+    waterfall.save()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def make_synthetic_day(folder_path, start_freq, bands, passes, records=60, fft_size=1024, sample_rate=2e6, seed=0,
+                       start_time=None):
+    """Writes a folder of synthetic spectra captures with an index, for benchmarking."""
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    t = time.time() if start_time is None else start_time
+    for _ in range(passes):
+        for band in range(bands):
+            center = start_freq + (band + 0.5) * sample_rate
+            path = os.path.join(folder_path, f"{int(center - sample_rate / 2)}_{int(t)}_{band}.dat")
+            writer = CaptureWriter(path, "spectra", np.float32, (1, fft_size), center, sample_rate, sample_rate, t, 1.0,
+                                   products=["mean"], fft_size=fft_size)
+            writer.write(rng.exponential(1.0, (records, 1, fft_size)).astype(np.float32))
+            append_index(folder_path, index_entry(path, writer.close()))
+            t += records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stitch a day's sweep into a frequency x time waterfall.")
+    parser.add_argument("folder", nargs="?", help="Data folder, e.g. ~/Desktop/Data/<dd_mm_yyyy>")
+    parser.add_argument("--output", help="Waterfall file (default: <folder>/waterfall.f32)")
+    parser.add_argument("--edge_trim", type=float, default=0.0, help="Fraction of each band edge dropped for filter roll-off")
+    parser.add_argument("--product", default="mean", help="Spectrum product to stitch (mean, max, kurtosis)")
+    parser.add_argument("--fft_size", type=int, default=1024, help="FFT size used for raw IQ captures")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark ingest on a synthetic day instead of a real folder")
+    parser.add_argument("--bands", type=int, default=50, help="Bands per pass for --benchmark")
+    parser.add_argument("--passes", type=int, default=20, help="Sweep passes for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        with tempfile.TemporaryDirectory() as folder_path:
+            make_synthetic_day(folder_path, 1e9, args.bands, args.passes)
+            stats = build_waterfall(folder_path, os.path.join(folder_path, "waterfall.f32"), args.edge_trim)
+    else:
+        if not args.folder:
+            parser.error("folder is required without --benchmark")
+        folder_path = os.path.expanduser(args.folder)
+        output_path = args.output or os.path.join(folder_path, "waterfall.f32")
+        stats = build_waterfall(folder_path, output_path, args.edge_trim, args.product, fft_size=args.fft_size)
+
+    seconds = max(stats["seconds"], 1e-9)
+    print(f"Ingested {stats['files']} files ({stats['bytes'] / 1e6:.1f} MB) into {stats['rows']} rows in {seconds:.2f} s: "
+          f"{stats['files'] / seconds:.1f} files/s, {stats['bytes'] / 1e6 / seconds:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()